@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time to first audio, cold Live sessions vs the warm session pool
+
+Serves voice_gateway.VoiceGateway in-process against fake_live.FakeClient,
+a stand-in for the Gemini Live endpoint that models its latencies:
+--connect-ms to open a session, --reply-ms from the end of a turn to the
+first audio chunk, then --chunks chunks of 40 ms audio at real-time pace.
+
+Callers connect every --interval seconds and time the first audio frame
+from the moment they open the socket:
+
+- "cold":  pool size 0, the gateway connects to Live and sends the
+           greeting once the caller is there (what the servers did);
+- "pool":  --pool-size warm sessions and the cached greeting;
+- "burst": --burst callers at once against the pool, more than it holds,
+           so some calls open their session on the spot.
+
+Usage:
+    python bench_session_pool.py [--calls 20] [--pool-size 2] [--connect-ms 400] [--reply-ms 800]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+import websockets
+
+import voice_gateway
+from fake_live import FakeClient
+from voice_protocol import BINARY_SUBPROTOCOL, SERVE_OPTIONS
+
+
+async def call(url):
+    """Seconds from opening the socket to the first audio frame; then hear the greeting out"""
+    start = time.perf_counter()
+    first_audio = None
+    async with websockets.connect(url, subprotocols=[BINARY_SUBPROTOCOL], compression=None) as websocket:
+        async for message in websocket:
+            if isinstance(message, bytes):
+                if first_audio is None:
+                    first_audio = time.perf_counter() - start
+            elif '"turn_complete"' in message:
+                break
+    return first_audio
+
+
+async def run(mode, options):
+    client = FakeClient(
+        connect_latency=options.connect_ms / 1000,
+        response_latency=options.reply_ms / 1000,
+        turn_seconds=options.chunks * 0.04
+    )
+    pool_size = 0 if mode == "cold" else options.pool_size
+    gateway = voice_gateway.VoiceGateway(voice_gateway.PERSONAS["robin"], client=client, pool_size=pool_size)
+    await gateway.start()
+    if gateway.pool:
+        while len(gateway.pool._ready) < pool_size:  # let it warm up
+            await asyncio.sleep(0.05)
+
+    async with websockets.serve(gateway.handle_connection, "127.0.0.1", 0, compression=None, **SERVE_OPTIONS) as server:
+        url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        if mode == "burst":
+            ttfa = await asyncio.gather(*(call(url) for _ in range(options.burst)))
+        else:
+            ttfa = []
+            for _ in range(options.calls):
+                ttfa.append(await call(url))
+                await asyncio.sleep(options.interval)
+
+    hits = gateway.pool.hits if gateway.pool else 0
+    await gateway.close()
+    return ttfa, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between callers")
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--burst", type=int, default=6, help="simultaneous callers in the burst run")
+    parser.add_argument("--connect-ms", type=float, default=400, help="stand-in time to open a Live session")
+    parser.add_argument("--reply-ms", type=float, default=800, help="stand-in time from turn end to first audio")
+    parser.add_argument("--chunks", type=int, default=25, help="40 ms audio chunks per turn")
+    options = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"Stand-in Live: connect {options.connect_ms:g} ms, first audio {options.reply_ms:g} ms after the turn")
+    print(f"{'mode':<8}{'calls':>7}{'warm':>7}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for mode in ("cold", "pool", "burst"):
+        ttfa, hits = asyncio.run(run(mode, options))
+        ms = sorted(seconds * 1000 for seconds in ttfa)
+        p99 = ms[min(len(ms) - 1, round(0.99 * (len(ms) - 1)))]
+        print(f"{mode:<8}{len(ms):>7}{hits:>7}{statistics.median(ms):>10.1f}{p99:>10.1f}{ms[-1]:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
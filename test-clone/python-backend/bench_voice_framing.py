@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CPU per concurrent voice stream, base64-in-JSON vs binary PCM frames
+
+Runs a voice-server stand-in in a child process that does what the voice
+servers do per chunk (voice_protocol.AudioChannel: decode the microphone
+chunk, send back a chunk of reply audio) and drives it with N concurrent
+clients, each streaming --seconds of 16 kHz microphone audio in 20 ms chunks
+and receiving the same length of 24 kHz reply audio.
+
+Reports, per mode and concurrency: server and client CPU milliseconds per
+second of streamed audio per stream, and bytes on the wire per stream-second.
+
+Usage:
+    python bench_voice_framing.py [--streams 1,10,50] [--seconds 30]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import time
+
+import websockets
+
+from voice_protocol import (
+    AudioChannel, BINARY_SUBPROTOCOL, INPUT_SAMPLE_RATE, OUTPUT_SAMPLE_RATE, SERVE_OPTIONS, encode_audio_frame
+)
+
+CHUNK_SECONDS = 0.02
+MIC_CHUNK = os.urandom(int(INPUT_SAMPLE_RATE * CHUNK_SECONDS) * 2)
+MIC_JSON = json.dumps({"type": "audio", "data": base64.b64encode(MIC_CHUNK).decode()})
+REPLY_CHUNK = os.urandom(int(OUTPUT_SAMPLE_RATE * CHUNK_SECONDS) * 2)
+
+
+async def handle_stream(websocket):
+    channel = AudioChannel(websocket)
+    async for message in websocket:
+        data, audio = channel.parse(message)
+        if audio is not None:
+            await channel.send_audio(REPLY_CHUNK)
+        elif data.get("type") == "stats":
+            await channel.send_control({"type": "stats", "cpu": time.process_time()})
+        elif data.get("type") == "end":
+            await channel.send_control({"type": "end"})
+
+
+def run_server(port_queue):
+    async def serve():
+        async with websockets.serve(handle_stream, "127.0.0.1", 0, compression=None, **SERVE_OPTIONS) as server:
+            port_queue.put(server.sockets[0].getsockname()[1])
+            await asyncio.Future()
+    asyncio.run(serve())
+
+
+async def server_cpu(url):
+    async with websockets.connect(url) as websocket:
+        await websocket.send(json.dumps({"type": "stats"}))
+        return json.loads(await websocket.recv())["cpu"]
+
+
+async def stream(url, binary, chunks, wire):
+    subprotocols = [BINARY_SUBPROTOCOL] if binary else None
+    async with websockets.connect(url, subprotocols=subprotocols, compression=None) as websocket:
+        channel = AudioChannel(websocket, output_rate=INPUT_SAMPLE_RATE)
+        assert channel.binary == binary
+
+        async def receive():
+            received = 0
+            async for message in websocket:
+                wire[0] += len(message)
+                data, audio = channel.parse(message)
+                if audio is not None:
+                    received += 1
+                elif data.get("type") == "end":
+                    return received
+
+        receiver = asyncio.create_task(receive())
+        for _ in range(chunks):
+            await channel.send_audio(MIC_CHUNK)
+        await channel.send_control({"type": "end"})
+        assert await receiver == chunks
+        wire[0] += chunks * (len(encode_audio_frame(0, MIC_CHUNK, INPUT_SAMPLE_RATE)) if binary else len(MIC_JSON))
+
+
+async def measure(url, binary, streams, seconds):
+    chunks = int(seconds / CHUNK_SECONDS)
+    wire = [0]
+    cpu_before, client_before = await server_cpu(url), time.process_time()
+    start = time.perf_counter()
+    await asyncio.gather(*(stream(url, binary, chunks, wire) for _ in range(streams)))
+    elapsed = time.perf_counter() - start
+    cpu_after, client_after = await server_cpu(url), time.process_time()
+    stream_seconds = streams * seconds
+    return {
+        "server ms": (cpu_after - cpu_before) * 1000 / stream_seconds,
+        "client ms": (client_after - client_before) * 1000 / stream_seconds,
+        "KB/s": wire[0] / 1024 / stream_seconds,
+        "x realtime": stream_seconds / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--streams", default="1,10,50", help="concurrent streams to compare")
+    parser.add_argument("--seconds", type=float, default=30.0, help="audio streamed per stream")
+    args = parser.parse_args()
+
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=run_server, args=(port_queue,), daemon=True)
+    server.start()
+    url = f"ws://127.0.0.1:{port_queue.get(timeout=10)}"
+
+    rows = []
+    try:
+        for streams in (int(n) for n in args.streams.split(",")):
+            for mode, binary in (("json", False), ("binary", True)):
+                rows.append((mode, streams, asyncio.run(measure(url, binary, streams, args.seconds))))
+    finally:
+        server.terminate()
+
+    print("CPU per stream per second of audio (20 ms chunks, 16 kHz in / 24 kHz out)")
+    columns = list(rows[0][2])
+    print(f"{'mode':<8}{'streams':>8}" + "".join(f"{column:>12}" for column in columns))
+    for mode, streams, result in rows:
+        print(f"{mode:<8}{streams:>8}" + "".join(f"{result[column]:>12.2f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
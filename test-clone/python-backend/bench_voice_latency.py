@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time to first audio, jitter and CPU per stream of the voice gateway
+
+Runs voice_gateway in a child process against fake_live.FakeClient (no API
+key or network) and connects N concurrent callers for each --callers level.
+After the greeting, each caller holds --turns spoken turns: --speech seconds
+of 16 kHz microphone audio in 20 ms frames at real-time pace, then
+"audio_end", then it listens to the reply.
+
+Reports per level:
+- TTFA p50/p99: from "audio_end" to the first reply audio frame; the
+  stand-in itself waits --reply-ms, so that is the floor;
+- jitter p50/p99: how far the gaps between reply frames stray from the
+  stand-in's 40 ms pacing;
+- gateway CPU per stream: the child's CPU time (the stand-in runs in it
+  too) per second of call time per caller, in ms and as % of a core;
+  shutdown and other fixed costs inflate it at 1 caller.
+
+Usage:
+    python bench_voice_latency.py [--callers 1,10,100] [--turns 3] [--reply-ms 300] [--json]
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import resource
+import socket
+import time
+
+import websockets
+
+import voice_gateway
+from fake_live import FakeClient
+from voice_protocol import AudioChannel, BINARY_SUBPROTOCOL, INPUT_SAMPLE_RATE
+
+FRAME_SECONDS = 0.02
+MIC_FRAME = bytes(int(INPUT_SAMPLE_RATE * FRAME_SECONDS) * 2)
+REPLY_CHUNK_SECONDS = 0.04
+
+
+def run_gateway(port, options, ready):
+    logging.getLogger().setLevel(logging.WARNING)
+    client = FakeClient(
+        connect_latency=options.connect_ms / 1000,
+        response_latency=options.reply_ms / 1000,
+        turn_seconds=options.reply_seconds,
+        vad_silence=None
+    )
+    gateway = voice_gateway.VoiceGateway(voice_gateway.PERSONAS["robin"], client=client, pool_size=0)
+
+    async def serve():
+        task = asyncio.create_task(voice_gateway.serve(gateway, "127.0.0.1", port))
+        await asyncio.sleep(0.2)
+        ready.put(time.process_time())  # CPU spent starting up, not serving
+        await task
+
+    asyncio.run(serve())
+
+
+async def receive_turn(channel):
+    """Hear one reply out; returns (first audio time, gaps between frames)"""
+    first, last, gaps = None, None, []
+    async for message in channel.websocket:
+        data, audio = channel.parse(message)
+        if audio is not None:
+            now = time.perf_counter()
+            if first is None:
+                first = now
+            else:
+                gaps.append(now - last)
+            last = now
+        elif data.get("type") == "turn_complete":
+            return first, gaps
+    raise ConnectionError("gateway closed the call")
+
+
+async def caller(url, options, ttfa, jitter):
+    subprotocols = None if options.json else [BINARY_SUBPROTOCOL]
+    async with websockets.connect(url, subprotocols=subprotocols, compression=None) as websocket:
+        channel = AudioChannel(websocket, output_rate=INPUT_SAMPLE_RATE)
+        await receive_turn(channel)  # greeting
+        frames = int(options.speech / FRAME_SECONDS)
+        for _ in range(options.turns):
+            start = time.perf_counter()
+            for i in range(frames):
+                await channel.send_audio(MIC_FRAME)
+                await asyncio.sleep(max(0, start + (i + 1) * FRAME_SECONDS - time.perf_counter()))
+            await channel.send_control({"type": "audio_end"})
+            turn_end = time.perf_counter()
+            first, gaps = await receive_turn(channel)
+            ttfa.append(first - turn_end)
+            jitter.extend(abs(gap - REPLY_CHUNK_SECONDS) for gap in gaps)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(fraction * (len(values) - 1)))]
+
+
+def measure(callers, options):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    ready = multiprocessing.Queue()
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    gateway = multiprocessing.Process(target=run_gateway, args=(port, options, ready))
+    gateway.start()
+    startup_cpu = ready.get(timeout=30)
+
+    ttfa, jitter = [], []
+
+    async def run():
+        url = f"ws://127.0.0.1:{port}"
+        await asyncio.gather(*(caller(url, options, ttfa, jitter) for _ in range(callers)))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    gateway.terminate()  # SIGTERM: graceful shutdown
+    gateway.join()
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime) - startup_cpu
+    cpu_per_stream = cpu / callers / elapsed  # CPU seconds per second of call, per caller
+    return {
+        "TTFA p50": percentile(ttfa, 0.5) * 1000,
+        "TTFA p99": percentile(ttfa, 0.99) * 1000,
+        "jitter p50": percentile(jitter, 0.5) * 1000,
+        "jitter p99": percentile(jitter, 0.99) * 1000,
+        "CPU ms/s": cpu_per_stream * 1000,
+        "% core": cpu_per_stream * 100,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--callers", default="1,10,100", help="concurrency levels")
+    parser.add_argument("--turns", type=int, default=3, help="spoken turns per call")
+    parser.add_argument("--speech", type=float, default=1.0, help="seconds of microphone audio per turn")
+    parser.add_argument("--reply-ms", type=float, default=300, help="stand-in time from turn end to first audio")
+    parser.add_argument("--reply-seconds", type=float, default=2.0, help="stand-in reply length")
+    parser.add_argument("--connect-ms", type=float, default=400, help="stand-in time to open a Live session")
+    parser.add_argument("--json", action="store_true", help="legacy base64-in-JSON audio instead of binary frames")
+    options = parser.parse_args()
+
+    rows = [(int(n), measure(int(n), options)) for n in options.callers.split(",")]
+
+    print(f"Voice gateway vs fake Live ({'json' if options.json else 'binary'} audio, {os.cpu_count()} CPUs): "
+          f"{options.turns} turns of {options.speech:g}s speech, reply after {options.reply_ms:g} ms")
+    print("All times in ms; CPU per second of call per caller")
+    columns = list(rows[0][1])
+    print(f"{'callers':>8}" + "".join(f"{column:>12}" for column in columns))
+    for callers, result in rows:
+        print(f"{callers:>8}" + "".join(f"{result[column]:>12.2f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
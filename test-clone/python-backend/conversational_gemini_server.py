@@ -4,13 +4,13 @@ Conversational Gemini Live API Server - Real continuous streaming like Google's
 """
 import os
 import asyncio
-import base64
 import json
 import logging
 import websockets
 import traceback
 from google import genai
 from google.genai import types
+from voice_protocol import AudioChannel, SERVE_OPTIONS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -62,6 +62,7 @@ class ConversationalGeminiServer:
                 self.active_connections[client_id] = {
                     'websocket': websocket,
                     'session': session,
+                    'channel': AudioChannel(websocket),
                     'running': True,
                     'audio_buffer': [],
                     'is_streaming': False
@@ -104,13 +105,14 @@ class ConversationalGeminiServer:
             
         websocket = conn['websocket']
         session = conn['session']
+        channel = conn['channel']
         
         try:
             async for message in websocket:
                 if not conn['running']:
                     break
                     
-                data = json.loads(message)
+                data, audio_data = channel.parse(message, audio_type="audio_chunk")
                 logger.info(f"Client {client_id} message: {data.get('type')}")
                 
                 if data.get("type") == "audio_start":
@@ -121,7 +123,6 @@ class ConversationalGeminiServer:
                     
                 elif data.get("type") == "audio_chunk":
                     # Real-time audio streaming
-                    audio_data = base64.b64decode(data["data"])
                     await session.send(input=audio_data)
                     
                 elif data.get("type") == "audio_end":
@@ -153,8 +154,8 @@ class ConversationalGeminiServer:
         if not conn:
             return
             
-        websocket = conn['websocket']
         session = conn['session']
+        channel = conn['channel']
         
         try:
             while conn['running']:
@@ -175,10 +176,10 @@ class ConversationalGeminiServer:
                     # Send text response immediately
                     if response.text is not None:
                         logger.info(f"Sending text to {client_id}: {response.text}")
-                        await websocket.send(json.dumps({
+                        await channel.send_control({
                             "type": "text",
                             "text": response.text
-                        }))
+                        })
                         
         except Exception as e:
             logger.error(f"Error handling Gemini responses for {client_id}: {e}")
@@ -190,7 +191,7 @@ class ConversationalGeminiServer:
         if not conn:
             return
             
-        websocket = conn['websocket']
+        channel = conn['channel']
         
         try:
             while conn['running']:
@@ -204,11 +205,7 @@ class ConversationalGeminiServer:
                     
                     if combined_audio:
                         logger.info(f"Streaming combined audio to {client_id}: {len(combined_audio)} bytes")
-                        await websocket.send(json.dumps({
-                            "type": "audio_stream",
-                            "data": base64.b64encode(combined_audio).decode(),
-                            "stream": True
-                        }))
+                        await channel.send_audio(combined_audio, json_type="audio_stream", stream=True)
                     
                     # Check if more audio is coming
                     await asyncio.sleep(0.1)  # Small delay for buffering
@@ -216,10 +213,10 @@ class ConversationalGeminiServer:
                     # Stop streaming if no more audio
                     if not conn['audio_buffer']:
                         conn['is_streaming'] = False
-                        await websocket.send(json.dumps({
+                        await channel.send_control({
                             "type": "audio_end",
                             "stream": False
-                        }))
+                        })
                 else:
                     await asyncio.sleep(0.05)  # Wait for audio
                     
@@ -252,7 +249,8 @@ async def main():
             ping_interval=20,
             ping_timeout=10,
             max_size=10**7,
-            compression=None
+            compression=None,
+            **SERVE_OPTIONS  # Binary PCM frames for clients that ask for them
         ):
             logger.info("Conversational WebSocket server is running...")
             await asyncio.Future()  # Run forever
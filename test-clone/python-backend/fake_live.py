@@ -0,0 +1,171 @@
+"""
+Local stand-in for the Gemini Live API, for load tests and benchmarks.
+
+Implements the part of google-genai the voice servers use:
+
+    client = FakeClient(connect_latency=0.4, response_latency=0.8)
+    async with client.aio.live.connect(model=MODEL, config=CONFIG) as session:
+        await session.send_client_content(turns=[...], turn_complete=True)
+        await session.send_realtime_input(audio={"data": pcm, "mime_type": "audio/pcm"})
+        await session.send_realtime_input(audio_stream_end=True)
+        await session.send(input="text", end_of_turn=True)  # legacy API
+        async for response in session.receive():  # one turn, up to turn_complete
+            response.data, response.text, response.server_content.turn_complete
+
+A turn ends with send_client_content(turn_complete=True), send(end_of_turn=True),
+send_realtime_input(audio_stream_end=True), or, like the Live API's
+voice activity detection, `vad_silence` seconds after the last audio chunk.
+The reply starts `response_latency` seconds after the turn ends: `turn_seconds`
+of silent 24 kHz PCM in chunks of `chunk_bytes`, paced in real time unless
+realtime=False, then a turn_complete message (with an output transcription
+when the config asks for output_audio_transcription).
+
+Messages are light stand-ins for LiveServerMessage with the same attributes,
+so the servers' code runs unchanged and the stand-in costs little CPU next
+to the server under test.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+OUTPUT_SAMPLE_RATE = 24000
+CHUNK_BYTES = 1920  # 40 ms of 24 kHz 16-bit mono
+
+
+class Transcription:
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+
+class ServerContent:
+    __slots__ = ("turn_complete", "interrupted", "output_transcription")
+
+    def __init__(self, turn_complete=False, interrupted=False, output_transcription=None):
+        self.turn_complete = turn_complete
+        self.interrupted = interrupted
+        self.output_transcription = output_transcription
+
+
+class FakeMessage:
+    """Stand-in for google.genai.types.LiveServerMessage"""
+    __slots__ = ("data", "text", "server_content")
+
+    def __init__(self, data=None, text=None, server_content=None):
+        self.data = data
+        self.text = text
+        self.server_content = server_content or ServerContent()
+
+
+class FakeSession:
+    def __init__(self, client, transcribe):
+        self.client = client
+        self.transcribe = transcribe
+        self.closed = False
+        self.audio_chunks = 0
+        self.turns = 0
+        self._messages = asyncio.Queue()
+        self._turn_ends = asyncio.Queue()
+        self._vad_timer = None
+        self._speaker = asyncio.create_task(self._speak())
+
+    async def send_client_content(self, turns=None, turn_complete=True):
+        if turn_complete:
+            self._end_turn()
+
+    async def send_realtime_input(self, audio=None, audio_stream_end=None, media=None, **kwargs):
+        if audio is not None or media is not None:
+            self._hear_audio()
+        if audio_stream_end:
+            self._end_turn()
+
+    async def send(self, input=None, end_of_turn=False):
+        if isinstance(input, (bytes, dict)):
+            self._hear_audio()
+        if end_of_turn:
+            self._end_turn()
+
+    async def receive(self):
+        """Yield the next turn's messages; ends after its turn_complete"""
+        while True:
+            message = await self._messages.get()
+            yield message
+            if message.server_content.turn_complete:
+                return
+
+    def _hear_audio(self):
+        self.audio_chunks += 1
+        vad_silence = self.client.vad_silence
+        if vad_silence:
+            if self._vad_timer:
+                self._vad_timer.cancel()
+            self._vad_timer = asyncio.get_running_loop().call_later(vad_silence, self._end_turn)
+
+    def _end_turn(self):
+        if self._vad_timer:
+            self._vad_timer.cancel()
+            self._vad_timer = None
+        self._turn_ends.put_nowait(time.perf_counter())
+
+    async def _speak(self):
+        client = self.client
+        chunk_seconds = client.chunk_bytes / 2 / OUTPUT_SAMPLE_RATE
+        chunks = max(1, round(client.turn_seconds / chunk_seconds))
+        audio = bytes(client.chunk_bytes)
+        while True:
+            turn_end = await self._turn_ends.get()
+            start = turn_end + client.response_latency
+            await asyncio.sleep(max(0, start - time.perf_counter()))
+            for i in range(chunks):
+                if client.realtime and i:
+                    # Pace against the turn's start, not the previous chunk, so delays don't add up
+                    await asyncio.sleep(max(0, start + i * chunk_seconds - time.perf_counter()))
+                self._messages.put_nowait(FakeMessage(data=audio))
+            transcription = Transcription(client.transcript) if self.transcribe else None
+            self._messages.put_nowait(FakeMessage(server_content=ServerContent(
+                turn_complete=True, output_transcription=transcription
+            )))
+            self.turns += 1
+
+    def close(self):
+        self.closed = True
+        self._speaker.cancel()
+        if self._vad_timer:
+            self._vad_timer.cancel()
+
+
+class FakeLive:
+    def __init__(self, client):
+        self.client = client
+
+    @asynccontextmanager
+    async def connect(self, model=None, config=None):
+        client = self.client
+        await asyncio.sleep(client.connect_latency)
+        session = FakeSession(client, "output_audio_transcription" in (config or {}))
+        client.opened += 1
+        client.active += 1
+        try:
+            yield session
+        finally:
+            client.active -= 1
+            session.close()
+
+
+class FakeClient:
+    """Stand-in for google.genai.Client with a scripted Live endpoint"""
+
+    def __init__(self, connect_latency=0.4, response_latency=0.8, chunk_bytes=CHUNK_BYTES,
+                 turn_seconds=2.0, realtime=True, vad_silence=0.5, transcript="สวัสดีค่ะ"):
+        self.connect_latency = connect_latency
+        self.response_latency = response_latency
+        self.chunk_bytes = chunk_bytes
+        self.turn_seconds = turn_seconds
+        self.realtime = realtime
+        self.vad_silence = vad_silence
+        self.transcript = transcript
+        self.opened = 0
+        self.active = 0
+        self.aio = SimpleNamespace(live=FakeLive(self))
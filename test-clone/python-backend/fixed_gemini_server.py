@@ -5,12 +5,12 @@ Based on official examples with stability improvements
 """
 import os
 import asyncio
-import base64
 import json
 import logging
 import websockets
 import traceback
 from google import genai
+from voice_protocol import AudioChannel, SERVE_OPTIONS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -55,6 +55,7 @@ class FixedGeminiServer:
                 self.active_connections[client_id] = {
                     'websocket': websocket,
                     'session': session,
+                    'channel': AudioChannel(websocket),
                     'running': True
                 }
                 
@@ -94,18 +95,18 @@ class FixedGeminiServer:
             
         websocket = conn['websocket']
         session = conn['session']
+        channel = conn['channel']
         
         try:
             async for message in websocket:
                 if not conn['running']:
                     break
                     
-                data = json.loads(message)
+                data, audio_data = channel.parse(message, audio_type="audio")
                 logger.info(f"Client {client_id} message: {data.get('type')}")
                 
                 if data.get("type") == "audio":
                     # Handle audio data
-                    audio_data = base64.b64decode(data["data"])
                     logger.info(f"Received audio: {len(audio_data)} bytes")
                     
                     # Send audio to Gemini in chunks
@@ -142,8 +143,8 @@ class FixedGeminiServer:
         if not conn:
             return
             
-        websocket = conn['websocket']
         session = conn['session']
+        channel = conn['channel']
         
         try:
             async for response in session.receive():
@@ -153,18 +154,15 @@ class FixedGeminiServer:
                 # Send audio response
                 if response.data is not None:
                     logger.info(f"Sending audio to {client_id}: {len(response.data)} bytes")
-                    await websocket.send(json.dumps({
-                        "type": "audio",
-                        "data": base64.b64encode(response.data).decode()
-                    }))
+                    await channel.send_audio(response.data)
                 
                 # Send text response
                 if response.text is not None:
                     logger.info(f"Sending text to {client_id}: {response.text}")
-                    await websocket.send(json.dumps({
+                    await channel.send_control({
                         "type": "text",
                         "text": response.text
-                    }))
+                    })
                     
         except Exception as e:
             logger.error(f"Error handling Gemini responses for {client_id}: {e}")
@@ -196,7 +194,8 @@ async def main():
             ping_interval=20,
             ping_timeout=10,
             max_size=10**7,  # 10MB max message size
-            compression=None  # Disable compression for audio
+            compression=None,  # Disable compression for audio
+            **SERVE_OPTIONS  # Binary PCM frames for clients that ask for them
         ):
             logger.info("WebSocket server is running...")
             await asyncio.Future()  # Run forever
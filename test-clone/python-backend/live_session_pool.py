@@ -0,0 +1,216 @@
+"""
+Warm Gemini Live sessions for the voice gateway.
+
+Opening a Live session and having Robin speak the greeting takes seconds,
+and without a pool callers sit through it in silence. LiveSessionPool
+keeps, per persona:
+
+- a pre-rendered greeting: the audio Gemini spoke in reply to the
+  persona's greeting turn, rendered once and replayed to every caller from
+  memory;
+- `size` sessions that are already connected, with their context seeded
+  with that greeting exchange, so the conversation picks up as if Gemini
+  had just greeted the caller live.
+
+A caller takes a warm session (or, when the pool is empty, gets a freshly
+opened and seeded one), hears the cached greeting at once, and the pool
+opens a replacement in the background. Sessions are never handed to a
+second caller: each call leaves its conversation in the session context.
+
+Idle sessions are closed and replaced after `idle_timeout` seconds, before
+the Live API ends the connection on its own, and every `health_interval`
+seconds sessions whose connection has closed are dropped.
+"""
+import asyncio
+import collections
+import logging
+import time
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+# Live API connections last about 10 minutes; retire idle ones well before
+IDLE_TIMEOUT = 240
+HEALTH_INTERVAL = 15
+# Backoff after failing to open a session or render the greeting
+RETRY_DELAY = 5
+
+
+class GreetingAudio:
+    """The persona's rendered greeting: audio chunks and, if reported, their transcript"""
+    __slots__ = ("chunks", "transcript")
+
+    def __init__(self, chunks, transcript):
+        self.chunks = chunks
+        self.transcript = transcript
+
+
+class WarmSession:
+    __slots__ = ("context", "session", "greeting", "opened")
+
+    def __init__(self, context, session):
+        self.context = context  # the live.connect() context manager, exited on close
+        self.session = session
+        self.greeting = None  # the GreetingAudio seeded into its context
+        self.opened = time.monotonic()
+
+
+def is_open(session):
+    """Whether the Live session's connection is still up"""
+    if getattr(session, "closed", False):
+        return False
+    ws = getattr(session, "_ws", None)  # google-genai AsyncSession's websocket
+    return ws is None or getattr(ws, "close_code", None) is None
+
+
+class LiveSessionPool:
+    def __init__(self, client, persona, size=2, idle_timeout=IDLE_TIMEOUT, health_interval=HEALTH_INTERVAL):
+        self.client = client
+        self.persona = persona
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.health_interval = health_interval
+        self.greeting = None
+        self.hits = 0
+        self.misses = 0
+        self._ready = collections.deque()
+        self._stale = []
+        self._opening = set()
+        self._wakeup = asyncio.Event()
+        self._maintainer = None
+
+    async def start(self):
+        """Render the greeting and fill the pool in the background"""
+        self._maintainer = asyncio.create_task(self._maintain())
+
+    async def close(self):
+        if self._maintainer:
+            self._maintainer.cancel()
+            await asyncio.gather(self._maintainer, return_exceptions=True)
+        for task in list(self._opening):
+            task.cancel()
+        await asyncio.gather(*self._opening, return_exceptions=True)
+        for warm in self._stale + list(self._ready):
+            await self._discard(warm)
+        self._stale.clear()
+        self._ready.clear()
+
+    @asynccontextmanager
+    async def session(self):
+        """Yield (session, greeting) for one call and close the session afterwards.
+
+        The session is warm if one is ready. greeting is the GreetingAudio its
+        context was seeded with, to be played to the caller, or None when the
+        greeting is not rendered yet and Gemini has to speak it live.
+        """
+        warm = self._take()
+        if warm:
+            self.hits += 1
+        else:
+            self.misses += 1
+            warm = await self._open()
+        self._wakeup.set()  # top the pool back up
+        try:
+            yield warm.session, warm.greeting
+        finally:
+            await self._discard(warm)
+
+    def _take(self):
+        now = time.monotonic()
+        while self._ready:
+            warm = self._ready.popleft()  # oldest first, before it idles out
+            if now - warm.opened < self.idle_timeout and is_open(warm.session):
+                return warm
+            self._stale.append(warm)  # closed by the maintainer
+        return None
+
+    async def _open(self):
+        context = self.client.aio.live.connect(model=self.persona.model, config=self.persona.live_config())
+        session = await context.__aenter__()
+        warm = WarmSession(context, session)
+        try:
+            if self.greeting:
+                await self._seed(session, self.greeting)
+                warm.greeting = self.greeting
+        except BaseException:
+            await self._discard(warm)
+            raise
+        return warm
+
+    async def _seed(self, session, greeting):
+        """Put the greeting exchange in the session context without asking for a reply"""
+        await session.send_client_content(
+            turns=[
+                {"role": "user", "parts": [{"text": self.persona.greeting}]},
+                {"role": "model", "parts": [{"text": greeting.transcript or self.persona.greeting}]},
+            ],
+            turn_complete=False
+        )
+
+    async def _discard(self, warm):
+        try:
+            await warm.context.__aexit__(None, None, None)
+        except Exception as e:
+            logger.debug(f"Closing a Live session failed: {e}")
+
+    async def render_greeting(self):
+        """Have Gemini speak the greeting once and keep the audio"""
+        config = dict(self.persona.live_config(), output_audio_transcription={})
+        chunks, transcript = [], []
+        async with self.client.aio.live.connect(model=self.persona.model, config=config) as session:
+            await session.send_client_content(
+                turns=[{"role": "user", "parts": [{"text": self.persona.greeting}]}],
+                turn_complete=True
+            )
+            async for response in session.receive():
+                if response.data is not None:
+                    chunks.append(response.data)
+                server_content = getattr(response, "server_content", None)
+                transcription = getattr(server_content, "output_transcription", None)
+                if getattr(transcription, "text", None):
+                    transcript.append(transcription.text)
+                if getattr(server_content, "turn_complete", None):
+                    break
+        if not chunks:
+            raise RuntimeError("Gemini sent no greeting audio")
+        return GreetingAudio(chunks, "".join(transcript) or None)
+
+    async def _fill(self):
+        task = asyncio.current_task()
+        try:
+            self._ready.append(await self._open())
+        except Exception as e:
+            logger.warning(f"⚠️ Warming a {self.persona.name} session failed: {e}")
+            await asyncio.sleep(RETRY_DELAY)
+        finally:
+            self._opening.discard(task)
+            self._wakeup.set()
+
+    async def _maintain(self):
+        while True:
+            self._wakeup.clear()
+            if self.greeting is None and self.persona.greeting:
+                try:
+                    self.greeting = await self.render_greeting()
+                    logger.info(f"🎵 {self.persona.name} greeting rendered: {len(self.greeting.chunks)} chunks")
+                except Exception as e:
+                    logger.warning(f"⚠️ Rendering the {self.persona.name} greeting failed: {e}")
+                    await asyncio.sleep(RETRY_DELAY)
+                    continue
+
+            # Retire sessions that idled out or lost their connection
+            while self._stale:
+                await self._discard(self._stale.pop())
+            now = time.monotonic()
+            for warm in list(self._ready):
+                if now - warm.opened >= self.idle_timeout or not is_open(warm.session):
+                    self._ready.remove(warm)
+                    await self._discard(warm)
+
+            for _ in range(self.size - len(self._ready) - len(self._opening)):
+                self._opening.add(asyncio.create_task(self._fill()))
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.health_interval)
+            except asyncio.TimeoutError:
+                pass
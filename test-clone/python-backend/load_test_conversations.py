@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Load test: N simultaneous callers against one voice server process
+
+Serves stable_conversational_server.StableConversationalAgent (or, with
+--server gateway, voice_gateway.VoiceGateway) in-process with a scripted stand-in for the Gemini Live client (no API key or network)
+and connects --clients callers at once, half of them in binary and half in
+JSON mode. Each caller:
+
+1. waits for the greeting turn,
+2. sends a text turn and checks the spoken reply is its own,
+3. odd callers send "stop_listening",
+4. streams --chunks microphone chunks,
+5. sends a probe turn; the stand-in answers with how many audio chunks
+   reached that caller's Live session: all of them if the caller is
+   listening, none if it stopped listening.
+
+With shared agent state, one caller's "stop_listening" or turn end flips the
+gate for everybody and the counts come out wrong. Exits non-zero on any
+mismatch.
+
+Usage:
+    python load_test_conversations.py [--clients 50] [--chunks 25] [--server stable|gateway]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import websockets
+
+import stable_conversational_server
+import voice_gateway
+from voice_protocol import AudioChannel, BINARY_SUBPROTOCOL, SERVE_OPTIONS
+
+MIC_CHUNK = bytes(640)  # 20 ms of 16 kHz silence, above the server's 100-byte floor
+
+
+def live_message(data=None, turn_complete=False):
+    return SimpleNamespace(data=data, text=None, server_content=SimpleNamespace(turn_complete=turn_complete))
+
+
+class ScriptedLiveSession:
+    """Answers each turn with its text, plus the audio chunks received so far."""
+
+    def __init__(self):
+        self.audio_chunks = 0
+        self.turns = asyncio.Queue()
+
+    async def send_client_content(self, turns, turn_complete=True):
+        await self.turns.put(turns[0]["parts"][0]["text"])
+
+    async def send_realtime_input(self, audio):
+        self.audio_chunks += 1
+
+    async def receive(self):
+        text = await self.turns.get()
+        reply = f"{text}|{self.audio_chunks}".encode()
+        yield live_message(data=reply)
+        yield live_message(turn_complete=True)
+
+
+class ScriptedLive:
+    def __init__(self):
+        self.sessions = []
+
+    @asynccontextmanager
+    async def connect(self, model, config):
+        session = ScriptedLiveSession()
+        self.sessions.append(session)
+        yield session
+
+
+def scripted_client():
+    return SimpleNamespace(aio=SimpleNamespace(live=ScriptedLive()))
+
+
+async def receive_turn(channel):
+    """Collect one spoken turn; returns the concatenated audio."""
+    audio = bytearray()
+    async for message in channel.websocket:
+        data, pcm = channel.parse(message)
+        if pcm is not None:
+            audio += pcm
+        elif data.get("type") == "turn_complete":
+            return bytes(audio)
+    raise ConnectionError("server closed the connection mid-turn")
+
+
+async def caller(url, index, chunks):
+    binary = index % 2 == 0
+    subprotocols = [BINARY_SUBPROTOCOL] if binary else None
+    name = f"caller-{index}"
+    async with websockets.connect(url, subprotocols=subprotocols, compression=None) as websocket:
+        channel = AudioChannel(websocket, output_rate=16000)
+        errors = []
+
+        await receive_turn(channel)  # greeting
+
+        await channel.send_control({"type": "text", "text": name})
+        reply = (await receive_turn(channel)).decode()
+        if not reply.startswith(f"{name}|"):
+            errors.append(f"{name}: got another caller's reply {reply!r}")
+
+        listening = index % 2 == 0
+        if not listening:
+            await channel.send_control({"type": "stop_listening"})
+        for _ in range(chunks):
+            await channel.send_audio(MIC_CHUNK, json_type="audio_continuous")
+            await asyncio.sleep(0)  # interleave with the other callers
+
+        await channel.send_control({"type": "text", "text": f"{name} probe"})
+        reply = (await receive_turn(channel)).decode()
+        expected = f"{name} probe|{chunks if listening else 0}"
+        if reply != expected:
+            errors.append(f"{name}: expected {expected!r}, got {reply!r}")
+        return errors
+
+
+def make_server(name):
+    """The server under test and its registry of active connections"""
+    if name == "gateway":
+        gateway = voice_gateway.VoiceGateway(voice_gateway.PERSONAS["robin"], client=scripted_client())
+        return gateway.handle_connection, gateway.connections
+    agent = stable_conversational_server.StableConversationalAgent(client=scripted_client())
+    return agent.handle_connection, agent.sessions
+
+
+async def run(clients, chunks, server_name):
+    handle_connection, active = make_server(server_name)
+    peak = 0
+
+    async def track(websocket):
+        nonlocal peak
+        handler = asyncio.ensure_future(handle_connection(websocket))
+        await asyncio.sleep(0)
+        peak = max(peak, len(active))
+        await handler
+
+    async with websockets.serve(track, "127.0.0.1", 0, compression=None, **SERVE_OPTIONS) as ws_server:
+        url = f"ws://127.0.0.1:{ws_server.sockets[0].getsockname()[1]}"
+        start = time.perf_counter()
+        results = await asyncio.gather(*(caller(url, i, chunks) for i in range(clients)), return_exceptions=True)
+        elapsed = time.perf_counter() - start
+
+        for _ in range(100):  # let the handlers finish their cleanup
+            if not active:
+                break
+            await asyncio.sleep(0.01)
+
+    errors = []
+    for index, result in enumerate(results):
+        if isinstance(result, BaseException):
+            errors.append(f"caller-{index}: {result!r}")
+        else:
+            errors.extend(result)
+    if active:
+        errors.append(f"{len(active)} sessions left after all callers hung up")
+    return errors, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=25, help="microphone chunks per caller")
+    parser.add_argument("--server", choices=("stable", "gateway"), default="stable")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    errors, peak, elapsed = asyncio.run(run(args.clients, args.chunks, args.server))
+
+    print(f"{args.server}: {args.clients} callers, {args.chunks} audio chunks each, peak {peak} concurrent sessions, {elapsed:.2f}s")
+    for error in errors:
+        print(f"❌ {error}")
+    if errors:
+        sys.exit(1)
+    print("✅ Per-caller state stayed isolated")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,13 @@ Uses Gemini 2.5 Flash with Zephyr voice for perfect audio quality
 """
 import os
 import asyncio
-import base64
 import json
 import logging
 import websockets
 import traceback
 from google import genai
 from google.genai import types
+from voice_protocol import AudioChannel, SERVE_OPTIONS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -62,6 +62,7 @@ class OfficialGeminiServer:
                 self.active_connections[client_id] = {
                     'websocket': websocket,
                     'session': session,
+                    'channel': AudioChannel(websocket),
                     'running': True
                 }
                 
@@ -101,18 +102,18 @@ class OfficialGeminiServer:
             
         websocket = conn['websocket']
         session = conn['session']
+        channel = conn['channel']
         
         try:
             async for message in websocket:
                 if not conn['running']:
                     break
                     
-                data = json.loads(message)
+                data, audio_data = channel.parse(message, audio_type="audio")
                 logger.info(f"Client {client_id} message: {data.get('type')}")
                 
                 if data.get("type") == "audio":
                     # Handle audio data using official method
-                    audio_data = base64.b64decode(data["data"])
                     logger.info(f"Received audio: {len(audio_data)} bytes")
                     
                     # Send audio using deprecated but working send method
@@ -146,8 +147,8 @@ class OfficialGeminiServer:
         if not conn:
             return
             
-        websocket = conn['websocket']
         session = conn['session']
+        channel = conn['channel']
         
         try:
             while conn['running']:
@@ -159,20 +160,17 @@ class OfficialGeminiServer:
                     # Send audio response with slight delay to prevent overlapping
                     if response.data is not None:
                         logger.info(f"Sending audio to {client_id}: {len(response.data)} bytes")
-                        await websocket.send(json.dumps({
-                            "type": "audio",
-                            "data": base64.b64encode(response.data).decode()
-                        }))
+                        await channel.send_audio(response.data)
                         # Small delay to prevent audio overlap
                         await asyncio.sleep(0.05)
                     
                     # Send text response
                     if response.text is not None:
                         logger.info(f"Sending text to {client_id}: {response.text}")
-                        await websocket.send(json.dumps({
+                        await channel.send_control({
                             "type": "text",
                             "text": response.text
-                        }))
+                        })
                         
         except Exception as e:
             logger.error(f"Error handling Gemini responses for {client_id}: {e}")
@@ -204,7 +202,8 @@ async def main():
             ping_interval=20,
             ping_timeout=10,
             max_size=10**7,
-            compression=None
+            compression=None,
+            **SERVE_OPTIONS  # Binary PCM frames for clients that ask for them
         ):
             logger.info("WebSocket server is running...")
             await asyncio.Future()  # Run forever
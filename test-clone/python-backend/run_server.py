@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 """
 Simple script to run the conversational voice agent
+
+Arguments are passed on to voice_gateway.py, e.g. --persona robin --workers 4
 """
 import subprocess
 import sys
@@ -19,8 +21,9 @@ def main():
         print("🔧 Activating virtual environment...")
         subprocess.run([
             "/bin/bash", "-c", 
-            "source venv/bin/activate && python3 working_server.py"
-        ], check=True)
+            "source venv/bin/activate && python3 voice_gateway.py \"$@\"",
+            "run_server"
+        ] + sys.argv[1:], check=True)
     except KeyboardInterrupt:
         print("\n⏹️  Server stopped by user")
     except Exception as e:
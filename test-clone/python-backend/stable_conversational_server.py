@@ -4,13 +4,12 @@ Stable Conversational Voice Agent - Connection Stability Focused
 """
 import asyncio
 import os
-import json
 import logging
 import websockets
-import base64
 from google import genai
 import signal
 import sys
+from voice_protocol import AudioChannel, SERVE_OPTIONS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -33,36 +32,72 @@ CONFIG = {
     }
 }
 
-class StableConversationalAgent:
-    def __init__(self):
+class ConversationSession:
+    """Turn and audio state of one connected caller.
+
+    Each connection gets its own, so callers sharing a server process never
+    open or close each other's listening gate.
+    """
+
+    def __init__(self, connection_id, channel):
+        self.connection_id = connection_id
+        self.channel = channel
+        self.live = None  # Gemini Live session, once connected
         self.is_listening = True
         self.is_speaking = False
+        self.message_count = 0
+        self.response_count = 0
+
+    def start_speaking(self):
+        self.is_speaking = True
+        self.is_listening = False
+
+    def finish_turn(self):
+        self.is_speaking = False
+        self.is_listening = True
+
+
+def is_turn_complete(response):
+    """Whether a Live API message ends Robin's turn (turn_complete lives on server_content)."""
+    server_content = getattr(response, "server_content", None)
+    return bool(getattr(server_content, "turn_complete", None) or getattr(response, "turn_complete", None))
+
+
+class StableConversationalAgent:
+    def __init__(self, client=None):
+        # Shared by all connections: only the counter for connection ids and the
+        # Gemini client; per-caller state lives in ConversationSession
+        self.client = client
         self.connection_count = 0
+        self.sessions = {}
         self.heartbeat_interval = 30  # Send heartbeat every 30 seconds
         
     async def handle_connection(self, websocket):
         """Handle conversational connection with stability measures"""
         self.connection_count += 1
         connection_id = self.connection_count
-        logger.info(f"👋 Client #{connection_id} connected for conversation")
+        conversation = ConversationSession(connection_id, AudioChannel(websocket))
+        self.sessions[connection_id] = conversation
+        logger.info(f"👋 Client #{connection_id} connected for conversation ({'binary' if conversation.channel.binary else 'json'} audio, {len(self.sessions)} active)")
         
         # Set connection parameters for stability
         websocket.ping_interval = 20
         websocket.ping_timeout = 10
         websocket.close_timeout = 5
         
-        gemini_session = None
         heartbeat_task = None
+        gemini_task = None
+        frontend_task = None
         
         try:
-            client = genai.Client()
+            client = self.client or genai.Client()
             
             async with client.aio.live.connect(model=MODEL, config=CONFIG) as session:
-                gemini_session = session
+                conversation.live = session
                 logger.info(f"✅ Client #{connection_id} connected to Gemini")
                 
                 # Start heartbeat to keep connection alive
-                heartbeat_task = asyncio.create_task(self.heartbeat(websocket, connection_id))
+                heartbeat_task = asyncio.create_task(self.heartbeat(conversation))
                 
                 # Send initial greeting using newer API method
                 await session.send_client_content(
@@ -72,17 +107,14 @@ class StableConversationalAgent:
                 logger.info(f"🗣️ Client #{connection_id}: Initial greeting sent")
                 
                 # Set initial listening state - Robin will speak first
-                self.is_listening = False
-                self.is_speaking = True
+                conversation.start_speaking()
                 
-                # Handle conversation with timeout protection
-                await asyncio.wait_for(
-                    asyncio.gather(
-                        self.handle_frontend(websocket, session, connection_id),
-                        self.handle_gemini(websocket, session, connection_id)
-                    ),
-                    timeout=None  # No overall timeout, but individual operations have timeouts
-                )
+                # Relay both ways until the caller hangs up or the Gemini session ends
+                gemini_task = asyncio.create_task(self.handle_gemini(conversation))
+                frontend_task = asyncio.create_task(self.handle_frontend(conversation))
+                await asyncio.wait((gemini_task, frontend_task), return_when=asyncio.FIRST_COMPLETED)
+                if gemini_task.done():
+                    logger.info(f"🔚 Client #{connection_id}: Gemini session ended, closing the call")
                 
         except websockets.exceptions.ConnectionClosed as e:
             logger.warning(f"🔌 Client #{connection_id} disconnected: {e}")
@@ -94,21 +126,24 @@ class StableConversationalAgent:
             traceback.print_exc()
         finally:
             # Cleanup
-            if heartbeat_task:
-                heartbeat_task.cancel()
+            for task in (heartbeat_task, gemini_task, frontend_task):
+                if task:
+                    task.cancel()
+            del self.sessions[connection_id]
             logger.info(f"🧹 Client #{connection_id} cleanup complete")
 
-    async def heartbeat(self, websocket, connection_id):
+    async def heartbeat(self, conversation):
         """Send periodic heartbeat to keep connection alive"""
+        connection_id = conversation.connection_id
         try:
             while True:
                 await asyncio.sleep(self.heartbeat_interval)
-                if websocket.closed:
+                if conversation.channel.websocket.closed:
                     break
                     
                 try:
                     await asyncio.wait_for(
-                        websocket.send(json.dumps({"type": "heartbeat"})),
+                        conversation.channel.send_control({"type": "heartbeat"}),
                         timeout=5
                     )
                     logger.debug(f"💓 Heartbeat sent to client #{connection_id}")
@@ -119,40 +154,42 @@ class StableConversationalAgent:
         except asyncio.CancelledError:
             logger.debug(f"💓 Heartbeat cancelled for client #{connection_id}")
 
-    async def handle_frontend(self, websocket, session, connection_id):
+    async def handle_frontend(self, conversation):
         """Handle frontend messages with error resilience"""
-        message_count = 0
+        connection_id = conversation.connection_id
         
         try:
-            async for message in websocket:
-                message_count += 1
+            async for message in conversation.channel.websocket:
+                conversation.message_count += 1
                 
                 try:
                     # Add timeout for message processing
                     await asyncio.wait_for(
-                        self.process_message(message, session, connection_id, message_count),
+                        self.process_message(conversation, message),
                         timeout=10
                     )
                 except asyncio.TimeoutError:
-                    logger.error(f"⏰ Message #{message_count} timeout for client #{connection_id}")
+                    logger.error(f"⏰ Message #{conversation.message_count} timeout for client #{connection_id}")
                 except Exception as e:
-                    logger.error(f"❌ Message #{message_count} error for client #{connection_id}: {e}")
+                    logger.error(f"❌ Message #{conversation.message_count} error for client #{connection_id}: {e}")
                     
         except websockets.exceptions.ConnectionClosed:
             logger.info(f"🔌 Frontend connection closed for client #{connection_id}")
         except Exception as e:
             logger.error(f"❌ Frontend error for client #{connection_id}: {e}")
 
-    async def process_message(self, message, session, connection_id, message_count):
+    async def process_message(self, conversation, message):
         """Process individual message with timeout protection"""
+        connection_id = conversation.connection_id
+        session = conversation.live
         try:
-            data = json.loads(message)
+            data, audio_data = conversation.channel.parse(message, audio_type="audio_continuous")
             msg_type = data.get("type", "unknown")
             
             if msg_type == "text":
                 user_text = data.get("text", "")
-                logger.info(f"💬 Client #{connection_id} message #{message_count}: {user_text}")
-                self.is_listening = False
+                logger.info(f"💬 Client #{connection_id} message #{conversation.message_count}: {user_text}")
+                conversation.is_listening = False
                 
                 # Use new API method
                 await session.send_client_content(
@@ -161,25 +198,24 @@ class StableConversationalAgent:
                 )
                 
             elif msg_type == "audio_continuous":
-                if self.is_listening:
+                if conversation.is_listening:
                     try:
-                        audio_data = base64.b64decode(data["data"])
                         if len(audio_data) > 100:  # Only process non-trivial audio
-                            logger.info(f"🎤 Client #{connection_id} processing audio chunk: {len(audio_data)} bytes")
+                            logger.debug(f"🎤 Client #{connection_id} processing audio chunk: {len(audio_data)} bytes")
                             await session.send_realtime_input(
                                 audio={"data": audio_data, "mime_type": "audio/pcm"}
                             )
                     except Exception as e:
                         logger.error(f"❌ Audio processing error: {e}")
                 else:
-                    logger.debug(f"🔇 Client #{connection_id} ignoring audio - not listening (listening={self.is_listening}, speaking={self.is_speaking})")
+                    logger.debug(f"🔇 Client #{connection_id} ignoring audio - not listening (listening={conversation.is_listening}, speaking={conversation.is_speaking})")
                     
             elif msg_type == "start_listening":
-                self.is_listening = True
+                conversation.is_listening = True
                 logger.info(f"👂 Client #{connection_id} listening mode ON")
                 
             elif msg_type == "stop_listening":
-                self.is_listening = False
+                conversation.is_listening = False
                 logger.info(f"🔇 Client #{connection_id} listening mode OFF")
                 
             elif msg_type == "heartbeat":
@@ -188,65 +224,72 @@ class StableConversationalAgent:
             else:
                 logger.debug(f"🤷 Unknown message type from client #{connection_id}: {msg_type}")
                 
-        except json.JSONDecodeError as e:
-            logger.error(f"❌ JSON decode error for client #{connection_id}: {e}")
+        except ValueError as e:
+            logger.error(f"❌ Malformed message from client #{connection_id}: {e}")
 
-    async def handle_gemini(self, websocket, session, connection_id):
+    async def handle_gemini(self, conversation):
         """Handle Gemini responses with connection stability"""
-        response_count = 0
+        connection_id = conversation.connection_id
         
         try:
-            async for response in session.receive():
-                response_count += 1
-                
-                try:
-                    # Process response with timeout
-                    await asyncio.wait_for(
-                        self.process_gemini_response(response, websocket, connection_id, response_count),
-                        timeout=15
-                    )
-                except asyncio.TimeoutError:
-                    logger.error(f"⏰ Gemini response #{response_count} timeout for client #{connection_id}")
-                except Exception as e:
-                    logger.error(f"❌ Gemini response #{response_count} error for client #{connection_id}: {e}")
+            # receive() ends after each turn_complete, so keep asking for the
+            # next turn; one that ends without a message means the session closed
+            while True:
+                received = False
+                async for response in conversation.live.receive():
+                    received = True
+                    conversation.response_count += 1
                     
+                    try:
+                        # Process response with timeout
+                        await asyncio.wait_for(
+                            self.process_gemini_response(conversation, response),
+                            timeout=15
+                        )
+                    except asyncio.TimeoutError:
+                        logger.error(f"⏰ Gemini response #{conversation.response_count} timeout for client #{connection_id}")
+                    except Exception as e:
+                        logger.error(f"❌ Gemini response #{conversation.response_count} error for client #{connection_id}: {e}")
+
+                if not received:
+                    break
+                    
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error(f"❌ Gemini handler error for client #{connection_id}: {e}")
 
-    async def process_gemini_response(self, response, websocket, connection_id, response_count):
+    async def process_gemini_response(self, conversation, response):
         """Process individual Gemini response"""
+        connection_id = conversation.connection_id
+        channel = conversation.channel
         if response.data is not None:
             # Robin is speaking - stop listening
-            self.is_speaking = True
-            self.is_listening = False
+            conversation.start_speaking()
             
-            logger.info(f"🗣️ Client #{connection_id} Robin speaking: {len(response.data)} bytes (response #{response_count})")
+            logger.debug(f"🗣️ Client #{connection_id} Robin speaking: {len(response.data)} bytes (response #{conversation.response_count})")
             
-            await websocket.send(json.dumps({
-                "type": "audio",
-                "data": base64.b64encode(response.data).decode()
-            }))
+            await channel.send_audio(response.data)
             
         if response.text is not None:
             logger.info(f"💭 Client #{connection_id} Robin text: {response.text}")
-            await websocket.send(json.dumps({
+            await channel.send_control({
                 "type": "text", 
                 "text": response.text
-            }))
+            })
             
         # Check if turn is complete
-        if hasattr(response, 'turn_complete') and response.turn_complete:
+        if is_turn_complete(response):
             # Robin finished speaking - resume listening
-            self.is_speaking = False
-            self.is_listening = True
+            conversation.finish_turn()
             logger.info(f"✅ Client #{connection_id} turn complete - resuming listening")
             
-            await websocket.send(json.dumps({
+            await channel.send_control({
                 "type": "turn_complete"
-            }))
+            })
             
             # Log listening state for debugging
-            logger.info(f"🎧 Client #{connection_id} listening state: {self.is_listening}")
+            logger.info(f"🎧 Client #{connection_id} listening state: {conversation.is_listening}")
 
 def signal_handler(signum, frame):
     """Handle shutdown signals gracefully"""
@@ -272,7 +315,8 @@ async def main():
         ping_timeout=10,
         close_timeout=5,
         max_size=10 * 1024 * 1024,  # 10MB max message size
-        compression=None  # Disable compression for audio
+        compression=None,  # Disable compression for audio
+        **SERVE_OPTIONS  # Binary PCM frames for clients that ask for them
     ):
         logger.info("✅ Stable conversational agent ready on ws://localhost:8765")
         await asyncio.Future()
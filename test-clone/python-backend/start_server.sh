@@ -9,6 +9,6 @@ echo "📍 Location: $(pwd)"
 # Activate virtual environment
 source venv/bin/activate
 
-# Start the server
-echo "🎯 Starting server on ws://localhost:8765..."
-python working_server.py
\ No newline at end of file
+# Start the gateway; arguments are passed on (--persona, --port, --workers)
+echo "🎯 Starting voice gateway on ws://localhost:8765..."
+python voice_gateway.py "$@"
\ No newline at end of file
@@ -31,29 +31,38 @@ CONFIG = {
     }
 }
 
-class TrueConversationalAgent:
+class ConversationSession:
+    """Turn and voice-activity state of one connected caller"""
+
     def __init__(self):
         self.is_listening = True
         self.is_speaking = False
         self.audio_buffer = []
-        self.silence_threshold = 0.01
         self.silence_duration = 0
+
+
+class TrueConversationalAgent:
+    def __init__(self, client=None):
+        # Tuning shared by all callers; per-caller state lives in ConversationSession
+        self.client = client
+        self.silence_threshold = 0.01
         self.max_silence = 1.5  # seconds
         
     async def handle_connection(self, websocket):
         """Handle conversational connection"""
         logger.info("🎙️ Client connected for true conversation")
+        conversation = ConversationSession()
         
         try:
-            client = genai.Client()
+            client = self.client or genai.Client()
             
             async with client.aio.live.connect(model=MODEL, config=CONFIG) as session:
                 logger.info("✅ Connected to Gemini Live - Ready for conversation")
                 
                 # Handle conversation
                 await asyncio.gather(
-                    self.handle_frontend(websocket, session),
-                    self.handle_gemini_responses(websocket, session)
+                    self.handle_frontend(websocket, session, conversation),
+                    self.handle_gemini_responses(websocket, session, conversation)
                 )
                 
         except Exception as e:
@@ -61,7 +70,7 @@ class TrueConversationalAgent:
             import traceback
             traceback.print_exc()
 
-    async def handle_frontend(self, websocket, session):
+    async def handle_frontend(self, websocket, session, conversation):
         """Handle frontend messages with voice activity detection"""
         try:
             async for message in websocket:
@@ -69,29 +78,29 @@ class TrueConversationalAgent:
                 
                 if data.get("type") == "text":
                     logger.info(f"💬 User text: {data['text']}")
-                    await self.process_user_input(session, text=data["text"])
+                    await self.process_user_input(session, conversation, text=data["text"])
                     
-                elif data.get("type") == "audio_continuous" and self.is_listening:
+                elif data.get("type") == "audio_continuous" and conversation.is_listening:
                     try:
                         audio_data = base64.b64decode(data["data"])
                         
                         # Add to buffer for voice activity detection
-                        self.audio_buffer.append(audio_data)
+                        conversation.audio_buffer.append(audio_data)
                         
                         # Simple voice activity detection (check for non-silence)
                         if len(audio_data) > 100:  # Non-trivial audio
-                            self.silence_duration = 0
+                            conversation.silence_duration = 0
                             # Send realtime audio to Gemini
                             await session.send_realtime_input(
                                 audio={"data": audio_data, "mime_type": "audio/pcm"}
                             )
                         else:
-                            self.silence_duration += 0.064  # ~64ms per chunk
+                            conversation.silence_duration += 0.064  # ~64ms per chunk
                             
                             # If we detect silence after speech, process the turn
-                            if self.silence_duration > self.max_silence and len(self.audio_buffer) > 10:
-                                logger.info(f"🎤 Voice turn detected - processing {len(self.audio_buffer)} chunks")
-                                await self.process_voice_turn(session)
+                            if conversation.silence_duration > self.max_silence and len(conversation.audio_buffer) > 10:
+                                logger.info(f"🎤 Voice turn detected - processing {len(conversation.audio_buffer)} chunks")
+                                await self.process_voice_turn(session, conversation)
                         
                     except Exception as e:
                         logger.error(f"❌ Audio processing error: {e}")
@@ -99,14 +108,14 @@ class TrueConversationalAgent:
         except Exception as e:
             logger.error(f"❌ Frontend error: {e}")
 
-    async def process_voice_turn(self, session):
+    async def process_voice_turn(self, session, conversation):
         """Process a complete voice turn"""
-        if not self.audio_buffer:
+        if not conversation.audio_buffer:
             return
             
         try:
             # Stop listening while processing
-            self.is_listening = False
+            conversation.is_listening = False
             
             # Send turn complete to trigger response
             await session.send_client_content(
@@ -115,19 +124,19 @@ class TrueConversationalAgent:
             )
             
             # Clear buffer
-            self.audio_buffer = []
-            self.silence_duration = 0
+            conversation.audio_buffer = []
+            conversation.silence_duration = 0
             
             logger.info("🔄 Voice turn sent to Gemini")
             
         except Exception as e:
             logger.error(f"❌ Voice turn processing error: {e}")
-            self.is_listening = True
+            conversation.is_listening = True
 
-    async def process_user_input(self, session, text=""):
+    async def process_user_input(self, session, conversation, text=""):
         """Process user input (text or voice)"""
         try:
-            self.is_listening = False
+            conversation.is_listening = False
             
             await session.send_client_content(
                 turns=[{"role": "user", "parts": [{"text": text}]}], 
@@ -136,9 +145,9 @@ class TrueConversationalAgent:
             
         except Exception as e:
             logger.error(f"❌ Input processing error: {e}")
-            self.is_listening = True
+            conversation.is_listening = True
 
-    async def handle_gemini_responses(self, websocket, session):
+    async def handle_gemini_responses(self, websocket, session, conversation):
         """Handle Gemini responses with proper turn management"""
         try:
             audio_chunks = []
@@ -147,8 +156,8 @@ class TrueConversationalAgent:
                 
                 if response.data is not None:
                     # Robin is speaking
-                    self.is_speaking = True
-                    self.is_listening = False
+                    conversation.is_speaking = True
+                    conversation.is_listening = False
                     
                     # Collect audio chunks
                     audio_chunks.append(response.data)
@@ -169,8 +178,8 @@ class TrueConversationalAgent:
                 # Check if this response indicates end of turn
                 if hasattr(response, 'turn_complete') and response.turn_complete:
                     # Robin finished completely
-                    self.is_speaking = False
-                    self.is_listening = True
+                    conversation.is_speaking = False
+                    conversation.is_listening = True
                     logger.info(f"✅ Robin finished speaking ({len(audio_chunks)} total chunks) - resuming listening")
                     
                     await websocket.send(json.dumps({
@@ -184,8 +193,8 @@ class TrueConversationalAgent:
         except Exception as e:
             logger.error(f"❌ Gemini response error: {e}")
             # Ensure we resume listening on error
-            self.is_speaking = False
-            self.is_listening = True
+            conversation.is_speaking = False
+            conversation.is_listening = True
 
 async def main():
     """Start true conversational server"""
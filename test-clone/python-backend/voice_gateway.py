@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Voice Gateway - one production server for every voice persona
+
+Replaces the per-experiment servers (working_server.py, final_server.py,
+female_voice_server.py, ...) with a single gateway:
+
+- personas (assistant, clinic, voice, language, model, greeting) are
+  configs, not copies of the server: pick one with --persona, or add more
+  from a JSON file with --persona-file;
+- one bidirectional pump per caller: the browser -> Gemini direction relays
+  audio and turns as they arrive, the Gemini -> browser direction relays
+  every turn for as long as the call lasts, and either side hanging up
+  stops the other;
+- all turn state lives in a per-connection VoiceConnection, so a process
+  serves many callers at once;
+- SIGINT/SIGTERM stop accepting calls and close the open ones with 1001
+  ("going away") so browsers reconnect elsewhere;
+- --workers N runs N processes on the same port (SO_REUSEPORT), letting
+  the kernel spread calls across cores;
+- --pool-size N keeps N Live sessions per worker connected ahead of calls
+  and replays a pre-rendered greeting (see live_session_pool.py), so callers
+  hear Robin as soon as they connect.
+
+Browsers may negotiate binary PCM frames (see voice_protocol.py); legacy
+JSON clients work unchanged. Accepted messages: "text"/"text_input",
+audio as "audio"/"audio_chunk"/"audio_continuous"/"audio_stream",
+"audio_end", "start_listening", "stop_listening", "heartbeat".
+
+Usage:
+    GOOGLE_API_KEY=... python voice_gateway.py [--persona robin] [--port 8765] [--workers 4] [--pool-size 2]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+from contextlib import asynccontextmanager
+
+import websockets
+
+from live_session_pool import LiveSessionPool
+from voice_protocol import AudioChannel, INPUT_SAMPLE_RATE, SERVE_OPTIONS
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+# Audio message types sent by the different frontends; binary frames count as the first
+AUDIO_TYPES = ("audio", "audio_chunk", "audio_continuous", "audio_stream")
+
+# Seconds to let open calls close after a shutdown signal
+SHUTDOWN_GRACE = 5
+
+
+class Persona:
+    """Who answers the call: the Live API model, voice and instructions."""
+
+    def __init__(self, name, system_instruction, voice="Aoede", language="th-TH",
+                 model="models/gemini-2.0-flash-live-001", greeting="สวัสดีค่ะ"):
+        self.name = name
+        self.system_instruction = system_instruction
+        self.voice = voice
+        self.language = language
+        self.model = model
+        self.greeting = greeting
+
+    def live_config(self):
+        """Config for client.aio.live.connect()"""
+        return {
+            "response_modalities": ["AUDIO"],
+            "system_instruction": self.system_instruction,
+            "speech_config": {
+                "language_code": self.language,
+                "voice_config": {
+                    "prebuilt_voice_config": {
+                        "voice_name": self.voice
+                    }
+                }
+            }
+        }
+
+
+PERSONAS = {
+    "robin": Persona(
+        "robin",
+        "You are Robin, a warm and friendly female assistant for BeautyMed Clinic in Thailand. Always respond in Thai with a caring, professional tone. Keep responses concise (2-3 sentences). You help with beauty treatments, appointments, and general clinic information.",
+    ),
+    "robin-native": Persona(
+        "robin-native",
+        "คุณคือ Robin ผู้ช่วยนัดหมายของ BeautyMed Clinic คลินิกความงาม ตอบเป็นภาษาไทยเท่านั้น",
+        model="models/gemini-2.5-flash-preview-native-audio-dialog",
+        greeting="สวัสดีค่ะ ยินดีต้อนรับสู่ BeautyMed Clinic",
+    ),
+    "robin-en": Persona(
+        "robin-en",
+        "You are Robin, a warm and friendly female assistant for BeautyMed Clinic. Respond in English with a caring, professional tone. Keep responses concise (2-3 sentences). You help with beauty treatments, appointments, and general clinic information.",
+        language="en-US",
+        greeting="Hello",
+    ),
+}
+
+
+def load_personas(path):
+    """Add the personas of a JSON file: a list of Persona keyword arguments."""
+    with open(path, encoding="utf-8") as f:
+        for entry in json.load(f):
+            PERSONAS[entry["name"]] = Persona(**entry)
+
+
+def is_turn_complete(response):
+    server_content = getattr(response, "server_content", None)
+    return bool(getattr(server_content, "turn_complete", None))
+
+
+def is_interrupted(response):
+    server_content = getattr(response, "server_content", None)
+    return bool(getattr(server_content, "interrupted", None))
+
+
+class VoiceConnection:
+    """Turn and audio state of one caller"""
+
+    def __init__(self, connection_id, channel):
+        self.connection_id = connection_id
+        self.channel = channel
+        self.live = None  # Gemini Live session, once connected
+        self.is_listening = True
+        self.is_speaking = False
+        self.turns = 0
+
+    def start_speaking(self):
+        self.is_speaking = True
+        self.is_listening = False
+
+    def finish_turn(self):
+        self.is_speaking = False
+        self.is_listening = True
+
+
+class VoiceGateway:
+    def __init__(self, persona, client=None, pool_size=0):
+        self.persona = persona
+        self.client = client
+        self.pool_size = pool_size
+        self.pool = None
+        self.connection_count = 0
+        self.connections = {}
+
+    async def start(self):
+        if self.pool_size > 0:
+            try:
+                self.pool = LiveSessionPool(self.live_client(), self.persona, self.pool_size)
+            except Exception as e:
+                logger.error(f"❌ No warm session pool: {e}")
+                return
+            await self.pool.start()
+
+    async def close(self):
+        if self.pool:
+            await self.pool.close()
+
+    def live_client(self):
+        # One Gemini client per process, created on the first call
+        if self.client is None:
+            from google import genai
+            self.client = genai.Client()
+        return self.client
+
+    @asynccontextmanager
+    async def open_live(self):
+        """Yield (session, greeting audio to play or None) for one call"""
+        if self.pool:
+            async with self.pool.session() as opened:
+                yield opened
+            return
+        live = self.live_client().aio.live
+        async with live.connect(model=self.persona.model, config=self.persona.live_config()) as session:
+            yield session, None
+
+    async def handle_connection(self, websocket):
+        """Bridge one browser connection to its own Gemini Live session"""
+        self.connection_count += 1
+        connection_id = self.connection_count
+        conn = VoiceConnection(connection_id, AudioChannel(websocket))
+        self.connections[connection_id] = conn
+        logger.info(f"👋 Client #{connection_id} connected ({'binary' if conn.channel.binary else 'json'} audio, {len(self.connections)} active)")
+
+        try:
+            async with self.open_live() as (session, greeting):
+                conn.live = session
+                if greeting:
+                    # Gemini already "said" it in the session context; play the recording
+                    for chunk in greeting.chunks:
+                        await conn.channel.send_audio(chunk)
+                    await conn.channel.send_control({"type": "turn_complete"})
+                elif self.persona.greeting:
+                    await session.send_client_content(
+                        turns=[{"role": "user", "parts": [{"text": self.persona.greeting}]}],
+                        turn_complete=True
+                    )
+                    conn.start_speaking()
+                await self.pump(conn)
+
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except Exception as e:
+            logger.error(f"❌ Client #{connection_id} error: {e}")
+            try:
+                await conn.channel.send_control({"type": "error", "message": str(e)})
+            except websockets.exceptions.ConnectionClosed:
+                pass
+        finally:
+            del self.connections[connection_id]
+            logger.info(f"🧹 Client #{connection_id} done after {conn.turns} turns ({len(self.connections)} active)")
+
+    async def pump(self, conn):
+        """Run both directions until either ends; then stop the other"""
+        tasks = [
+            asyncio.create_task(self.browser_to_gemini(conn)),
+            asyncio.create_task(self.gemini_to_browser(conn)),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for task in done:
+            task.result()  # re-raise what ended the call, if it failed
+
+    async def browser_to_gemini(self, conn):
+        session = conn.live
+        async for message in conn.channel.websocket:
+            try:
+                data, audio = conn.channel.parse(message, audio_type=AUDIO_TYPES)
+            except ValueError as e:
+                logger.warning(f"⚠️ Client #{conn.connection_id} malformed message: {e}")
+                continue
+            msg_type = data.get("type")
+
+            if audio is not None:
+                if conn.is_listening and len(audio) > 100:  # skip trivial chunks
+                    rate = data.get("sample_rate", INPUT_SAMPLE_RATE)
+                    await session.send_realtime_input(
+                        audio={"data": audio, "mime_type": f"audio/pcm;rate={rate}"}
+                    )
+
+            elif msg_type in ("text", "text_input"):
+                conn.is_listening = False
+                await session.send_client_content(
+                    turns=[{"role": "user", "parts": [{"text": data.get("text", "")}]}],
+                    turn_complete=True
+                )
+
+            elif msg_type == "audio_end":
+                await session.send_realtime_input(audio_stream_end=True)
+
+            elif msg_type == "start_listening":
+                conn.is_listening = True
+
+            elif msg_type == "stop_listening":
+                conn.is_listening = False
+
+            elif msg_type == "heartbeat":
+                await conn.channel.send_control({"type": "heartbeat_ack"})
+
+            else:
+                logger.debug(f"🤷 Client #{conn.connection_id} unknown message type: {msg_type}")
+
+    async def gemini_to_browser(self, conn):
+        channel = conn.channel
+        # receive() ends after each turn_complete, so keep asking for the
+        # next turn; one that ends without a message means the session closed
+        while True:
+            received = False
+            async for response in conn.live.receive():
+                received = True
+                if response.data is not None:
+                    conn.start_speaking()
+                    await channel.send_audio(response.data)
+
+                if response.text is not None:
+                    await channel.send_control({"type": "text", "text": response.text})
+
+                if is_interrupted(response):
+                    # The caller talked over Robin: the browser drops queued audio
+                    conn.finish_turn()
+                    await channel.send_control({"type": "interrupted"})
+
+                if is_turn_complete(response):
+                    conn.finish_turn()
+                    conn.turns += 1
+                    await channel.send_control({"type": "turn_complete"})
+
+            if not received:
+                logger.info(f"🔚 Client #{conn.connection_id}: Gemini session ended")
+                return
+
+
+async def serve(gateway, host, port, reuse_port=False):
+    """Serve until SIGINT/SIGTERM, then close open calls with 1001"""
+    loop = asyncio.get_running_loop()
+    stop = loop.create_future()
+    await gateway.start()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda: stop.done() or stop.set_result(None))
+
+    server = await websockets.serve(
+        gateway.handle_connection,
+        host,
+        port,
+        ping_interval=20,
+        ping_timeout=10,
+        close_timeout=5,
+        max_size=10 * 1024 * 1024,  # 10MB max message size
+        compression=None,  # Disable compression for audio
+        reuse_port=reuse_port,
+        **SERVE_OPTIONS
+    )
+    logger.info(f"✅ Voice gateway ({gateway.persona.name}) ready on ws://{host}:{port}")
+
+    await stop
+    logger.info(f"🛑 Shutting down, closing {len(gateway.connections)} calls")
+    server.close()
+    try:
+        await asyncio.wait_for(server.wait_closed(), SHUTDOWN_GRACE)
+    except asyncio.TimeoutError:
+        logger.warning(f"⏰ {len(gateway.connections)} calls still open after {SHUTDOWN_GRACE}s")
+    await gateway.close()
+
+
+def run_worker(persona, host, port, reuse_port, pool_size):
+    asyncio.run(serve(VoiceGateway(persona, pool_size=pool_size), host, port, reuse_port))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voice gateway for the Gemini Live personas")
+    parser.add_argument("--persona", default="robin", help="persona to answer calls")
+    parser.add_argument("--persona-file", help="JSON file with more personas")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="processes sharing the port (SO_REUSEPORT)")
+    parser.add_argument("--pool-size", type=int, default=2, help="warm Live sessions per worker, 0 to disable")
+    args = parser.parse_args()
+
+    if args.persona_file:
+        load_personas(args.persona_file)
+    if args.persona not in PERSONAS:
+        parser.error(f"unknown persona {args.persona!r}, choose from {', '.join(PERSONAS)}")
+    if not (os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")):
+        logger.warning("⚠️ GOOGLE_API_KEY is not set, Gemini Live connections will fail")
+
+    if args.workers <= 1:
+        run_worker(PERSONAS[args.persona], args.host, args.port, False, args.pool_size)
+        return
+
+    # The workers bind the same port; the kernel balances new calls across them
+    workers = [
+        multiprocessing.Process(
+            target=run_worker,
+            args=(PERSONAS[args.persona], args.host, args.port, True, args.pool_size),
+            name=f"worker-{i}"
+        )
+        for i in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+
+    def forward(signum, frame):
+        for worker in workers:
+            if worker.is_alive():
+                os.kill(worker.pid, signum)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for worker in workers:
+        worker.join()
+    sys.exit(max(worker.exitcode or 0 for worker in workers))
+
+
+if __name__ == "__main__":
+    main()
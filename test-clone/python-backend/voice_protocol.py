@@ -0,0 +1,139 @@
+"""
+Voice WebSocket framing shared by the voice servers.
+
+The framing is negotiated when the browser opens the socket, through the
+WebSocket subprotocol:
+
+- "beautymed.pcm.v1" (binary mode): audio travels in binary frames, a
+  12-byte header followed by raw little-endian int16 PCM. Text frames carry
+  JSON control messages only ({"type": "text" | "turn_complete" | ...}).
+- no subprotocol (legacy JSON mode): everything is JSON, audio included, as
+  base64 in {"type": "audio", "data": "..."}.
+
+Binary frame header (little-endian):
+
+    uint8   version       1
+    uint8   kind          1 = audio
+    uint16  channels      1 for mono
+    uint32  sequence      per direction, counting from 0
+    uint32  sample_rate   e.g. 16000 from the microphone, 24000 from Gemini
+
+In the browser:
+
+    const ws = new WebSocket(url, ["beautymed.pcm.v1"]);
+    ws.binaryType = "arraybuffer";
+    // receive: new Int16Array(event.data, 12) when event.data is an ArrayBuffer
+    // send: a 12-byte DataView header followed by the Int16Array's bytes
+"""
+import base64
+import json
+import struct
+
+BINARY_SUBPROTOCOL = "beautymed.pcm.v1"
+
+FRAME_VERSION = 1
+FRAME_AUDIO = 1
+FRAME_HEADER = struct.Struct("<BBHII")
+
+# Gemini Live takes 16 kHz input and answers with 24 kHz audio
+INPUT_SAMPLE_RATE = 16000
+OUTPUT_SAMPLE_RATE = 24000
+
+
+def select_subprotocol(first, second):
+    """Accept the binary subprotocol if the client offers it, else fall back to JSON.
+
+    websockets >= 14 calls this as (connection, client_subprotocols), the
+    legacy server as (client_subprotocols, server_subprotocols).
+    """
+    offered = first if isinstance(first, (list, tuple)) else second
+    return BINARY_SUBPROTOCOL if BINARY_SUBPROTOCOL in offered else None
+
+
+# Arguments for websockets.serve() that offer binary mode to clients asking for it
+SERVE_OPTIONS = {"subprotocols": [BINARY_SUBPROTOCOL], "select_subprotocol": select_subprotocol}
+
+
+class AudioFrame:
+    """A decoded binary audio frame; pcm is a view into the received message."""
+    __slots__ = ("sequence", "sample_rate", "channels", "pcm")
+
+    def __init__(self, sequence, sample_rate, channels, pcm):
+        self.sequence = sequence
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.pcm = pcm
+
+
+def encode_audio_frame(sequence, pcm, sample_rate, channels=1):
+    """Build a binary audio frame: header followed by the raw PCM bytes."""
+    frame = bytearray(FRAME_HEADER.size + len(pcm))
+    FRAME_HEADER.pack_into(frame, 0, FRAME_VERSION, FRAME_AUDIO, channels, sequence, sample_rate)
+    frame[FRAME_HEADER.size:] = pcm
+    return frame
+
+
+def decode_frame(frame):
+    """Decode a binary frame into an AudioFrame. Raises ValueError if it is malformed."""
+    if len(frame) < FRAME_HEADER.size:
+        raise ValueError(f"Binary frame too short: {len(frame)} bytes")
+    version, kind, channels, sequence, sample_rate = FRAME_HEADER.unpack_from(frame)
+    if version != FRAME_VERSION or kind != FRAME_AUDIO:
+        raise ValueError(f"Unsupported binary frame: version {version}, kind {kind}")
+    return AudioFrame(sequence, sample_rate, channels, memoryview(frame)[FRAME_HEADER.size:])
+
+
+class AudioChannel:
+    """Per-connection codec between the socket and the server's audio/control messages.
+
+    The mode follows the negotiated subprotocol, so each server writes its
+    logic once and serves old JSON clients and binary clients alike.
+    """
+
+    def __init__(self, websocket, output_rate=OUTPUT_SAMPLE_RATE):
+        self.websocket = websocket
+        self.binary = getattr(websocket, "subprotocol", None) == BINARY_SUBPROTOCOL
+        self.output_rate = output_rate
+        self.sent = 0
+        self.received = 0
+        self.lost = 0
+        self._next_sequence = None
+
+    async def send_audio(self, pcm, json_type="audio", sample_rate=None, **json_fields):
+        """Send a chunk of PCM audio; json_type and json_fields only shape the legacy JSON message."""
+        if self.binary:
+            message = encode_audio_frame(self.sent, pcm, sample_rate or self.output_rate)
+        else:
+            message = json.dumps({"type": json_type, "data": base64.b64encode(pcm).decode(), **json_fields})
+        self.sent += 1
+        await self.websocket.send(message)
+
+    async def send_control(self, message):
+        await self.websocket.send(json.dumps(message))
+
+    def parse(self, message, audio_type="audio"):
+        """Decode an incoming message into (data, audio).
+
+        data is the JSON control message, or {"type": audio_type, ...} for a
+        binary audio frame; audio is the PCM bytes of an audio message
+        (binary, or base64 in a legacy message of audio_type), else None.
+        audio_type may also be a tuple of accepted legacy types, the first
+        one naming binary frames.
+
+        Raises ValueError (or json.JSONDecodeError) for malformed messages.
+        """
+        audio_types = (audio_type,) if isinstance(audio_type, str) else audio_type
+        if isinstance(message, (bytes, bytearray, memoryview)):
+            frame = decode_frame(message)
+            self.received += 1
+            if self._next_sequence is not None and frame.sequence > self._next_sequence:
+                self.lost += frame.sequence - self._next_sequence
+            self._next_sequence = frame.sequence + 1
+            data = {"type": audio_types[0], "sequence": frame.sequence, "sample_rate": frame.sample_rate}
+            return data, bytes(frame.pcm)
+
+        data = json.loads(message)
+        if data.get("type") in audio_types and "data" in data:
+            self.received += 1
+            return data, base64.b64decode(data["data"])
+        return data, None
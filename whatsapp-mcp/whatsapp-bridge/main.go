@@ -84,6 +84,12 @@ func NewMessageStore() (*MessageStore, error) {
 			PRIMARY KEY (id, chat_jid),
 			FOREIGN KEY (chat_jid) REFERENCES chats(jid)
 		);
+
+		CREATE INDEX IF NOT EXISTS idx_messages_chat_timestamp ON messages (chat_jid, timestamp);
+		CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages (timestamp);
+		CREATE INDEX IF NOT EXISTS idx_messages_sender_timestamp ON messages (sender, timestamp);
+		CREATE INDEX IF NOT EXISTS idx_chats_last_message_time ON chats (COALESCE(last_message_time, ''));
+		CREATE INDEX IF NOT EXISTS idx_chats_name ON chats (COALESCE(name, ''));
 	`)
 	if err != nil {
 		db.Close()
@@ -200,10 +206,14 @@ type SendMessageRequest struct {
 	Recipient string `json:"recipient"`
 	Message   string `json:"message"`
 	MediaPath string `json:"media_path,omitempty"`
+	// Media content (base64 in JSON), sent instead of a file the bridge can
+	// read; media_path then only names it, e.g. "voice.ogg"
+	MediaData []byte `json:"media_data,omitempty"`
 }
 
-// Function to send a WhatsApp message
-func sendWhatsAppMessage(client *whatsmeow.Client, recipient string, message string, mediaPath string) (bool, string) {
+// Function to send a WhatsApp message. If mediaData is set it is sent as the
+// content of mediaPath instead of reading the file.
+func sendWhatsAppMessage(client *whatsmeow.Client, recipient string, message string, mediaPath string, mediaData []byte) (bool, string) {
 	if !client.IsConnected() {
 		return false, "Not connected to WhatsApp"
 	}
@@ -233,10 +243,12 @@ func sendWhatsAppMessage(client *whatsmeow.Client, recipient string, message str
 
 	// Check if we have media to send
 	if mediaPath != "" {
-		// Read media file
-		mediaData, err := os.ReadFile(mediaPath)
-		if err != nil {
-			return false, fmt.Sprintf("Error reading media file: %v", err)
+		// Read media file, unless its content was sent inline
+		if len(mediaData) == 0 {
+			mediaData, err = os.ReadFile(mediaPath)
+			if err != nil {
+				return false, fmt.Sprintf("Error reading media file: %v", err)
+			}
 		}
 
 		// Determine media type and mime type based on file extension
@@ -706,7 +718,7 @@ func startRESTServer(client *whatsmeow.Client, messageStore *MessageStore, port
 		fmt.Println("Received request to send message", req.Message, req.MediaPath)
 
 		// Send the message
-		success, message := sendWhatsAppMessage(client, req.Recipient, req.Message, req.MediaPath)
+		success, message := sendWhatsAppMessage(client, req.Recipient, req.Message, req.MediaPath, req.MediaData)
 		fmt.Println("Message sent", success, message)
 		// Set response headers
 		w.Header().Set("Content-Type", "application/json")
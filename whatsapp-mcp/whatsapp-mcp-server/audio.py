@@ -1,8 +1,171 @@
+import hashlib
 import os
+import re
 import subprocess
 import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
-def convert_to_opus_ogg(input_file, output_file=None, bitrate="32k", sample_rate=24000):
+# Encoder settings shared by every conversion (also part of the cache key, so
+# changing them invalidates cached outputs)
+OPUS_OPTIONS = [
+    "-application", "voip",      # Optimize for voice
+    "-vbr", "on",                # Variable bitrate
+]
+
+# Encoding profiles. With VBR the output size follows the bitrate; the
+# compression level (0-10) mostly costs CPU for a slightly better encode, and
+# longer frames (up to 60ms, fine for voice) cut per-frame overhead.
+PROFILES = {
+    "fast": {"bitrate": "32k", "compression_level": 0, "frame_duration": 20},
+    "balanced": {"bitrate": "32k", "compression_level": 5, "frame_duration": 60},
+    "smallest": {"bitrate": "24k", "compression_level": 10, "frame_duration": 60},
+}
+
+# Seconds of encoding per second of audio for each profile on one core
+# (measured with benchmarks/bench_audio.py); used by "auto" to estimate how
+# long a conversion will take.
+ENCODE_COST = {"fast": 0.021, "balanced": 0.039, "smallest": 0.071}
+
+# "auto" picks "balanced" for clips up to AUTO_SHORT_SECONDS long (or of
+# unknown length), where maximum compression saves only a few KB, and
+# otherwise the smallest profile expected to encode within
+# AUTO_TARGET_LATENCY seconds, falling back to "fast". With the costs above
+# that is "smallest" up to ~70s, "balanced" up to ~2 minutes, then "fast".
+AUTO_SHORT_SECONDS = 30.0
+AUTO_TARGET_LATENCY = 5.0
+DEFAULT_PROFILE = "auto"
+
+# Converted voice messages are cached here by input content and encoding
+# parameters, so sending the same clip again skips ffmpeg. The least recently
+# used files are evicted once the directory grows past CACHE_MAX_BYTES.
+CACHE_DIR = os.environ.get(
+    "WHATSAPP_AUDIO_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "whatsapp-mcp", "opus")
+)
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Files picked up from a directory by convert_many's CLI batch mode (.ogg is
+# left out: converted outputs usually sit next to their sources)
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".aac", ".flac", ".opus", ".wma", ".aiff", ".webm", ".mp4")
+
+# Input files whose content hash is remembered between sends
+HASH_MEMO_SIZE = 4096
+
+# Partial outputs older than this were left behind by a crashed conversion
+STALE_TEMP_SECONDS = 3600
+
+_DURATION = re.compile(rb"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+def probe_duration(source):
+    """
+    Get the duration of an audio file in seconds with ffprobe, or ffmpeg if ffprobe
+    isn't installed.
+    
+    Args:
+        source (str or bytes): Path to the audio file, or its content
+    
+    Returns:
+        float: The duration, or None if it can't be determined
+    """
+    data = None if isinstance(source, str) else bytes(source)
+    target = source if data is None else "pipe:0"
+    stdin = {"input": data} if data is not None else {"stdin": subprocess.DEVNULL}
+    try:
+        process = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", target],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, **stdin
+        )
+        try:
+            return float(process.stdout.strip())
+        except ValueError:
+            return None
+    except FileNotFoundError:
+        pass
+    try:
+        # Without an output file ffmpeg fails, but only after printing the input's details
+        process = subprocess.run(["ffmpeg", "-hide_banner", "-i", target],
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE, **stdin)
+    except FileNotFoundError:
+        return None
+    match = _DURATION.search(process.stderr)
+    if match is None:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def choose_profile(duration, target_latency=AUTO_TARGET_LATENCY):
+    """
+    Pick an encoding profile for a clip of the given duration (see AUTO_SHORT_SECONDS).
+    
+    Args:
+        duration (float): Clip length in seconds, or None if unknown
+        target_latency (float, optional): Longest acceptable encoding time in seconds
+    
+    Returns:
+        str: The name of a profile in PROFILES
+    """
+    if duration is None or duration <= AUTO_SHORT_SECONDS:
+        return "balanced"
+    for name in ("smallest", "balanced"):
+        if duration * ENCODE_COST[name] <= target_latency:
+            return name
+    return "fast"
+
+
+def resolve_profile(profile=None, source=None, duration=None):
+    """
+    Turn a profile name, or "auto" (the default, see DEFAULT_PROFILE), into a name in PROFILES.
+    
+    For "auto", the duration is probed from source (a path or bytes) unless given.
+    
+    Raises:
+        ValueError: If the profile is unknown
+    """
+    profile = profile or DEFAULT_PROFILE
+    if profile == "auto":
+        if duration is None and source is not None:
+            duration = probe_duration(source)
+        return choose_profile(duration)
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown encoding profile: {profile}. Use one of auto, {', '.join(PROFILES)}.")
+    return profile
+
+
+def _profile_signature(profile):
+    """Everything the output of a profile depends on, for cache keys."""
+    profile = profile or DEFAULT_PROFILE
+    if profile == "auto":
+        return repr((sorted(PROFILES.items()), sorted(ENCODE_COST.items()), AUTO_SHORT_SECONDS, AUTO_TARGET_LATENCY))
+    return repr((profile, sorted(PROFILES[profile].items())))
+
+
+def _opus_command(input_args, output, bitrate, sample_rate, profile):
+    """ffmpeg command line encoding the given input to Opus/OGG at output (a path or "pipe:1").
+    
+    profile must already be resolved; bitrate overrides the profile's if set.
+    """
+    settings = PROFILES[profile]
+    return [
+        "ffmpeg",
+        *input_args,
+        "-c:a", "libopus",
+        "-b:a", bitrate or settings["bitrate"],
+        "-ar", str(sample_rate),
+        *OPUS_OPTIONS,
+        "-compression_level", str(settings["compression_level"]),
+        "-frame_duration", str(settings["frame_duration"]),
+        "-f", "ogg",                 # Output may be a pipe or a cache file not named .ogg
+        "-y",                        # Overwrite output file if it exists
+        output
+    ]
+
+
+def convert_to_opus_ogg(input_file, output_file=None, bitrate=None, sample_rate=24000, profile=None):
     """
     Convert an audio file to Opus format in an Ogg container.
     
@@ -10,8 +173,10 @@ def convert_to_opus_ogg(input_file, output_file=None, bitrate="32k", sample_rate
         input_file (str): Path to the input audio file
         output_file (str, optional): Path to save the output file. If None, replaces the
                                     extension of input_file with .ogg
-        bitrate (str, optional): Target bitrate for Opus encoding (default: "32k")
+        bitrate (str, optional): Target bitrate for Opus encoding (default: the profile's)
         sample_rate (int, optional): Sample rate for output (default: 24000)
+        profile (str, optional): Encoding profile: "fast", "balanced", "smallest", or "auto"
+                                 to choose by the input's duration (default: DEFAULT_PROFILE)
     
     Returns:
         str: Path to the converted file
@@ -33,24 +198,14 @@ def convert_to_opus_ogg(input_file, output_file=None, bitrate="32k", sample_rate
         os.makedirs(output_dir)
     
     # Build the ffmpeg command
-    cmd = [
-        "ffmpeg",
-        "-i", input_file,
-        "-c:a", "libopus",
-        "-b:a", bitrate,
-        "-ar", str(sample_rate),
-        "-application", "voip",  # Optimize for voice
-        "-vbr", "on",           # Variable bitrate
-        "-compression_level", "10",  # Maximum compression
-        "-frame_duration", "60",     # 60ms frames (good for voice)
-        "-y",                        # Overwrite output file if it exists
-        output_file
-    ]
+    profile = resolve_profile(profile, input_file)
+    cmd = _opus_command(["-i", input_file], output_file, bitrate, sample_rate, profile)
     
     try:
         # Run the ffmpeg command and capture output
         process = subprocess.run(
             cmd,
+            stdin=subprocess.DEVNULL,  # Parallel ffmpegs mustn't read the terminal
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True,
@@ -61,14 +216,15 @@ def convert_to_opus_ogg(input_file, output_file=None, bitrate="32k", sample_rate
         raise RuntimeError(f"Failed to convert audio. You likely need to install ffmpeg {e.stderr}")
 
 
-def convert_to_opus_ogg_temp(input_file, bitrate="32k", sample_rate=24000):
+def convert_to_opus_ogg_temp(input_file, bitrate=None, sample_rate=24000, profile=None):
     """
     Convert an audio file to Opus format in an Ogg container and store in a temporary file.
     
     Args:
         input_file (str): Path to the input audio file
-        bitrate (str, optional): Target bitrate for Opus encoding (default: "32k")
+        bitrate (str, optional): Target bitrate for Opus encoding (default: the profile's)
         sample_rate (int, optional): Sample rate for output (default: 24000)
+        profile (str, optional): Encoding profile, as for convert_to_opus_ogg
     
     Returns:
         str: Path to the temporary file with the converted audio
@@ -83,7 +239,7 @@ def convert_to_opus_ogg_temp(input_file, bitrate="32k", sample_rate=24000):
     
     try:
         # Convert the audio
-        convert_to_opus_ogg(input_file, temp_file.name, bitrate, sample_rate)
+        convert_to_opus_ogg(input_file, temp_file.name, bitrate, sample_rate, profile)
         return temp_file.name
     except Exception as e:
         # Clean up the temporary file if conversion fails
@@ -92,12 +248,333 @@ def convert_to_opus_ogg_temp(input_file, bitrate="32k", sample_rate=24000):
         raise e
 
 
+def transcode_to_opus_ogg(source, bitrate=None, sample_rate=24000, pcm_rate=None, pcm_channels=1, pcm_format="s16le",
+                          profile=None):
+    """
+    Convert audio to Opus format in an Ogg container entirely in memory, piping
+    it through ffmpeg's stdin and stdout instead of temporary files.
+    
+    Args:
+        source (bytes or file): Audio data, or a binary file object to read it from. A real
+                                file is handed to ffmpeg as its stdin without being read here.
+        bitrate (str, optional): Target bitrate for Opus encoding (default: the profile's)
+        sample_rate (int, optional): Sample rate for output (default: 24000)
+        pcm_rate (int, optional): Set for raw PCM input (e.g. audio from the voice agents):
+                                  its sample rate. By default the input format is detected,
+                                  which works for streamable formats such as WAV, MP3 and OGG
+                                  but not for MP4/M4A with the index at the end.
+        pcm_channels (int, optional): Channels of raw PCM input (default: 1)
+        pcm_format (str, optional): ffmpeg sample format of raw PCM input (default: "s16le")
+        profile (str, optional): Encoding profile, as for convert_to_opus_ogg. "auto" uses the
+                                 length of PCM or bytes input; a file object counts as unknown.
+    
+    Returns:
+        bytes: The Opus/OGG data
+        
+    Raises:
+        RuntimeError: If the ffmpeg conversion fails
+    """
+    is_bytes = isinstance(source, (bytes, bytearray, memoryview))
+    input_args = ["-loglevel", "error"]
+    if pcm_rate is not None:
+        input_args += ["-f", pcm_format, "-ar", str(pcm_rate), "-ac", str(pcm_channels)]
+        sample_bytes = int(re.sub(r"\D", "", pcm_format) or 16) // 8
+        duration = len(source) / (pcm_rate * pcm_channels * sample_bytes) if is_bytes else None
+        profile = resolve_profile(profile, duration=duration)
+    else:
+        profile = resolve_profile(profile, source if is_bytes else None)
+    cmd = _opus_command(input_args + ["-i", "pipe:0"], "pipe:1", bitrate, sample_rate, profile)
+
+    # Bytes are written to ffmpeg's stdin; a real file becomes its stdin directly
+    stdin = {"input": source}
+    if not is_bytes:
+        try:
+            source.fileno()
+            stdin = {"stdin": source}
+        except (AttributeError, OSError, ValueError):
+            stdin = {"input": source.read()}
+
+    try:
+        process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **stdin)
+    except FileNotFoundError:
+        raise RuntimeError("Failed to convert audio. You likely need to install ffmpeg")
+    if process.returncode != 0 or not process.stdout:
+        stderr = process.stderr.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"Failed to convert audio: {stderr or f'ffmpeg exited with {process.returncode}'}")
+    return process.stdout
+
+
+def _batch_output(input_file, output_dir, root=None):
+    name = os.path.splitext(os.path.basename(input_file))[0] + ".ogg"
+    if output_dir is None:
+        return os.path.join(os.path.dirname(input_file), name)
+    # Keep the layout of the directory the file was found in
+    relative = os.path.relpath(os.path.dirname(input_file), root) if root else "."
+    return os.path.normpath(os.path.join(output_dir, relative, name))
+
+
+def _convert_one(input_file, output_file, bitrate, sample_rate, profile, force):
+    result = {"input": input_file, "output": output_file, "status": "converted", "profile": None, "seconds": 0.0,
+              "error": None}
+    start = time.perf_counter()
+    try:
+        if os.path.abspath(input_file) == os.path.abspath(output_file):
+            raise ValueError("Output would overwrite the input; pass an output directory")
+        if not force and os.path.isfile(output_file) and os.path.isfile(input_file) \
+                and os.path.getmtime(output_file) >= os.path.getmtime(input_file):
+            result["status"] = "skipped"
+            return result
+        # Convert under a temporary name, so a failed run never leaves an
+        # output that looks up to date
+        temp_file = f"{output_file}.{uuid.uuid4().hex}.tmp"
+        try:
+            result["profile"] = resolve_profile(profile, input_file)
+            convert_to_opus_ogg(input_file, temp_file, bitrate, sample_rate, result["profile"])
+            os.replace(temp_file, output_file)
+        finally:
+            if os.path.exists(temp_file):
+                os.unlink(temp_file)
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e).strip()
+    finally:
+        result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def convert_many(input_files, output_dir=None, workers=None, bitrate=None, sample_rate=24000, profile=None,
+                 force=False, root=None):
+    """
+    Convert many audio files to Opus/OGG, running up to ``workers`` ffmpeg processes at once.
+    
+    Each ffmpeg is a separate process doing the work, so a thread per job is
+    enough to keep all cores busy.
+    
+    Args:
+        input_files (list): Paths of the audio files to convert
+        output_dir (str, optional): Directory for the outputs. If None, each output is written
+                                    next to its input with the extension replaced by .ogg
+        workers (int, optional): Number of conversions run in parallel (default: CPU count)
+        bitrate (str, optional): Target bitrate for Opus encoding (default: the profile's)
+        sample_rate (int, optional): Sample rate for output (default: 24000)
+        profile (str, optional): Encoding profile, as for convert_to_opus_ogg
+        force (bool, optional): Convert even if the output is newer than the input
+        root (str, optional): Directory the inputs were collected from; their paths relative
+                              to it are kept under output_dir
+    
+    Returns:
+        list: One dict per input, in order, with "input", "output", "status" ("converted",
+              "skipped" when the output was up to date, or "failed"), the "profile" used,
+              "seconds" and "error"
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(input_files) or 1))
+    jobs = [(path, _batch_output(path, output_dir, root)) for path in input_files]
+    for directory in {os.path.dirname(output) for _, output in jobs}:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ffmpeg") as pool:
+        return list(pool.map(lambda job: _convert_one(*job, bitrate, sample_rate, profile, force), jobs))
+
+
+def find_audio_files(directory):
+    """Audio files (by AUDIO_EXTENSIONS) under directory, recursively, in sorted order."""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        found.extend(
+            os.path.join(dirpath, name) for name in sorted(filenames)
+            if name.lower().endswith(AUDIO_EXTENSIONS)
+        )
+    return found
+
+
+class ConversionCache:
+    """Size-bounded, content-addressed on-disk cache of Opus/OGG conversions.
+
+    A file is looked up by the SHA-256 of its content plus the encoding
+    parameters, so a renamed or re-uploaded copy of a clip still hits, while
+    an edited one misses. Hashes are remembered per (path, size, mtime), so
+    repeat sends of an unchanged file don't even re-read it.
+
+    Outputs are written under a unique temporary name and renamed into place,
+    so concurrent conversions never expose a partial file. Hits refresh the
+    file's mtime, and eviction removes the oldest files first.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hashes = {}
+
+    def _content_hash(self, path: str) -> str:
+        stat = os.stat(path)
+        signature = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._hashes.get(signature)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+            with self._lock:
+                if len(self._hashes) >= HASH_MEMO_SIZE:
+                    self._hashes.clear()
+                self._hashes[signature] = digest
+        return digest
+
+    def key(self, input_file: str, bitrate: str, sample_rate: int, profile: str = None) -> str:
+        params = "\0".join([bitrate or "", str(sample_rate), *OPUS_OPTIONS, _profile_signature(profile)])
+        return hashlib.sha256(f"{self._content_hash(input_file)}\0{params}".encode()).hexdigest()
+
+    def get(self, input_file: str, bitrate: str = None, sample_rate: int = 24000, profile: str = None) -> str:
+        """Return the path of the cached conversion of input_file, converting on a miss."""
+        if not os.path.isfile(input_file):
+            raise FileNotFoundError(f"Input file not found: {input_file}")
+
+        path = os.path.join(self.directory, self.key(input_file, bitrate, sample_rate, profile) + ".ogg")
+        try:
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            convert_to_opus_ogg(input_file, temp_path, bitrate, sample_rate, profile)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None) -> int:
+        """Delete least recently used files beyond max_bytes and stale partial outputs.
+
+        Returns the number of files removed.
+        """
+        now = time.time()
+        entries, total, removed = [], 0, 0
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if name.endswith(".tmp"):
+                if now - stat.st_mtime > STALE_TEMP_SECONDS:
+                    removed += self._remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                removed += self._remove(path)
+                total -= size
+        return removed
+
+    @staticmethod
+    def _remove(path: str) -> int:
+        try:
+            os.unlink(path)
+            return 1
+        except FileNotFoundError:
+            return 0
+
+    def clear(self) -> None:
+        """Remove every cached conversion."""
+        max_bytes, self.max_bytes = self.max_bytes, -1
+        try:
+            self.evict()
+        finally:
+            self.max_bytes = max_bytes
+
+
+cache = ConversionCache()
+
+
+def convert_to_opus_ogg_cached(input_file, bitrate=None, sample_rate=24000, profile=None):
+    """
+    Convert an audio file to Opus format in an Ogg container, reusing an earlier
+    conversion of the same content and parameters if there is one.
+    
+    Args:
+        input_file (str): Path to the input audio file
+        bitrate (str, optional): Target bitrate for Opus encoding (default: the profile's)
+        sample_rate (int, optional): Sample rate for output (default: 24000)
+        profile (str, optional): Encoding profile, as for convert_to_opus_ogg
+    
+    Returns:
+        str: Path to the converted file in the cache directory. It belongs to the
+             cache: don't modify or delete it.
+        
+    Raises:
+        FileNotFoundError: If the input file doesn't exist
+        RuntimeError: If the ffmpeg conversion fails
+    """
+    return cache.get(input_file, bitrate, sample_rate, profile)
+
+
+def _batch_main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="audio.py --batch",
+        description="Convert a directory (or list) of audio files to Opus/OGG in parallel"
+    )
+    parser.add_argument("inputs", nargs="+", help="audio files, or directories searched recursively")
+    parser.add_argument("-o", "--output-dir", help="write outputs here instead of next to each input")
+    parser.add_argument("-j", "--workers", type=int, help="parallel ffmpeg processes (default: CPU count)")
+    parser.add_argument("--profile", choices=["auto", *PROFILES], default=DEFAULT_PROFILE)
+    parser.add_argument("--bitrate", help="override the profile's bitrate")
+    parser.add_argument("--sample-rate", type=int, default=24000)
+    parser.add_argument("--force", action="store_true", help="convert even if outputs are up to date")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = []
+    for path in args.inputs:
+        if os.path.isdir(path):
+            files, root = find_audio_files(path), path
+        else:
+            files, root = [path], None
+        results += convert_many(files, args.output_dir, args.workers, args.bitrate, args.sample_rate,
+                                args.profile, args.force, root)
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        line = f"{result['status']:<10}{result['profile'] or '':<10}{result['seconds']:>8.2f}s  {result['input']}"
+        if result["status"] == "failed":
+            line += f"\n{'':<30}{result['error'].splitlines()[-1] if result['error'] else ''}"
+        print(line)
+    counts = {status: sum(1 for r in results if r["status"] == status) for status in ("converted", "skipped", "failed")}
+    busy = sum(r["seconds"] for r in results if r["status"] == "converted")
+    print(f"{counts['converted']} converted, {counts['skipped']} up to date, {counts['failed']} failed "
+          f"in {elapsed:.2f}s ({busy:.2f}s of conversion)")
+    return 1 if counts["failed"] else 0
+
+
 if __name__ == "__main__":
     # Example usage
     import sys
     
+    if len(sys.argv) >= 2 and sys.argv[1] == "--batch":
+        sys.exit(_batch_main(sys.argv[2:]))
+    
     if len(sys.argv) < 2:
         print("Usage: python audio.py input_file [output_file]")
+        print("       python audio.py --batch INPUT_FILE_OR_DIR... [-o OUTPUT_DIR] [-j WORKERS] [--force]")
         sys.exit(1)
     
     input_file = sys.argv[1]
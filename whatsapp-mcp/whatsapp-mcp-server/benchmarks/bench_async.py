@@ -0,0 +1,116 @@
+"""Concurrent list_messages / list_chats calls: blocking API vs the async reader pool.
+
+Usage:
+    python benchmarks/bench_async.py [--clients N] [--calls N] [--threads 1,2,4,8]
+
+Each of --clients concurrent tasks issues --calls queries on one event loop,
+the way concurrent MCP tool calls arrive. "blocking" calls whatsapp.py
+directly from the tasks (the old synchronous tools); "async/N" awaits
+whatsapp_async with N reader threads. Besides throughput and latency it
+reports the worst event-loop stall seen by a 1 ms ticker, i.e. how long the
+server could not even accept another request. Blocking latencies leave out the
+time a call waits for the loop, which is where its queueing shows up instead.
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from fixtures import build_store
+
+import db
+import whatsapp
+import whatsapp_async
+
+
+def workload(sample_jids):
+    """Alternating list_messages / list_chats calls, as (blocking fn, async fn, kwargs)."""
+    calls = []
+    for i, jid in enumerate(sample_jids):
+        calls.append((whatsapp.list_messages, whatsapp_async.list_messages,
+                      {"chat_jid": jid, "limit": 50, "include_context": True}))
+        calls.append((whatsapp.list_chats, whatsapp_async.list_chats,
+                      {"limit": 50, "page": i % 10}))
+    return calls
+
+
+async def ticker(stop: asyncio.Event, stalls: list):
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(0.001)
+        now = time.perf_counter()
+        stalls.append(now - last - 0.001)
+        last = now
+
+
+async def run(mode: str, calls, clients: int, per_client: int):
+    latencies, stalls = [], []
+    stop = asyncio.Event()
+    tick = asyncio.create_task(ticker(stop, stalls))
+
+    async def client(offset: int):
+        for i in range(per_client):
+            blocking, nonblocking, kwargs = calls[(offset + i) % len(calls)]
+            start = time.perf_counter()
+            if mode == "blocking":
+                blocking(**kwargs)
+            else:
+                await nonblocking(**kwargs)
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c * 7) for c in range(clients)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    latencies.sort()
+    return {
+        "calls/s": len(latencies) / elapsed,
+        "p50 ms": statistics.median(latencies) * 1000,
+        "p99 ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "max stall ms": max(stalls, default=0.0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent tool calls")
+    parser.add_argument("--calls", type=int, default=50, help="calls per client")
+    parser.add_argument("--threads", default="1,2,4,8", help="reader pool sizes to compare")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_store(os.path.join(tmp, "messages.db"), chats=args.chats, messages=args.messages)
+        whatsapp.MESSAGES_DB_PATH = path
+
+        conn = sqlite3.connect(path)
+        sample_jids = [jid for jid, in conn.execute("SELECT jid FROM chats ORDER BY rowid LIMIT 20")]
+        conn.close()
+        calls = workload(sample_jids)
+        for blocking, _, kwargs in calls:
+            blocking(**kwargs)  # warm up caches and the search index
+
+        default_threads = whatsapp_async.READER_THREADS
+        results = {"blocking": asyncio.run(run("blocking", calls, args.clients, args.calls))}
+        for threads in (int(n) for n in args.threads.split(",")):
+            whatsapp_async.configure(reader_threads=threads)
+            results[f"async/{threads}"] = asyncio.run(run("async", calls, args.clients, args.calls))
+        whatsapp_async.configure(reader_threads=default_threads)
+        db.pool.close_all()
+
+    print(f"{args.clients} concurrent clients x {args.calls} calls, {os.cpu_count()} CPUs")
+    columns = list(next(iter(results.values())))
+    print(f"{'mode':<12}" + "".join(f"{column:>14}" for column in columns))
+    for mode, row in results.items():
+        print(f"{mode:<12}" + "".join(f"{row[column]:>14.1f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Encode time vs output size of the Opus encoding profiles in audio.py.
+
+Usage:
+    python benchmarks/bench_audio.py [--corpus DIR] [--durations 5,30,120,600] [--repeat 3]
+
+Encodes every clip of the corpus with each profile (best of --repeat runs)
+and prints a matrix of encode time and output size, plus the profile "auto"
+picks for the clip. Without --corpus, voice-like clips of the given
+durations (a pitch-modulated, syllable-rate gated tone over pink noise) are
+synthesized with ffmpeg.
+
+The last table is each profile's encode cost in seconds per second of
+audio, which is what audio.ENCODE_COST should hold for this machine.
+"""
+
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+import fixtures  # noqa: F401  (puts the server modules on sys.path)
+
+import audio
+
+VOICE = (
+    "aevalsrc='0.3*sin(2*PI*(140+30*sin(2*PI*0.7*t))*t)*(0.5+0.5*sin(2*PI*3*t))"
+    "+0.2*sin(2*PI*(280+60*sin(2*PI*0.5*t))*t)*(0.5+0.5*sin(2*PI*4*t))':s=44100:d={duration}"
+)
+
+
+def synthesize(directory: str, duration: float) -> str:
+    path = os.path.join(directory, f"voice-{duration:g}s.wav")
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-y",
+         "-f", "lavfi", "-i", VOICE.format(duration=duration),
+         "-f", "lavfi", "-i", f"anoisesrc=d={duration}:c=pink:a=0.05",
+         "-filter_complex", "amix=inputs=2", path],
+        check=True
+    )
+    return path
+
+
+def encode(path: str, output: str, profile: str, repeat: int) -> tuple:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        audio.convert_to_opus_ogg(path, output, profile=profile)
+        best = min(best, time.perf_counter() - start)
+    return best, os.path.getsize(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="directory of sample clips (default: synthesized)")
+    parser.add_argument("--durations", default="5,30,120,600", help="seconds, for synthesized clips")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    profiles = list(audio.PROFILES)
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            clips = audio.find_audio_files(args.corpus)
+        else:
+            clips = [synthesize(tmp, float(d)) for d in args.durations.split(",")]
+
+        rows, costs = [], {name: [] for name in profiles}
+        output = os.path.join(tmp, "out.ogg")
+        for clip in clips:
+            duration = audio.probe_duration(clip)
+            row = {"clip": os.path.basename(clip), "duration": duration, "auto": audio.choose_profile(duration)}
+            for name in profiles:
+                seconds, size = encode(clip, output, name, args.repeat)
+                row[name] = (seconds, size)
+                if duration:
+                    costs[name].append(seconds / duration)
+            rows.append(row)
+
+    print(f"{'clip':<24}{'length s':>9}{'auto':>10}" + "".join(f"{name + ' s':>14}{name + ' KB':>14}" for name in profiles))
+    for row in rows:
+        line = f"{row['clip']:<24}{row['duration'] or 0:>9.1f}{row['auto']:>10}"
+        for name in profiles:
+            seconds, size = row[name]
+            line += f"{seconds:>14.3f}{size / 1024:>14.1f}"
+        print(line)
+
+    print()
+    print("encode s per audio s: " + ", ".join(
+        f"{name} {max(values):.4f}" for name, values in costs.items() if values
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Bursts of send_message calls against a stub bridge: fresh vs pooled connections.
+
+Usage:
+    python benchmarks/bench_bridge.py [--sends N] [--concurrency N] [--latency-ms MS]
+
+Starts benchmarks/stub_bridge.py on a local port and sends --sends text
+messages through it in each mode:
+
+- "unpooled":         a bare requests.post per message, as whatsapp.py used
+                      to do (new TCP connection every time);
+- "pooled":           whatsapp.send_message, reusing bridge.session();
+- "pooled/threads":   the same from --concurrency threads sharing the pool;
+- "async":            whatsapp_async.send_message, --concurrency sends in
+                      flight from one event loop, posted by the bridge pool's
+                      threads over bridge.session();
+- "httpx":            the same with bridge.async_post, the httpx client,
+                      directly on the event loop.
+
+Reports requests per second and the median/p99 latency of a send.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import fixtures  # noqa: F401  (puts the server modules on sys.path)
+import stub_bridge
+
+import bridge
+import whatsapp
+import whatsapp_async
+
+RECIPIENT = "66812345678"
+
+
+def unpooled_send(recipient: str, message: str):
+    response = requests.post(
+        f"{whatsapp.WHATSAPP_API_BASE_URL}/send",
+        json={"recipient": recipient, "message": message}
+    )
+    return whatsapp._send_result(response)
+
+
+def timed(send, latencies: list):
+    def call(i: int):
+        start = time.perf_counter()
+        success, message = send(RECIPIENT, f"reminder {i}")
+        latencies.append(time.perf_counter() - start)
+        assert success, message
+    return call
+
+
+def run_blocking(send, sends: int, threads: int = 1) -> tuple:
+    latencies = []
+    call = timed(send, latencies)
+    start = time.perf_counter()
+    if threads == 1:
+        for i in range(sends):
+            call(i)
+    else:
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(call, range(sends)))
+    return time.perf_counter() - start, latencies
+
+
+async def httpx_send(recipient: str, message: str):
+    response = await bridge.async_post(
+        f"{whatsapp.WHATSAPP_API_BASE_URL}/send",
+        {"recipient": recipient, "message": message}
+    )
+    return whatsapp._send_result(response)
+
+
+async def run_async(send, sends: int, concurrency: int) -> tuple:
+    latencies = []
+    limit = asyncio.Semaphore(concurrency)
+
+    async def call(i: int):
+        async with limit:
+            start = time.perf_counter()
+            success, message = await send(RECIPIENT, f"reminder {i}")
+            latencies.append(time.perf_counter() - start)
+            assert success, message
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(sends)))
+    elapsed = time.perf_counter() - start
+    await bridge.aclose()
+    return elapsed, latencies
+
+
+def summary(elapsed: float, latencies: list) -> dict:
+    latencies.sort()
+    return {
+        "req/s": len(latencies) / elapsed,
+        "p50 ms": statistics.median(latencies) * 1000,
+        "p99 ms": latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sends", type=int, default=2000, help="messages per mode")
+    parser.add_argument("--concurrency", type=int, default=8, help="threads / in-flight async sends")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="stub bridge response delay")
+    args = parser.parse_args()
+
+    server, whatsapp.WHATSAPP_API_BASE_URL = stub_bridge.start(latency=args.latency_ms / 1000)
+    bridge.configure(pool_size=max(args.concurrency, bridge.POOL_SIZE))
+    whatsapp_async.configure(bridge_threads=bridge.POOL_SIZE)
+    try:
+        results = {
+            "unpooled": summary(*run_blocking(unpooled_send, args.sends)),
+            "pooled": summary(*run_blocking(whatsapp.send_message, args.sends)),
+            f"pooled/threads{args.concurrency}":
+                summary(*run_blocking(whatsapp.send_message, args.sends, args.concurrency)),
+            f"async/{args.concurrency}": summary(*asyncio.run(
+                run_async(whatsapp_async.send_message, args.sends, args.concurrency)
+            )),
+            f"httpx/{args.concurrency}": summary(*asyncio.run(run_async(httpx_send, args.sends, args.concurrency))),
+        }
+    finally:
+        bridge.close()
+        server.shutdown()
+
+    print(f"{args.sends} sends per mode, stub latency {args.latency_ms:g} ms")
+    columns = list(results["unpooled"])
+    print(f"{'mode':<20}" + "".join(f"{column:>12}" for column in columns))
+    for mode, row in results.items():
+        print(f"{mode:<20}" + "".join(f"{row[column]:>12.1f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Campaign-style sends against a stub bridge: one send_message per recipient vs send_messages_bulk.
+
+Usage:
+    python benchmarks/bench_bulk.py [--recipients N] [--concurrency N] [--latency-ms MS]
+                                    [--fail-rate F] [--rate R]
+
+Starts benchmarks/stub_bridge.py with --latency-ms per send (the bridge's
+round trip to WhatsApp) and sends a templated reminder to --recipients
+numbers:
+
+- "serial":        whatsapp.send_message per recipient, one after the other,
+                   the way one-MCP-call-per-recipient campaigns run today;
+- "bulk":          whatsapp.send_messages_bulk (threads, pooled session);
+- "bulk/async":    whatsapp_async.send_messages_bulk, which the MCP tool
+                   awaits (the threaded version, run from the bridge pool).
+
+The bulk modes run without a rate limit, so the numbers show the fan-out;
+a last "bulk/rate R" run checks that --rate caps the send rate. With
+--fail-rate the stub fails that fraction of sends as not connected, and the
+"failed" and "attempts" columns show what the retries recovered.
+"""
+
+import argparse
+import asyncio
+import time
+
+import fixtures  # noqa: F401  (puts the server modules on sys.path)
+import stub_bridge
+
+import bridge
+import whatsapp
+import whatsapp_async
+
+TEMPLATE = "Hi {name}, a reminder of your appointment at {time}. Reply to reschedule."
+
+
+def campaign(count: int) -> list:
+    return [
+        {"recipient": f"668{i:08d}", "name": f"Client {i}", "time": f"{9 + i % 8}:00"}
+        for i in range(count)
+    ]
+
+
+def run_serial(entries: list) -> list:
+    results = []
+    for entry in entries:
+        success, status = whatsapp.send_message(entry["recipient"], TEMPLATE.format_map(entry))
+        results.append(whatsapp._bulk_result(entry["recipient"], success, status, 1))
+    return results
+
+
+def measure(run) -> dict:
+    start = time.perf_counter()
+    results = run()
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": elapsed,
+        "msgs/s": len(results) / elapsed,
+        "failed": sum(1 for result in results if not result["success"]),
+        "attempts": sum(result["attempts"] for result in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipients", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="stub bridge time per send")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of sends failing as not connected (HTTP 500)")
+    parser.add_argument("--rate", type=float, default=20.0, help="sends per second for the rate-limited run")
+    args = parser.parse_args()
+
+    server, whatsapp.WHATSAPP_API_BASE_URL = stub_bridge.start(
+        latency=args.latency_ms / 1000, fail_rate=args.fail_rate
+    )
+    whatsapp.BULK_BACKOFF = 0.05  # the stub's failures are random, not load: retry soon
+    bridge.configure(pool_size=max(args.concurrency, bridge.POOL_SIZE))
+    entries = campaign(args.recipients)
+    bulk = {"concurrency": args.concurrency, "rate": None}
+    try:
+        results = {
+            "serial": measure(lambda: run_serial(entries)),
+            f"bulk/{args.concurrency}": measure(lambda: whatsapp.send_messages_bulk(entries, TEMPLATE, **bulk)),
+            f"bulk/async/{args.concurrency}": measure(
+                lambda: asyncio.run(whatsapp_async.send_messages_bulk(entries, TEMPLATE, **bulk))
+            ),
+            f"bulk/rate {args.rate:g}": measure(
+                lambda: whatsapp.send_messages_bulk(entries, TEMPLATE, args.concurrency, rate=args.rate, burst=1)
+            ),
+        }
+    finally:
+        bridge.close()
+        server.shutdown()
+
+    print(f"{args.recipients} recipients, stub latency {args.latency_ms:g} ms, fail rate {args.fail_rate:g}")
+    columns = list(results["serial"])
+    print(f"{'mode':<18}" + "".join(f"{column:>12}" for column in columns))
+    for mode, row in results.items():
+        print(f"{mode:<18}" + "".join(f"{row[column]:>12.1f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Calls per second of the whatsapp.py query API with and without the connection pool.
+
+Usage:
+    python benchmarks/bench_connections.py [--messages N] [--seconds S]
+
+"unpooled" reproduces the old behaviour (a fresh sqlite3.connect per call);
+"pooled" uses the per-thread connection pool from db.py.
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from fixtures import build_store
+
+import db
+import whatsapp
+
+
+def workload(sample_jid: str, sample_phone: str, sample_id: str):
+    return {
+        "get_chat": lambda: whatsapp.get_chat(sample_jid),
+        "list_chats": lambda: whatsapp.list_chats(limit=20),
+        "search_contacts": lambda: whatsapp.search_contacts("Client 1"),
+        "get_sender_name": lambda: whatsapp.get_sender_name(sample_phone),
+        "get_last_interaction": lambda: whatsapp.get_last_interaction(sample_jid),
+        "get_message_context": lambda: whatsapp.get_message_context(sample_id, 2, 2),
+        "list_messages": lambda: whatsapp.list_messages(chat_jid=sample_jid, limit=20, include_context=False),
+    }
+
+
+def rate(fn, seconds: float) -> float:
+    calls = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        fn()
+        calls += 1
+    return calls / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--seconds", type=float, default=1.0, help="time spent on each function per mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_store(os.path.join(tmp, "messages.db"), chats=args.chats, messages=args.messages)
+        whatsapp.MESSAGES_DB_PATH = path
+
+        conn = sqlite3.connect(path)
+        sample_jid, = conn.execute("SELECT jid FROM chats WHERE jid NOT LIKE '%@g.us' LIMIT 1").fetchone()
+        sample_id, = conn.execute("SELECT id FROM messages WHERE chat_jid = ? LIMIT 1", (sample_jid,)).fetchone()
+        conn.close()
+        calls = workload(sample_jid, sample_jid.split("@")[0], sample_id)
+
+        pooled_connect = whatsapp._connect
+        modes = {
+            "unpooled": lambda: sqlite3.connect(whatsapp.MESSAGES_DB_PATH),
+            "pooled": pooled_connect,
+        }
+
+        results = {}
+        for mode, connect in modes.items():
+            whatsapp._connect = connect
+            for name, fn in calls.items():
+                fn()  # warm up caches / open the pooled connection
+                results[(name, mode)] = rate(fn, args.seconds)
+        whatsapp._connect = pooled_connect
+        db.pool.close_all()
+
+    print(f"{'function':<24}{'unpooled/s':>14}{'pooled/s':>14}{'speedup':>10}")
+    for name in calls:
+        before, after = results[(name, "unpooled")], results[(name, "pooled")]
+        print(f"{name:<24}{before:>14.0f}{after:>14.0f}{after / before:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
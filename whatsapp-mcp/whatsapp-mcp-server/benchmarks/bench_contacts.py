@@ -0,0 +1,139 @@
+"""Contact lookups with and without the sidecar index or chat cache, checked against each other.
+
+Usage:
+    python benchmarks/bench_contacts.py [--chats 20000] [--messages 50000]
+
+Runs get_sender_names, search_contacts (its SQL query) and
+get_direct_chat_by_contact on the same store in each of these ways:
+
+- "scan":  the sidecar index disabled, so chats are scanned with LIKE;
+- "index": candidates come from the sidecar's chat_fts trigram index;
+- "cache": search_contacts only, served by the in-memory chat cache.
+
+The queries cover numbers matched in the middle of a JID, group senders,
+user-typed numbers, LIKE wildcards, short queries and non-ASCII names
+(which SQLite's LOWER leaves alone but str.lower() folds). All paths must
+return exactly the same results; the script exits with the first
+difference otherwise, then prints the time per call of each path.
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from fixtures import build_store
+
+import db
+import indexer
+import whatsapp
+
+# Extra chats with names the generated ones lack
+EXTRA_CHATS = [
+    ("66811111111@s.whatsapp.net", "50% off Promo"),
+    ("66822222222@s.whatsapp.net", "Skin_Care Team"),
+    ("66833333333@s.whatsapp.net", "Ärztin Müller"),
+    ("66844444444@s.whatsapp.net", "ärztin müller"),
+    ("66855555555@s.whatsapp.net", "คลินิกความงาม"),
+    ("66866666666@s.whatsapp.net", None),
+    ("66877777777@s.whatsapp.net", "İstanbul Clinic"),
+    ("66888888888@S.WHATSAPP.NET", "Upper Case JID"),
+    ("120363999999999999@G.US", "Upper Case Group"),
+]
+
+SEARCHES = [
+    "Client 1", "client 12", "Group", "66", "8111", "22222", "33333333", "whatsapp",
+    "%", "_", "50%", "n_1", "Ärzt", "ärzt", "ÄRZT", "müller", "คลินิก", "c", "",
+    "i", "istanbul", "STANBUL", "i̇", "s.whatsapp", "upper case", "@g.us",
+]
+
+
+def call_rate(fn, seconds: float = 0.5) -> float:
+    """Seconds per call of fn, averaged over about ``seconds``."""
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn()
+        calls += 1
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=20_000)
+    parser.add_argument("--messages", type=int, default=50_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_store(os.path.join(tmp, "messages.db"), chats=args.chats, messages=args.messages)
+        conn = sqlite3.connect(path)
+        conn.executemany("INSERT INTO chats (jid, name) VALUES (?, ?)", EXTRA_CHATS)
+        conn.commit()
+        senders = [sender for sender, in conn.execute(
+            "SELECT DISTINCT sender FROM messages WHERE NOT is_from_me LIMIT 500"
+        )]
+        numbers = [jid.split("@")[0] for jid, in conn.execute(
+            "SELECT jid FROM chats WHERE jid NOT LIKE '%@g.us' ORDER BY rowid LIMIT 50"
+        )]
+        conn.close()
+        whatsapp.MESSAGES_DB_PATH = path
+
+        # Senders with no chat of their own, matched within other JIDs
+        senders += [number[2:] for number in numbers[:20]] + [number[3:9] for number in numbers[:20]]
+        senders += ["120363", "0000001", "12@s.whatsapp.net", "nobody"]
+        phones = numbers[:10] + [number[4:] for number in numbers[:10]] + ["0811111111", "+66 81", "%", "_1"]
+
+        calls = {
+            "get_sender_names": lambda: whatsapp.get_sender_names(senders),
+            "search_contacts": lambda: [
+                whatsapp._search_contacts_sql(whatsapp._connect(), query) for query in SEARCHES
+            ],
+            "get_direct_chat_by_contact": lambda: [
+                (chat.jid, chat.name) if chat else None
+                for chat in map(whatsapp.get_direct_chat_by_contact, phones)
+            ],
+        }
+
+        sidecar = indexer.get_indexer(path)
+        results, seconds = {}, {}
+        for mode in ("scan", "index"):
+            sidecar.available = mode == "index"
+            sidecar.sync()
+            for name, fn in calls.items():
+                results[(name, mode)] = fn()
+                seconds[(name, mode)] = call_rate(fn)
+
+        def cached():
+            return [whatsapp.chat_cache.search(query) for query in SEARCHES]
+
+        whatsapp.chat_cache.refresh(whatsapp._connect())
+        results[("search_contacts", "cache")] = cached()
+        seconds[("search_contacts", "cache")] = call_rate(cached)
+        db.pool.close_all()
+
+    if results[("search_contacts", "cache")] != results[("search_contacts", "scan")]:
+        diff = [
+            (query, cache, scan) for query, cache, scan
+            in zip(SEARCHES, results[("search_contacts", "cache")], results[("search_contacts", "scan")])
+            if cache != scan
+        ]
+        raise SystemExit(f"search_contacts: chat cache results differ from SQL results: {diff}")
+    for name in calls:
+        if results[(name, "scan")] != results[(name, "index")]:
+            scan, index = results[(name, "scan")], results[(name, "index")]
+            if isinstance(scan, dict):
+                diff = {key: (scan[key], index[key]) for key in scan if scan[key] != index[key]}
+            else:
+                diff = [pair for pair in zip(scan, index) if pair[0] != pair[1]]
+            raise SystemExit(f"{name}: index results differ from scan results: {diff}")
+
+    print(f"{args.chats} chats; scan, index and cache results identical")
+    print(f"{'function':<28}{'scan ms':>10}{'index ms':>10}{'cache ms':>10}")
+    for name in calls:
+        cache = seconds.get((name, "cache"))
+        print(f"{name:<28}{seconds[(name, 'scan')] * 1000:>10.2f}{seconds[(name, 'index')] * 1000:>10.2f}"
+              + (f"{cache * 1000:>10.2f}" if cache is not None else f"{'-':>10}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Context lookup for search hits spread far apart in a few very large chats.
+
+Usage:
+    python benchmarks/bench_context.py [--chats 3] [--messages 300000] [--hits 2,6,20]
+
+Builds a store with a handful of long chats, marks --hits messages spread
+evenly through the history with a rare word, and fetches their context
+(2 before, 2 after) two ways:
+
+- "per-message": the previous loop, three queries per hit;
+- "batched":     whatsapp._fetch_message_contexts, one query for all hits.
+
+Both must return the same messages; the batched query must stay in the
+per-message ballpark however far apart the hits are (a query that ranks
+every message between the hits degrades quadratically here). The last
+line times list_messages(query=..., include_context=True) end to end.
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from fixtures import build_store
+
+import db
+import whatsapp
+
+BEFORE = AFTER = 2
+WORD = "zebra"
+
+
+def per_message(cursor: sqlite3.Cursor, rowids: list) -> list:
+    """Contexts the way get_message_context fetched them before batching."""
+    columns = whatsapp.MESSAGE_COLUMNS
+    contexts = []
+    for rowid in rowids:
+        target = cursor.execute(
+            f"SELECT {columns}, messages.rowid FROM messages JOIN chats ON messages.chat_jid = chats.jid "
+            "WHERE messages.rowid = ?", (rowid,)
+        ).fetchone()
+        chat_jid, timestamp = target[5], target[0]
+        before = cursor.execute(
+            f"SELECT {columns} FROM messages JOIN chats ON messages.chat_jid = chats.jid "
+            "WHERE messages.chat_jid = ? AND messages.timestamp < ? ORDER BY messages.timestamp DESC LIMIT ?",
+            (chat_jid, timestamp, BEFORE)
+        ).fetchall()
+        after = cursor.execute(
+            f"SELECT {columns} FROM messages JOIN chats ON messages.chat_jid = chats.jid "
+            "WHERE messages.chat_jid = ? AND messages.timestamp > ? ORDER BY messages.timestamp ASC LIMIT ?",
+            (chat_jid, timestamp, AFTER)
+        ).fetchall()
+        contexts.append(([row[6] for row in before], target[6], [row[6] for row in after]))
+    return contexts
+
+
+def ids(contexts: list) -> list:
+    return [
+        ([m.id for m in context.before], context.message.id, [m.id for m in context.after])
+        for context in contexts
+    ]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=3)
+    parser.add_argument("--messages", type=int, default=300_000)
+    parser.add_argument("--hits", default="2,6,20", help="numbers of search hits to compare")
+    args = parser.parse_args()
+    hit_counts = [int(n) for n in args.hits.split(",")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_store(os.path.join(tmp, "messages.db"), chats=args.chats, messages=args.messages, groups=0)
+        whatsapp.MESSAGES_DB_PATH = path
+
+        # Mark the most hits spread evenly through the whole history
+        conn = sqlite3.connect(path)
+        total, = conn.execute("SELECT MAX(rowid) FROM messages").fetchone()
+        step = total // max(hit_counts)
+        targets = list(range(step // 2, total, step))[:max(hit_counts)]
+        conn.executemany("UPDATE messages SET content = content || ' " + WORD + "' WHERE rowid = ?",
+                         [(rowid,) for rowid in targets])
+        conn.commit()
+        conn.close()
+
+        cursor = whatsapp._connect().cursor()
+        rows = []
+        for count in hit_counts:
+            # Same spread at every count: every (total / count)-th of the marked messages
+            chosen = targets[::max(1, len(targets) // count)][:count]
+            old_seconds, old = timed(lambda: per_message(cursor, chosen))
+            new_seconds, new = timed(lambda: whatsapp._fetch_message_contexts(cursor, chosen, BEFORE, AFTER))
+            if ids(new) != old:
+                raise SystemExit(f"batched contexts differ from per-message ones for {count} hits")
+            rows.append((count, old_seconds, new_seconds))
+
+        search_seconds, _ = timed(lambda: whatsapp.list_messages(query=WORD, limit=max(hit_counts), include_context=True))
+        db.pool.close_all()
+
+    print(f"{args.messages} messages in {args.chats} chats, context {BEFORE} before / {AFTER} after")
+    print(f"{'hits':>6}{'per-message ms':>16}{'batched ms':>12}")
+    for count, old_seconds, new_seconds in rows:
+        print(f"{count:>6}{old_seconds * 1000:>16.2f}{new_seconds * 1000:>12.2f}")
+    print(f"list_messages(query={WORD!r}, include_context=True): {search_seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
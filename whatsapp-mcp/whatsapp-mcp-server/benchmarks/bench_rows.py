@@ -0,0 +1,124 @@
+"""Memory and throughput of materializing messages: eager dataclasses vs lazy slotted rows.
+
+Usage:
+    python benchmarks/bench_rows.py [--rows N]
+
+Builds N raw rows shaped like a MESSAGE_COLUMNS result (1M by default) and
+turns them into message objects two ways:
+
+- "dataclass": the previous Message dataclass, parsing every timestamp
+  with datetime.fromisoformat up front;
+- "slotted":   whatsapp.Message.from_row, which wraps the row and parses the
+  timestamp on first access.
+
+For each it reports the time to build the list, the memory it holds on top
+of the raw rows (tracemalloc), and the time to then read every timestamp.
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import fixtures  # noqa: F401  (puts the server modules on sys.path)
+
+import whatsapp
+
+
+@dataclass
+class DataclassMessage:
+    """whatsapp.Message as it was before the slotted row types."""
+    timestamp: datetime
+    sender: str
+    content: str
+    is_from_me: bool
+    chat_jid: str
+    id: str
+    chat_name: Optional[str] = None
+    media_type: Optional[str] = None
+    snippet: Optional[str] = None
+
+
+def dataclass_from_row(row: tuple) -> DataclassMessage:
+    return DataclassMessage(
+        timestamp=datetime.fromisoformat(row[0]),
+        sender=row[1],
+        chat_name=row[2],
+        content=row[3],
+        is_from_me=row[4],
+        chat_jid=row[5],
+        id=row[6],
+        media_type=row[7]
+    )
+
+
+def raw_rows(count: int) -> list:
+    """Rows as sqlite3 returns them for MESSAGE_COLUMNS (plus the trailing rowid)."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        (
+            str(start + timedelta(seconds=i * 37)),
+            "66812345678",
+            "Client 42",
+            "thank you, see you at the clinic tomorrow",
+            i % 3 == 0,
+            "66812345678@s.whatsapp.net",
+            f"MSG{i:08d}",
+            "",
+            i + 1,
+        )
+        for i in range(count)
+    ]
+
+
+def measure(build, rows: list) -> dict:
+    # Memory is measured on a separate pass; tracing slows allocation down a lot
+    gc.collect()
+    tracemalloc.start()
+    messages = [build(row) for row in rows]
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del messages
+
+    gc.collect()
+    start = time.perf_counter()
+    messages = [build(row) for row in rows]
+    built = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for message in messages:
+        message.timestamp
+    read = time.perf_counter() - start
+    del messages
+    return {
+        "build s": built,
+        "rows/s": len(rows) / built,
+        "MB": memory / 1e6,
+        "bytes/row": memory / len(rows),
+        "timestamps s": read,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rows = raw_rows(args.rows)
+    results = {
+        "dataclass": measure(dataclass_from_row, rows),
+        "slotted": measure(whatsapp.Message.from_row, rows),
+    }
+
+    print(f"{args.rows} messages")
+    columns = list(results["dataclass"])
+    print(f"{'type':<12}" + "".join(f"{column:>14}" for column in columns))
+    for name, row in results.items():
+        print(f"{name:<12}" + "".join(f"{row[column]:>14.2f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Synthetic message store used by the benchmarks.
+
+Builds a SQLite database with the same schema the Go bridge creates in
+``whatsapp-bridge/store/messages.db`` and fills it with deterministic fake
+chats and messages, so benchmarks can run without a linked WhatsApp account.
+"""
+
+import os
+import random
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Make the server modules (whatsapp.py, db.py, audio.py) importable when a
+# benchmark is run as a script from this directory.
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS chats (
+        jid TEXT PRIMARY KEY,
+        name TEXT,
+        last_message_time TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS messages (
+        id TEXT,
+        chat_jid TEXT,
+        sender TEXT,
+        content TEXT,
+        timestamp TIMESTAMP,
+        is_from_me BOOLEAN,
+        media_type TEXT,
+        filename TEXT,
+        url TEXT,
+        media_key BLOB,
+        file_sha256 BLOB,
+        file_enc_sha256 BLOB,
+        file_length INTEGER,
+        PRIMARY KEY (id, chat_jid),
+        FOREIGN KEY (chat_jid) REFERENCES chats(jid)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_messages_chat_timestamp ON messages (chat_jid, timestamp);
+    CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages (timestamp);
+    CREATE INDEX IF NOT EXISTS idx_messages_sender_timestamp ON messages (sender, timestamp);
+    CREATE INDEX IF NOT EXISTS idx_chats_last_message_time ON chats (COALESCE(last_message_time, ''));
+    CREATE INDEX IF NOT EXISTS idx_chats_name ON chats (COALESCE(name, ''));
+"""
+
+WORDS = (
+    "appointment botox filler consultation tomorrow today price clinic "
+    "thank you please confirm booking reschedule morning afternoon "
+    "skin laser treatment follow-up voucher promotion address parking"
+).split()
+
+
+def phone_number(rng: random.Random) -> str:
+    return "66" + "".join(rng.choice("0123456789") for _ in range(9))
+
+
+def build_store(path: str, chats: int = 500, messages: int = 50_000, groups: float = 0.1, seed: int = 7) -> str:
+    """Create (or replace) a synthetic messages.db at ``path`` and return the path."""
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+
+    chat_rows = []
+    for i in range(chats):
+        if rng.random() < groups:
+            jid = f"1203630{i:011d}@g.us"
+            name = f"Group {i}"
+        else:
+            jid = f"{phone_number(rng)}@s.whatsapp.net"
+            name = f"Client {i}"
+        chat_rows.append([jid, name, None])
+
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    message_rows = []
+    for i in range(messages):
+        chat = chat_rows[rng.randrange(chats)]
+        is_from_me = rng.random() < 0.4
+        if is_from_me:
+            sender = "66800000000"
+        elif chat[0].endswith("@g.us"):
+            sender = rng.choice(chat_rows)[0].split("@")[0]
+        else:
+            sender = chat[0].split("@")[0]
+        timestamp = start + timedelta(seconds=i * 37 + rng.randrange(30))
+        ts = timestamp.isoformat(sep=" ")
+        media_type = "image" if rng.random() < 0.05 else ""
+        content = " ".join(rng.choice(WORDS) for _ in range(rng.randrange(3, 15)))
+        message_rows.append((f"MSG{i:08d}", chat[0], sender, content, ts, is_from_me, media_type))
+        chat[2] = ts
+
+    # Random numbers can repeat in big stores; keep the first chat of each
+    conn.executemany("INSERT OR IGNORE INTO chats (jid, name, last_message_time) VALUES (?, ?, ?)", chat_rows)
+    conn.executemany(
+        "INSERT INTO messages (id, chat_jid, sender, content, timestamp, is_from_me, media_type) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        message_rows,
+    )
+    conn.commit()
+    conn.close()
+    return path
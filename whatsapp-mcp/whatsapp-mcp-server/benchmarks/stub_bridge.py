@@ -0,0 +1,113 @@
+"""Local stand-in for the Go bridge's REST API.
+
+Answers POST /api/send and /api/download the way whatsapp-bridge/main.go
+does, without a linked WhatsApp account, so the bridge client can be
+benchmarked (or the MCP server exercised) offline. Connections are kept
+alive (HTTP/1.1), like the Go server's.
+
+Usage:
+    python benchmarks/stub_bridge.py [--port 8080] [--latency-ms 0] [--fail-rate 0]
+
+--fail-rate makes that fraction of sends fail with HTTP 500 and "Not
+connected to WhatsApp", as the bridge does while it reconnects; the bulk
+sender retries those.
+
+From a benchmark, ``start()`` runs it on a background thread and returns the
+base URL to put in whatsapp.WHATSAPP_API_BASE_URL.
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+
+class BridgeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send each response as one segment: headers and body written separately
+    # on a kept-alive socket otherwise hit Nagle + delayed ACK (~40 ms a reply)
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            self._reply(400, {"success": False, "message": "Invalid request format"})
+            return
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.requests += 1
+
+        if self.path == "/api/send":
+            recipient = request.get("recipient", "")
+            if not recipient:
+                self._reply(400, {"success": False, "message": "Recipient is required"})
+            elif random.random() < self.server.fail_rate:
+                self._reply(500, {"success": False, "message": "Not connected to WhatsApp"})
+            else:
+                self._reply(200, {"success": True, "message": f"Message sent to {recipient}"})
+        elif self.path == "/api/download":
+            # Like the bridge, write the file once under a per-chat directory
+            message_id = request.get("message_id", "")
+            chat_dir = os.path.join(self.server.media_dir, request.get("chat_jid", "").replace(":", "_"))
+            path = os.path.join(chat_dir, f"{message_id}.jpg")
+            if not os.path.exists(path):
+                os.makedirs(chat_dir, exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(os.urandom(64 * 1024))
+            self._reply(200, {
+                "success": True,
+                "message": "Successfully downloaded media",
+                "filename": message_id,
+                "path": path,
+            })
+        else:
+            self._reply(404, {"success": False, "message": "Not found"})
+
+    def _reply(self, status: int, result: dict):
+        body = json.dumps(result).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start(port: int = 0, latency: float = 0.0, fail_rate: float = 0.0) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve the stub on a daemon thread. Returns the server and its API base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), BridgeHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.fail_rate = fail_rate
+    server.media_dir = tempfile.mkdtemp(prefix="stub-bridge-")
+    server.lock = threading.Lock()
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of sends answered with HTTP 500, not connected")
+    args = parser.parse_args()
+
+    server, url = start(args.port, args.latency_ms / 1000, args.fail_rate)
+    print(f"Stub bridge listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,110 @@
+"""Pooled HTTP clients for the Go bridge's REST API.
+
+Every bridge call used to go through a bare ``requests.post``, which opens
+(and tears down) a new TCP connection per request. The clients here keep
+connections to the bridge alive and reuse them:
+
+- ``post()`` uses a process-wide ``requests.Session`` whose HTTPAdapter keeps
+  up to POOL_SIZE connections, so it can be shared by the threads that
+  call the bridge concurrently;
+- ``async_post()`` uses an ``httpx.AsyncClient`` (one per event loop) with
+  the same limits, for callers that must stay on an event loop.
+
+whatsapp_async.py posts with ``post()`` from its bridge thread pool rather
+than with ``async_post()``: httpx's pool checks every connection on each
+request, which made concurrent sends slower than the pooled session's (see
+benchmarks/bench_bridge.py).
+"""
+
+import asyncio
+import atexit
+import threading
+import weakref
+from typing import Any, Dict, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# Connections kept open to the bridge; also the number of requests that can
+# be in flight at once without opening extra, unpooled connections.
+POOL_SIZE = 10
+
+# Seconds to wait for a connection, and for the bridge to answer. Sending
+# media includes the upload to WhatsApp, so the read timeout is generous.
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 120.0
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def configure(
+    pool_size: Optional[int] = None,
+    connect_timeout: Optional[float] = None,
+    read_timeout: Optional[float] = None
+) -> None:
+    """Change the pool size or timeouts. Clients are recreated on next use."""
+    global POOL_SIZE, CONNECT_TIMEOUT, READ_TIMEOUT
+    if pool_size is not None:
+        POOL_SIZE = pool_size
+    if connect_timeout is not None:
+        CONNECT_TIMEOUT = connect_timeout
+    if read_timeout is not None:
+        READ_TIMEOUT = read_timeout
+    close()
+    _async_clients.clear()
+
+
+def session() -> requests.Session:
+    """The shared, pooled session for blocking calls."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def post(url: str, payload: Dict[str, Any]) -> requests.Response:
+    """POST a JSON payload to the bridge over a pooled keep-alive connection."""
+    return session().post(url, json=payload, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+
+
+def async_client() -> httpx.AsyncClient:
+    """The pooled async client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        )
+    return client
+
+
+async def async_post(url: str, payload: Dict[str, Any]) -> httpx.Response:
+    """POST a JSON payload to the bridge from an event loop."""
+    return await async_client().post(url, json=payload)
+
+
+async def aclose() -> None:
+    """Close the running event loop's async client."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def close() -> None:
+    """Close the blocking session; async clients are dropped with their event loops."""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+atexit.register(close)
@@ -0,0 +1,137 @@
+import atexit
+import os
+import sqlite3
+import threading
+from urllib.parse import quote
+
+# Number of prepared statements kept per connection. The query functions in
+# whatsapp.py use a small, fixed set of SQL strings, so this comfortably keeps
+# all of them compiled for the lifetime of the connection.
+STATEMENT_CACHE_SIZE = 256
+
+# How long a reader waits on a lock held by the bridge before giving up.
+BUSY_TIMEOUT_SECONDS = 5.0
+
+
+def read_only_uri(path: str) -> str:
+    """Build a read-only SQLite URI for a database file."""
+    return f"file:{quote(os.path.abspath(path))}?mode=ro"
+
+
+class ConnectionPool:
+    """Per-thread pool of long-lived, read-only SQLite connections.
+
+    Each thread gets its own connection, opened lazily on first use and kept
+    open until the pool is closed. Connections are read-only (the Go bridge is
+    the only writer), keep a large prepared-statement cache, and run every
+    SELECT in autocommit mode so they never pin an old WAL snapshot between
+    calls.
+
+    A connection is transparently reopened when the requested database path
+    changes or when the file on disk is replaced (e.g. the bridge store was
+    reset).
+    """
+
+    def __init__(self, cached_statements: int = STATEMENT_CACHE_SIZE, timeout: float = BUSY_TIMEOUT_SECONDS):
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = set()
+
+    def _open(self, path: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            read_only_uri(path),
+            uri=True,
+            timeout=self.timeout,
+            cached_statements=self.cached_statements,
+            # Ownership is per thread; this only allows close_all() to run
+            # from whichever thread shuts the pool down.
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA query_only = ON")
+        # In WAL mode readers never block the bridge and vice versa, so the
+        # connection can simply stay open. In rollback-journal mode a reader
+        # only holds its shared lock while a statement is running, which is
+        # also safe as long as cursors are drained promptly.
+        self._local.journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        with self._lock:
+            self._connections.add(conn)
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._connections.discard(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def get(self, path: str) -> sqlite3.Connection:
+        """Return the calling thread's connection to ``path``, opening it if needed."""
+        local = self._local
+        conn = getattr(local, "conn", None)
+        try:
+            stat = os.stat(path)
+            file_id = (stat.st_dev, stat.st_ino)
+        except OSError:
+            # Let sqlite3 raise its usual "unable to open database file".
+            file_id = None
+
+        if conn is not None and (local.path != path or local.file_id != file_id):
+            self._discard(conn)
+            conn = None
+
+        if conn is None:
+            conn = self._open(path)
+            local.conn = conn
+            local.path = path
+            local.file_id = file_id
+            local.attached = {}
+        return conn
+
+    def owns(self, conn: sqlite3.Connection) -> bool:
+        """Whether ``conn`` is the calling thread's pooled connection."""
+        return getattr(self._local, "conn", None) is conn
+
+    def attach(self, conn: sqlite3.Connection, name: str, path: str) -> bool:
+        """Attach another database read-only to the calling thread's connection.
+
+        Does nothing if it is already attached. Returns False if ``path`` does
+        not exist (yet), so callers can fall back to queries that don't need it.
+        """
+        attached = getattr(self._local, "attached", None)
+        if attached is None or not self.owns(conn):
+            raise ValueError("attach() needs the calling thread's pooled connection")
+        if attached.get(name) == path:
+            return True
+        if not os.path.exists(path):
+            return False
+        if name in attached:
+            conn.execute(f"DETACH DATABASE {name}")
+            del attached[name]
+        conn.execute(f"ATTACH DATABASE ? AS {name}", (read_only_uri(path),))
+        attached[name] = path
+        return True
+
+    @property
+    def journal_mode(self) -> str:
+        """Journal mode seen by the calling thread's connection, if open."""
+        return getattr(self._local, "journal_mode", None)
+
+    def close_all(self) -> None:
+        """Close every connection owned by the pool, across all threads."""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        # Threads notice their connection is gone on next use.
+        self._local = threading.local()
+
+
+pool = ConnectionPool()
+atexit.register(pool.close_all)
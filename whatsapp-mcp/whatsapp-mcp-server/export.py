@@ -0,0 +1,161 @@
+"""Bulk export of messages for analytics jobs.
+
+Streams messages from whatsapp.iter_messages straight to a file, so a whole
+chat, a date range or the full archive can be exported in constant memory
+instead of paging through the MCP tools.
+
+Formats:
+    jsonl    one JSON object per message
+    csv      header row plus one row per message
+    columns  JSON lines, each a chunk of up to ``chunk_rows`` messages stored
+             column-wise ({"timestamp": [...], "content": [...], ...})
+    parquet  Parquet file with one row group per chunk (needs pyarrow)
+
+Usage:
+    python export.py OUTPUT [--format jsonl|csv|columns|parquet] [--chat-jid JID]
+                     [--sender PHONE] [--after ISO] [--before ISO] [--query TEXT]
+
+OUTPUT may be "-" for stdout (not for parquet). The format defaults to the
+output file's extension.
+"""
+
+import csv
+import json
+import os
+import sys
+from itertools import islice
+from typing import IO, Iterable, Iterator, List, Optional
+
+from whatsapp import Message, iter_messages, message_columns, message_records
+
+FORMATS = ("jsonl", "csv", "columns", "parquet")
+
+FIELDS = ("timestamp", "chat_jid", "chat_name", "id", "sender", "is_from_me", "content", "media_type")
+
+# Messages converted per chunk, and per chunk/row group in the columnar formats.
+CHUNK_ROWS = 10_000
+
+
+def _batches(messages: Iterable[Message], size: int) -> Iterator[List[Message]]:
+    messages = iter(messages)
+    while batch := list(islice(messages, size)):
+        yield batch
+
+
+def _write_jsonl(batches: Iterator[List[Message]], out: IO[str]) -> None:
+    for batch in batches:
+        for record in message_records(batch, FIELDS):
+            out.write(json.dumps(record, ensure_ascii=False))
+            out.write("\n")
+
+
+def _write_csv(batches: Iterator[List[Message]], out: IO[str]) -> None:
+    writer = csv.writer(out)
+    writer.writerow(FIELDS)
+    for batch in batches:
+        writer.writerows(zip(*message_columns(batch, FIELDS).values()))
+
+
+def _write_columns(batches: Iterator[List[Message]], out: IO[str]) -> None:
+    for batch in batches:
+        out.write(json.dumps(message_columns(batch, FIELDS), ensure_ascii=False))
+        out.write("\n")
+
+
+def _write_parquet(batches: Iterator[List[Message]], path: str) -> None:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet export needs pyarrow (pip install pyarrow); use --format columns instead")
+
+    schema = pa.schema([
+        ("timestamp", pa.string()),
+        ("chat_jid", pa.string()),
+        ("chat_name", pa.string()),
+        ("id", pa.string()),
+        ("sender", pa.string()),
+        ("is_from_me", pa.bool_()),
+        ("content", pa.string()),
+        ("media_type", pa.string()),
+    ])
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in batches:
+            writer.write_table(pa.Table.from_pydict(message_columns(batch, FIELDS), schema=schema))
+
+
+def export_messages(
+    output: str,
+    format: Optional[str] = None,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    sender_phone_number: Optional[str] = None,
+    chat_jid: Optional[str] = None,
+    query: Optional[str] = None,
+    chunk_rows: int = CHUNK_ROWS
+) -> int:
+    """Export the messages matching the filters (as for list_messages) to ``output``.
+
+    Returns the number of messages written.
+    """
+    if format is None:
+        format = os.path.splitext(output)[1].lstrip(".").lower() or "jsonl"
+    if format not in FORMATS:
+        raise ValueError(f"Unknown export format: {format}. Use one of {', '.join(FORMATS)}.")
+
+    count = 0
+
+    def batches() -> Iterator[List[Message]]:
+        nonlocal count
+        for batch in _batches(iter_messages(after, before, sender_phone_number, chat_jid, query), chunk_rows):
+            count += len(batch)
+            yield batch
+
+    if format == "parquet":
+        if output == "-":
+            raise ValueError("Parquet export needs an output file")
+        _write_parquet(batches(), output)
+        return count
+
+    out = sys.stdout if output == "-" else open(output, "w", encoding="utf-8", newline="")
+    try:
+        if format == "jsonl":
+            _write_jsonl(batches(), out)
+        elif format == "csv":
+            _write_csv(batches(), out)
+        else:
+            _write_columns(batches(), out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return count
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export WhatsApp messages to JSONL, CSV or columnar chunks")
+    parser.add_argument("output", help='output file, or "-" for stdout')
+    parser.add_argument("--format", choices=FORMATS, help="output format (default: from the file extension)")
+    parser.add_argument("--chat-jid", help="only messages in this chat")
+    parser.add_argument("--sender", help="only messages from this sender")
+    parser.add_argument("--after", help="only messages after this ISO-8601 date")
+    parser.add_argument("--before", help="only messages before this ISO-8601 date")
+    parser.add_argument("--query", help="only messages containing this text")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="messages per chunk for columns/parquet")
+    args = parser.parse_args()
+
+    try:
+        written = export_messages(
+            args.output,
+            format=args.format,
+            after=args.after,
+            before=args.before,
+            sender_phone_number=args.sender,
+            chat_jid=args.chat_jid,
+            query=args.query,
+            chunk_rows=args.chunk_rows
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Exported {written} messages", file=sys.stderr)
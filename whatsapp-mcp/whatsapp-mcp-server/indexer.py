@@ -0,0 +1,242 @@
+import os
+import sqlite3
+import sys
+import threading
+from typing import Dict, Optional
+
+import db
+
+# Derived indexes live in their own database next to messages.db. The bridge
+# stays the only writer of messages.db (and its SQLite build does not need
+# FTS5); the MCP server is the only writer of the sidecar.
+INDEX_DB_NAME = "mcp_index.db"
+
+# Schema name the sidecar is attached under on reader connections.
+INDEX_SCHEMA = "idx"
+
+# Rows indexed per transaction. Keeps the write lock short so a large backlog
+# (e.g. the first build over an existing archive) never stalls readers.
+SYNC_BATCH_ROWS = 20_000
+
+# Backlogs up to this size are indexed inline by the caller before a query;
+# anything bigger is handed to a background thread and queries fall back to
+# their unindexed form (LIKE search, per-chat last message lookup) until it
+# has caught up.
+SYNC_INLINE_ROWS = 5_000
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS index_state (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+
+    -- Trigram tokens give substring matching (the same semantics as the old
+    -- LIKE '%q%' search) and work for scripts without word separators, such
+    -- as Thai.
+    CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5(
+        content,
+        tokenize = 'trigram'
+    );
+
+    -- Most recent message of every chat, so listing chats joins one row per
+    -- chat by primary key instead of searching messages.
+    CREATE TABLE IF NOT EXISTS chat_last_message (
+        chat_jid TEXT PRIMARY KEY,
+        message_rowid INTEGER NOT NULL,
+        timestamp TIMESTAMP
+    );
+
+    -- Name and JID of every chat under the chat's rowid. Trigrams answer the
+    -- LIKE '%q%' lookups on chats (contact search, matching a sender's
+    -- number within JIDs) with a candidate set that callers re-check
+    -- against chats itself, so results are the same as scanning it.
+    CREATE VIRTUAL TABLE IF NOT EXISTS chat_fts USING fts5(
+        name,
+        jid,
+        tokenize = 'trigram'
+    );
+
+    -- Superseded by chat_fts.
+    DROP TABLE IF EXISTS chat_phones;
+"""
+
+# Folds the messages in a rowid range into chat_last_message. Rows are applied
+# in rowid order, so of two messages with the same timestamp the later one
+# wins, matching ORDER BY timestamp DESC, rowid DESC.
+LAST_MESSAGE_UPSERT = """
+    INSERT INTO chat_last_message (chat_jid, message_rowid, timestamp)
+    SELECT chat_jid, rowid, timestamp
+    FROM src.messages
+    WHERE rowid > ? AND rowid <= ?
+    ORDER BY rowid
+    ON CONFLICT (chat_jid) DO UPDATE SET
+        message_rowid = excluded.message_rowid,
+        timestamp = excluded.timestamp
+    WHERE COALESCE(excluded.timestamp, '') >= COALESCE(chat_last_message.timestamp, '')
+"""
+
+
+def index_path(messages_db_path: str) -> str:
+    """Path of the sidecar index database for a messages database."""
+    return os.path.join(os.path.dirname(os.path.abspath(messages_db_path)), INDEX_DB_NAME)
+
+
+class Indexer:
+    """Maintains the sidecar index database for one messages.db.
+
+    Rows are indexed incrementally by rowid: the bridge only ever appends to
+    messages (INSERT OR REPLACE re-inserts a row under a new rowid), so every
+    row above the last indexed rowid is new. Index entries whose rowid no
+    longer exists simply stop joining back to messages. Chats are indexed the
+    same way, since the bridge also writes them with INSERT OR REPLACE.
+    """
+
+    def __init__(self, messages_db_path: str):
+        self.messages_db_path = messages_db_path
+        self.path = index_path(messages_db_path)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._background = None
+        self.available = True
+        self.indexed_rowid = 0
+        self.indexed_chat_rowid = 0
+
+    def _writer(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=db.BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            tables = {name for name, in conn.execute("SELECT name FROM sqlite_master")}
+            conn.executescript(SCHEMA)
+            conn.execute("ATTACH DATABASE ? AS src", (db.read_only_uri(self.messages_db_path),))
+            state = dict(conn.execute("SELECT key, value FROM index_state"))
+            self.indexed_rowid = state.get("messages_rowid", 0)
+            self.indexed_chat_rowid = state.get("chats_rowid", 0)
+            if "chat_fts" not in tables:
+                # Sidecar from before chat_fts existed: index every chat again
+                self.indexed_chat_rowid = 0
+            if "chat_last_message" not in tables and self.indexed_rowid:
+                # Sidecar from before chat_last_message existed: catch the
+                # new table up with the rows already in the search index.
+                with conn:
+                    conn.execute(LAST_MESSAGE_UPSERT, (0, self.indexed_rowid))
+            self._conn = conn
+        return self._conn
+
+    def _sync_batch(self, conn: sqlite3.Connection) -> int:
+        """Index the next batch of messages; returns the number of rows scanned."""
+        rows = conn.execute("""
+            SELECT rowid, content
+            FROM src.messages
+            WHERE rowid > ?
+            ORDER BY rowid
+            LIMIT ?
+        """, (self.indexed_rowid, SYNC_BATCH_ROWS)).fetchall()
+        if not rows:
+            return 0
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO message_fts (rowid, content) VALUES (?, ?)",
+                [row for row in rows if row[1]]
+            )
+            conn.execute(LAST_MESSAGE_UPSERT, (self.indexed_rowid, rows[-1][0]))
+            conn.execute(
+                "INSERT OR REPLACE INTO index_state (key, value) VALUES ('messages_rowid', ?)",
+                (rows[-1][0],)
+            )
+        self.indexed_rowid = rows[-1][0]
+        return len(rows)
+
+    def _sync_chats_batch(self, conn: sqlite3.Connection) -> int:
+        """Index the names and JIDs of the next batch of chats; returns the number of rows scanned."""
+        rows = conn.execute("""
+            SELECT rowid, name, jid
+            FROM src.chats
+            WHERE rowid > ?
+            ORDER BY rowid
+            LIMIT ?
+        """, (self.indexed_chat_rowid, SYNC_BATCH_ROWS)).fetchall()
+        if not rows:
+            return 0
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO chat_fts (rowid, name, jid) VALUES (?, ?, ?)", rows)
+            conn.execute(
+                "INSERT OR REPLACE INTO index_state (key, value) VALUES ('chats_rowid', ?)",
+                (rows[-1][0],)
+            )
+        self.indexed_chat_rowid = rows[-1][0]
+        return len(rows)
+
+    def sync(self) -> None:
+        """Index everything the bridge has written so far."""
+        with self._lock:
+            if not self.available:
+                return
+            try:
+                conn = self._writer()
+                while self._sync_batch(conn) == SYNC_BATCH_ROWS:
+                    pass
+                while self._sync_chats_batch(conn) == SYNC_BATCH_ROWS:
+                    pass
+            except sqlite3.Error as e:
+                # Most likely SQLite without FTS5/trigram support or a
+                # read-only store directory; searches keep using LIKE.
+                print(f"Search index disabled: {e}", file=sys.stderr)
+                self.available = False
+
+    def _sync_in_background(self) -> None:
+        if self._background is None or not self._background.is_alive():
+            self._background = threading.Thread(target=self.sync, name="whatsapp-indexer", daemon=True)
+            self._background.start()
+
+    def ensure_fresh(self, max_rowid: Optional[int], max_chat_rowid: Optional[int] = None) -> bool:
+        """Bring the index up to ``max_rowid`` (and ``max_chat_rowid``) if that is cheap.
+
+        Returns True if the index covers every message up to ``max_rowid`` and
+        every chat up to ``max_chat_rowid``, and can be used for this query.
+        """
+        if not self.available:
+            return False
+        if self._conn is None:
+            with self._lock:
+                try:
+                    self._writer()
+                except sqlite3.Error as e:
+                    print(f"Search index disabled: {e}", file=sys.stderr)
+                    self.available = False
+                    return False
+        backlog = (
+            max(0, (max_rowid or 0) - self.indexed_rowid)
+            + max(0, (max_chat_rowid or 0) - self.indexed_chat_rowid)
+        )
+        if backlog <= 0:
+            return True
+        if backlog <= SYNC_INLINE_ROWS:
+            self.sync()
+            return (
+                self.available
+                and self.indexed_rowid >= (max_rowid or 0)
+                and self.indexed_chat_rowid >= (max_chat_rowid or 0)
+            )
+        self._sync_in_background()
+        return False
+
+
+_indexers: Dict[str, Indexer] = {}
+_indexers_lock = threading.Lock()
+
+
+def get_indexer(messages_db_path: str) -> Indexer:
+    """Return the process-wide indexer for a messages database."""
+    with _indexers_lock:
+        indexer = _indexers.get(messages_db_path)
+        if indexer is None:
+            indexer = _indexers[messages_db_path] = Indexer(messages_db_path)
+        return indexer
+
+
+def attach(conn: sqlite3.Connection, messages_db_path: str) -> bool:
+    """Attach the sidecar index read-only to a pooled reader connection.
+
+    Returns False if there is no sidecar yet.
+    """
+    return db.pool.attach(conn, INDEX_SCHEMA, index_path(messages_db_path))
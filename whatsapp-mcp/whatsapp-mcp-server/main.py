@@ -1,6 +1,10 @@
-from typing import List, Dict, Any, Optional
+import sqlite3
+import sys
+from typing import List, Dict, Any, Optional, Union
 from mcp.server.fastmcp import FastMCP
-from whatsapp import (
+from migrations import ensure_indexes
+from whatsapp import MESSAGES_DB_PATH
+from whatsapp_async import (
     search_contacts as whatsapp_search_contacts,
     list_messages as whatsapp_list_messages,
     list_chats as whatsapp_list_chats,
@@ -10,6 +14,7 @@ from whatsapp import (
     get_last_interaction as whatsapp_get_last_interaction,
     get_message_context as whatsapp_get_message_context,
     send_message as whatsapp_send_message,
+    send_messages_bulk as whatsapp_send_messages_bulk,
     send_file as whatsapp_send_file,
     send_audio_message as whatsapp_audio_voice_message,
     download_media as whatsapp_download_media
@@ -19,17 +24,17 @@ from whatsapp import (
 mcp = FastMCP("whatsapp")
 
 @mcp.tool()
-def search_contacts(query: str) -> List[Dict[str, Any]]:
+async def search_contacts(query: str) -> List[Dict[str, Any]]:
     """Search WhatsApp contacts by name or phone number.
     
     Args:
         query: Search term to match against contact names or phone numbers
     """
-    contacts = whatsapp_search_contacts(query)
-    return contacts
+    contacts = await whatsapp_search_contacts(query)
+    return [contact.to_dict() for contact in contacts]
 
 @mcp.tool()
-def list_messages(
+async def list_messages(
     after: Optional[str] = None,
     before: Optional[str] = None,
     sender_phone_number: Optional[str] = None,
@@ -39,8 +44,13 @@ def list_messages(
     page: int = 0,
     include_context: bool = True,
     context_before: int = 1,
-    context_after: int = 1
-) -> List[Dict[str, Any]]:
+    context_after: int = 1,
+    sort_by: str = "timestamp",
+    highlight: bool = False,
+    cursor: Optional[str] = None,
+    output: str = "text",
+    fields: Optional[List[str]] = None
+) -> Union[str, Dict[str, Any]]:
     """Get WhatsApp messages matching specified criteria with optional context.
     
     Args:
@@ -54,8 +64,16 @@ def list_messages(
         include_context: Whether to include messages before and after matches (default True)
         context_before: Number of messages to include before each match (default 1)
         context_after: Number of messages to include after each match (default 1)
+        sort_by: Order of query matches, either "timestamp" (newest first) or "relevance" (default "timestamp")
+        highlight: Whether to show a highlighted snippet of each query match instead of its full content (default False)
+        cursor: Optional "Next page cursor" value from a previous result; fetches the page after it (faster than page for deep pages)
+        output: "text" for a formatted listing, "records" for a list of message objects or "columns" for one array per field (default "text")
+        fields: Optional fields to include with "records"/"columns": id, chat_jid, chat_name, timestamp, sender, sender_name, is_from_me, content, media_type, snippet, match
+    
+    Returns:
+        The formatted listing, or for "records"/"columns" a dictionary with the messages and the next_cursor for the following page
     """
-    messages = whatsapp_list_messages(
+    messages = await whatsapp_list_messages(
         after=after,
         before=before,
         sender_phone_number=sender_phone_number,
@@ -65,18 +83,24 @@ def list_messages(
         page=page,
         include_context=include_context,
         context_before=context_before,
-        context_after=context_after
+        context_after=context_after,
+        sort_by=sort_by,
+        highlight=highlight,
+        cursor=cursor,
+        output=output,
+        fields=fields
     )
     return messages
 
 @mcp.tool()
-def list_chats(
+async def list_chats(
     query: Optional[str] = None,
     limit: int = 20,
     page: int = 0,
     include_last_message: bool = True,
-    sort_by: str = "last_active"
-) -> List[Dict[str, Any]]:
+    sort_by: str = "last_active",
+    cursor: Optional[str] = None
+) -> Dict[str, Any]:
     """Get WhatsApp chats matching specified criteria.
     
     Args:
@@ -85,61 +109,78 @@ def list_chats(
         page: Page number for pagination (default 0)
         include_last_message: Whether to include the last message in each chat (default True)
         sort_by: Field to sort results by, either "last_active" or "name" (default "last_active")
+        cursor: Optional next_cursor from a previous result; fetches the page after it (faster than page for deep pages)
+    
+    Returns:
+        A dictionary with the chats and the next_cursor for the following page (null on the last page)
     """
-    chats = whatsapp_list_chats(
+    chats = await whatsapp_list_chats(
         query=query,
         limit=limit,
         page=page,
         include_last_message=include_last_message,
-        sort_by=sort_by
+        sort_by=sort_by,
+        cursor=cursor
     )
-    return chats
+    return {
+        "chats": [chat.to_dict() for chat in chats],
+        "next_cursor": chats.next_cursor
+    }
 
 @mcp.tool()
-def get_chat(chat_jid: str, include_last_message: bool = True) -> Dict[str, Any]:
+async def get_chat(chat_jid: str, include_last_message: bool = True) -> Dict[str, Any]:
     """Get WhatsApp chat metadata by JID.
     
     Args:
         chat_jid: The JID of the chat to retrieve
         include_last_message: Whether to include the last message (default True)
     """
-    chat = whatsapp_get_chat(chat_jid, include_last_message)
-    return chat
+    chat = await whatsapp_get_chat(chat_jid, include_last_message)
+    return chat.to_dict() if chat else None
 
 @mcp.tool()
-def get_direct_chat_by_contact(sender_phone_number: str) -> Dict[str, Any]:
+async def get_direct_chat_by_contact(sender_phone_number: str) -> Dict[str, Any]:
     """Get WhatsApp chat metadata by sender phone number.
     
     Args:
         sender_phone_number: The phone number to search for
     """
-    chat = whatsapp_get_direct_chat_by_contact(sender_phone_number)
-    return chat
+    chat = await whatsapp_get_direct_chat_by_contact(sender_phone_number)
+    return chat.to_dict() if chat else None
 
 @mcp.tool()
-def get_contact_chats(jid: str, limit: int = 20, page: int = 0) -> List[Dict[str, Any]]:
+async def get_contact_chats(jid: str, limit: int = 20, page: int = 0, cursor: Optional[str] = None) -> Dict[str, Any]:
     """Get all WhatsApp chats involving the contact.
     
     Args:
         jid: The contact's JID to search for
         limit: Maximum number of chats to return (default 20)
         page: Page number for pagination (default 0)
+        cursor: Optional next_cursor from a previous result; fetches the page after it (faster than page for deep pages)
+    
+    Returns:
+        A dictionary with the chats and the next_cursor for the following page (null on the last page)
     """
-    chats = whatsapp_get_contact_chats(jid, limit, page)
-    return chats
+    chats = await whatsapp_get_contact_chats(jid, limit, page, cursor)
+    return {
+        "chats": [chat.to_dict() for chat in chats],
+        "next_cursor": chats.next_cursor
+    }
 
 @mcp.tool()
-def get_last_interaction(jid: str) -> str:
+async def get_last_interaction(jid: str, output: str = "text", fields: Optional[List[str]] = None) -> Union[str, Dict[str, Any]]:
     """Get most recent WhatsApp message involving the contact.
     
     Args:
         jid: The JID of the contact to search for
+        output: "text" for the formatted message or "records" for a message object (default "text")
+        fields: Optional fields to include with "records" (same as list_messages)
     """
-    message = whatsapp_get_last_interaction(jid)
+    message = await whatsapp_get_last_interaction(jid, output, fields)
     return message
 
 @mcp.tool()
-def get_message_context(
+async def get_message_context(
     message_id: str,
     before: int = 5,
     after: int = 5
@@ -151,11 +192,11 @@ def get_message_context(
         before: Number of messages to include before the target message (default 5)
         after: Number of messages to include after the target message (default 5)
     """
-    context = whatsapp_get_message_context(message_id, before, after)
-    return context
+    context = await whatsapp_get_message_context(message_id, before, after)
+    return context.to_dict()
 
 @mcp.tool()
-def send_message(
+async def send_message(
     recipient: str,
     message: str
 ) -> Dict[str, Any]:
@@ -177,14 +218,43 @@ def send_message(
         }
     
     # Call the whatsapp_send_message function with the unified recipient parameter
-    success, status_message = whatsapp_send_message(recipient, message)
+    success, status_message = await whatsapp_send_message(recipient, message)
     return {
         "success": success,
         "message": status_message
     }
 
 @mcp.tool()
-def send_file(recipient: str, media_path: str) -> Dict[str, Any]:
+async def send_messages_bulk(
+    recipients: List[Union[str, Dict[str, Any]]],
+    message: Optional[str] = None,
+    concurrency: int = 4,
+    rate: Optional[float] = 5.0
+) -> Dict[str, Any]:
+    """Send a WhatsApp message to many people or groups at once, e.g. appointment reminders.
+
+    Args:
+        recipients: Phone numbers (country code, no + or other symbols) or JIDs. An entry can also be an
+                 object with a "recipient" plus either its own "message" or fields to fill into the template,
+                 e.g. {"recipient": "123456789", "name": "Ann", "time": "10:00"}
+        message: The message text, or a template like "Hi {name}, see you at {time}" filled in per recipient
+        concurrency: Maximum number of messages being sent at the same time (default 4)
+        rate: Maximum number of messages started per second, or null for no limit (default 5)
+    
+    Returns:
+        A dictionary with the number of messages sent and failed, and one result per recipient
+        (recipient, success, message, attempts) in the order given
+    """
+    results = await whatsapp_send_messages_bulk(recipients, message, concurrency=concurrency, rate=rate)
+    sent = sum(1 for result in results if result["success"])
+    return {
+        "sent": sent,
+        "failed": len(results) - sent,
+        "results": results
+    }
+
+@mcp.tool()
+async def send_file(recipient: str, media_path: str) -> Dict[str, Any]:
     """Send a file such as a picture, raw audio, video or document via WhatsApp to the specified recipient. For group messages use the JID.
     
     Args:
@@ -197,14 +267,14 @@ def send_file(recipient: str, media_path: str) -> Dict[str, Any]:
     """
     
     # Call the whatsapp_send_file function
-    success, status_message = whatsapp_send_file(recipient, media_path)
+    success, status_message = await whatsapp_send_file(recipient, media_path)
     return {
         "success": success,
         "message": status_message
     }
 
 @mcp.tool()
-def send_audio_message(recipient: str, media_path: str) -> Dict[str, Any]:
+async def send_audio_message(recipient: str, media_path: str) -> Dict[str, Any]:
     """Send any audio file as a WhatsApp audio message to the specified recipient. For group messages use the JID. If it errors due to ffmpeg not being installed, use send_file instead.
     
     Args:
@@ -215,14 +285,14 @@ def send_audio_message(recipient: str, media_path: str) -> Dict[str, Any]:
     Returns:
         A dictionary containing success status and a status message
     """
-    success, status_message = whatsapp_audio_voice_message(recipient, media_path)
+    success, status_message = await whatsapp_audio_voice_message(recipient, media_path)
     return {
         "success": success,
         "message": status_message
     }
 
 @mcp.tool()
-def download_media(message_id: str, chat_jid: str) -> Dict[str, Any]:
+async def download_media(message_id: str, chat_jid: str) -> Dict[str, Any]:
     """Download media from a WhatsApp message and get the local file path.
     
     Args:
@@ -232,7 +302,7 @@ def download_media(message_id: str, chat_jid: str) -> Dict[str, Any]:
     Returns:
         A dictionary containing success status, a status message, and the file path if successful
     """
-    file_path = whatsapp_download_media(message_id, chat_jid)
+    file_path = await whatsapp_download_media(message_id, chat_jid)
     
     if file_path:
         return {
@@ -247,5 +317,11 @@ def download_media(message_id: str, chat_jid: str) -> Dict[str, Any]:
         }
 
 if __name__ == "__main__":
+    # Add any indexes the query tools need that an older bridge didn't create
+    try:
+        ensure_indexes(MESSAGES_DB_PATH)
+    except sqlite3.Error as e:
+        print(f"Could not create message indexes: {e}", file=sys.stderr)
+
     # Initialize and run the server
     mcp.run(transport='stdio')
\ No newline at end of file
@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import statistics
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import db
+
+# Indexes the query functions in whatsapp.py rely on. The bridge creates the
+# same indexes (see NewMessageStore in whatsapp-bridge/main.go); this covers
+# stores created by older bridge builds. Keep the two lists in sync.
+INDEXES = {
+    "idx_messages_chat_timestamp": "CREATE INDEX IF NOT EXISTS idx_messages_chat_timestamp ON messages (chat_jid, timestamp)",
+    "idx_messages_timestamp": "CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages (timestamp)",
+    "idx_messages_sender_timestamp": "CREATE INDEX IF NOT EXISTS idx_messages_sender_timestamp ON messages (sender, timestamp)",
+    "idx_chats_last_message_time": "CREATE INDEX IF NOT EXISTS idx_chats_last_message_time ON chats (COALESCE(last_message_time, ''))",
+    "idx_chats_name": "CREATE INDEX IF NOT EXISTS idx_chats_name ON chats (COALESCE(name, ''))",
+}
+
+# The access paths of whatsapp.py, reduced to the part each index serves.
+# Parameters are named after the sample values picked by _sample_params().
+PROBE_QUERIES = {
+    "list_messages": """
+        SELECT messages.id FROM messages
+        ORDER BY messages.timestamp DESC, messages.rowid DESC LIMIT 20
+    """,
+    "list_messages(chat_jid)": """
+        SELECT messages.id FROM messages WHERE messages.chat_jid = :chat_jid
+        ORDER BY messages.timestamp DESC, messages.rowid DESC LIMIT 20
+    """,
+    "list_messages(sender)": """
+        SELECT messages.id FROM messages WHERE messages.sender = :sender
+        ORDER BY messages.timestamp DESC, messages.rowid DESC LIMIT 20
+    """,
+    "get_message_context": """
+        SELECT timestamp FROM messages WHERE chat_jid = :chat_jid AND timestamp < :timestamp
+        ORDER BY timestamp DESC LIMIT 1
+    """,
+    "get_message_context(id)": """
+        SELECT rowid FROM messages WHERE id = :message_id LIMIT 1
+    """,
+    "list_chats": """
+        SELECT jid FROM chats
+        ORDER BY COALESCE(last_message_time, '') DESC, rowid DESC LIMIT 20
+    """,
+    "list_chats(name)": """
+        SELECT jid FROM chats
+        ORDER BY COALESCE(name, '') ASC, rowid ASC LIMIT 20
+    """,
+    "list_chats(last message)": """
+        SELECT rowid FROM messages WHERE chat_jid = :chat_jid
+        ORDER BY timestamp DESC, rowid DESC LIMIT 1
+    """,
+    "get_contact_chats": """
+        SELECT DISTINCT chat_jid FROM messages WHERE sender = :sender
+    """,
+}
+
+PROBE_RUNS = 5
+
+
+def _sample_params(conn: sqlite3.Connection) -> Dict[str, object]:
+    row = conn.execute("""
+        SELECT chat_jid, sender, timestamp, id
+        FROM messages
+        WHERE rowid = (SELECT MAX(rowid) FROM messages)
+    """).fetchone() or (None, None, None, None)
+    return dict(zip(("chat_jid", "sender", "timestamp", "message_id"), row))
+
+
+def _plan(conn: sqlite3.Connection, sql: str, params: Dict[str, object]) -> str:
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return "; ".join(row[-1] for row in rows)
+
+
+def _latency_ms(conn: sqlite3.Connection, sql: str, params: Dict[str, object]) -> float:
+    timings = []
+    for _ in range(PROBE_RUNS):
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def probe(conn: sqlite3.Connection) -> Dict[str, Tuple[str, float]]:
+    """Query plan and median latency (ms) of every probe query."""
+    params = _sample_params(conn)
+    return {
+        name: (_plan(conn, sql, params), _latency_ms(conn, sql, params))
+        for name, sql in PROBE_QUERIES.items()
+    }
+
+
+def _access(plan: str) -> str:
+    """Summarise a plan as SCAN (reads the whole table), INDEX (walks an index
+    in order, stopping at the LIMIT) or SEARCH (seeks into an index)."""
+    steps = [step for step in plan.split("; ") if step.startswith("SCAN")]
+    if any("INDEX" not in step for step in steps):
+        return "SCAN"
+    return "INDEX" if steps else "SEARCH"
+
+
+def format_report(before: Dict[str, Tuple[str, float]], after: Dict[str, Tuple[str, float]]) -> str:
+    lines = [f"{'query':<28}{'before':<8}{'after':<8}{'before ms':>11}{'after ms':>11}  plan"]
+    for name, (plan_after, ms_after) in after.items():
+        plan_before, ms_before = before[name]
+        lines.append(
+            f"{name:<28}{_access(plan_before):<8}{_access(plan_after):<8}"
+            f"{ms_before:>11.3f}{ms_after:>11.3f}  {plan_after}"
+        )
+    return "\n".join(lines)
+
+
+def missing_indexes(conn: sqlite3.Connection) -> List[str]:
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    return [name for name in INDEXES if name not in existing]
+
+
+def ensure_indexes(messages_db_path: str, report: bool = True) -> List[str]:
+    """Create any missing whatsapp.py indexes in the bridge's messages.db.
+
+    Meant to run once when the server starts. Returns the names of the
+    indexes created. When something was created and ``report`` is set, a
+    before/after comparison of the probe queries (SCAN vs SEARCH and median
+    latency) is printed to stderr, which keeps stdout free for the MCP stdio
+    transport.
+    """
+    if not os.path.isfile(messages_db_path):
+        # The bridge hasn't created its store yet; it will add the indexes
+        # itself when it does.
+        return []
+
+    conn = sqlite3.connect(messages_db_path, timeout=db.BUSY_TIMEOUT_SECONDS)
+    try:
+        missing = missing_indexes(conn)
+        if not missing:
+            return []
+
+        before = probe(conn) if report else None
+        for name in missing:
+            conn.execute(INDEXES[name])
+        conn.commit()
+        # Refresh planner statistics for the new indexes (cheap; only
+        # analyzes tables that need it).
+        conn.execute("PRAGMA optimize")
+
+        if report:
+            print(f"Created indexes in {messages_db_path}: {', '.join(missing)}", file=sys.stderr)
+            print(format_report(before, probe(conn)), file=sys.stderr)
+        return missing
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    # Index advisor: show how the probe queries run against a store, creating
+    # missing indexes first unless --dry-run is given.
+    import argparse
+    from whatsapp import MESSAGES_DB_PATH
+
+    parser = argparse.ArgumentParser(description="Check and create the indexes used by whatsapp.py")
+    parser.add_argument("db_path", nargs="?", default=MESSAGES_DB_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="only report, don't create indexes")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(db.read_only_uri(args.db_path), uri=True)
+    current = probe(conn)
+    missing = missing_indexes(conn)
+    conn.close()
+
+    if args.dry_run or not missing:
+        print(f"Missing indexes: {', '.join(missing) or 'none'}")
+        print(format_report(current, current))
+    else:
+        ensure_indexes(args.db_path)
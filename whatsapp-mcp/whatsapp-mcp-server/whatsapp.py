@@ -1,98 +1,497 @@
+import base64
+import hashlib
+import random
+import re
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from dataclasses import dataclass
-from typing import Optional, List, Tuple
+from typing import Any, Callable, Optional, List, Tuple, Dict, Iterable, Iterator, Union
 import os.path
 import requests
+from urllib3.exceptions import ConnectTimeoutError
 import json
 import audio
+import bridge
+import db
+import indexer
 
 MESSAGES_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'whatsapp-bridge', 'store', 'messages.db')
 WHATSAPP_API_BASE_URL = "http://localhost:8080/api"
 
-@dataclass
-class Message:
-    timestamp: datetime
-    sender: str
-    content: str
-    is_from_me: bool
-    chat_jid: str
-    id: str
-    chat_name: Optional[str] = None
-    media_type: Optional[str] = None
-
-@dataclass
-class Chat:
-    jid: str
-    name: Optional[str]
-    last_message_time: Optional[datetime]
-    last_message: Optional[str] = None
-    last_sender: Optional[str] = None
-    last_is_from_me: Optional[bool] = None
+def _connect() -> sqlite3.Connection:
+    """Return this thread's pooled, read-only connection to the messages database."""
+    return db.pool.get(MESSAGES_DB_PATH)
+
+# Marks a lazily decoded timestamp that hasn't been parsed yet
+_UNPARSED = object()
+
+def _column(index: int, doc: str) -> property:
+    """Read-only attribute backed by one column of a row type's raw row."""
+    return property(lambda self: self._row[index], doc=doc)
+
+def _parse_timestamp(value: Union[str, datetime, None]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+class _Row:
+    """Base of the row types: slotted objects with a field-wise repr, == and to_dict().
+
+    The MCP tools return ``to_dict()``, which holds plain values (datetimes,
+    strings, nested dicts and lists) that FastMCP can serialize.
+    """
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {}
+        for field in self._fields:
+            value = getattr(self, field)
+            if isinstance(value, _Row):
+                value = value.to_dict()
+            elif isinstance(value, list):
+                value = [item.to_dict() if isinstance(item, _Row) else item for item in value]
+            result[field] = value
+        return result
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self._fields)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+class Message(_Row):
+    """A message row.
+
+    Wraps the raw database row (the MESSAGE_COLUMNS order) and parses the
+    timestamp only when it is first read, so listing or exporting many
+    messages doesn't pay for datetimes nobody looks at.
+    """
+    __slots__ = ("_row", "_timestamp", "snippet")
+    _fields = ("timestamp", "sender", "content", "is_from_me", "chat_jid", "id", "chat_name", "media_type", "snippet")
+
+    def __init__(
+        self,
+        timestamp: Union[datetime, str],
+        sender: str,
+        content: str,
+        is_from_me: bool,
+        chat_jid: str,
+        id: str,
+        chat_name: Optional[str] = None,
+        media_type: Optional[str] = None,
+        snippet: Optional[str] = None
+    ):
+        self._row = (timestamp, sender, chat_name, content, is_from_me, chat_jid, id, media_type)
+        self._timestamp = _UNPARSED
+        self.snippet = snippet
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "Message":
+        """Wrap a result row whose leading columns are MESSAGE_COLUMNS, without decoding it."""
+        message = cls.__new__(cls)
+        message._row = row
+        message._timestamp = _UNPARSED
+        message.snippet = None
+        return message
+
+    @property
+    def timestamp(self) -> datetime:
+        if self._timestamp is _UNPARSED:
+            self._timestamp = _parse_timestamp(self._row[0])
+        return self._timestamp
+
+    sender = _column(1, "Sender JID (user part).")
+    chat_name = _column(2, "Name of the chat the message is in.")
+    content = _column(3, "Text content.")
+    is_from_me = _column(4, "Whether the message was sent from this account.")
+    chat_jid = _column(5, "JID of the chat the message is in.")
+    id = _column(6, "Message ID.")
+    media_type = _column(7, "Media type, empty for text messages.")
+
+class Chat(_Row):
+    """A chat row with its most recent message; the timestamp is parsed on first access."""
+    __slots__ = ("_row", "_last_message_time")
+    _fields = ("jid", "name", "last_message_time", "last_message", "last_sender", "last_is_from_me")
+
+    def __init__(
+        self,
+        jid: str,
+        name: Optional[str],
+        last_message_time: Union[datetime, str, None],
+        last_message: Optional[str] = None,
+        last_sender: Optional[str] = None,
+        last_is_from_me: Optional[bool] = None
+    ):
+        self._row = (jid, name, last_message_time, last_message, last_sender, last_is_from_me)
+        self._last_message_time = _UNPARSED
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "Chat":
+        """Wrap a result row of (jid, name, last_message_time, last message, sender, is_from_me, ...)."""
+        chat = cls.__new__(cls)
+        chat._row = row
+        chat._last_message_time = _UNPARSED
+        return chat
+
+    @property
+    def last_message_time(self) -> Optional[datetime]:
+        if self._last_message_time is _UNPARSED:
+            self._last_message_time = _parse_timestamp(self._row[2] or None)
+        return self._last_message_time
+
+    jid = _column(0, "Chat JID.")
+    name = _column(1, "Chat name, if known.")
+    last_message = _column(3, "Content of the most recent message.")
+    last_sender = _column(4, "Sender of the most recent message.")
+    last_is_from_me = _column(5, "Whether the most recent message was sent from this account.")
 
     @property
     def is_group(self) -> bool:
         """Determine if chat is a group based on JID pattern."""
         return self.jid.endswith("@g.us")
 
-@dataclass
-class Contact:
-    phone_number: str
-    name: Optional[str]
-    jid: str
+class Contact(_Row):
+    __slots__ = ("phone_number", "name", "jid")
+    _fields = __slots__
 
-@dataclass
-class MessageContext:
-    message: Message
-    before: List[Message]
-    after: List[Message]
+    def __init__(self, phone_number: str, name: Optional[str], jid: str):
+        self.phone_number = phone_number
+        self.name = name
+        self.jid = jid
+
+class MessageContext(_Row):
+    __slots__ = ("message", "before", "after")
+    _fields = __slots__
+
+    def __init__(self, message: Message, before: List[Message], after: List[Message]):
+        self.message = message
+        self.before = before
+        self.after = after
+
+class Page(list):
+    """A page of results plus the cursor of the next page (None on the last page)."""
+
+    def __init__(self, items=(), next_cursor: Optional[str] = None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+def _encode_cursor(kind: str, *key) -> str:
+    """Encode the sort key of the last row of a page as an opaque cursor."""
+    return base64.urlsafe_b64encode(json.dumps([kind, *key]).encode()).decode()
+
+def _decode_cursor(cursor: str, kind: str) -> list:
+    """Decode a cursor made by _encode_cursor for the same kind of listing."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        data = None
+    if not isinstance(data, list) or len(data) != 3 or data[0] != kind:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return data[1:]
+
+def _keyset_clause(sort_key: str, rowid: str, direction: str) -> str:
+    """WHERE clause selecting the rows after a cursor's (sort value, rowid).
+
+    Spelled out instead of a row-value comparison so SQLite can start an
+    index range scan on the sort expression; takes (value, value, rowid).
+    """
+    op = "<" if direction == "DESC" else ">"
+    return f"({sort_key} {op}= ? AND ({sort_key} {op} ? OR {rowid} {op} ?))"
+
+# Chat listings sort on these expressions (with rowid as the tie-breaker) so
+# a cursor can resume with a single index seek; COALESCE keeps chats without
+# a name or timestamp in the same place NULL used to sort them.
+CHAT_SORT_KEYS = {
+    "last_active": ("COALESCE(chats.last_message_time, '')", "DESC"),
+    "name": ("COALESCE(chats.name, '')", "ASC"),
+}
+
+MESSAGE_COLUMNS = "messages.timestamp, messages.sender, chats.name, messages.content, messages.is_from_me, chats.jid, messages.id, messages.media_type"
+
+# Highlighted excerpt of a full-text match. Trigram tokens are roughly one
+# character each, so use the largest window FTS5 allows.
+SNIPPET_COLUMN = "snippet(message_fts, 0, '**', '**', '…', 64)"
+
+# Neighbours of every target message, fetched in one pass. Each target gets
+# two correlated subqueries, each a bounded seek on the (chat_jid, timestamp)
+# index (which carries rowid as the tie-breaker): the `before` messages just
+# ahead of it and the `after` messages just past it. The cost is therefore
+# O(targets * (before + after)) regardless of how far apart the targets are
+# or how long the chat is.
+CONTEXT_WINDOW_SQL = f"""
+    WITH targets AS (
+        SELECT t.key AS pos, messages.rowid AS rid, messages.chat_jid, messages.timestamp
+        FROM json_each(:targets) t
+        JOIN messages ON messages.rowid = t.value
+    ),
+    neighbours AS (
+        SELECT pos, 0 AS side, rid FROM targets
+        UNION ALL
+        SELECT t.pos, -1, messages.rowid
+        FROM targets t
+        JOIN messages ON messages.rowid IN (
+            SELECT m.rowid FROM messages m
+            WHERE m.chat_jid = t.chat_jid AND m.timestamp <= t.timestamp
+                AND (m.timestamp < t.timestamp OR m.rowid < t.rid)
+            ORDER BY m.timestamp DESC, m.rowid DESC
+            LIMIT :before
+        )
+        UNION ALL
+        SELECT t.pos, 1, messages.rowid
+        FROM targets t
+        JOIN messages ON messages.rowid IN (
+            SELECT m.rowid FROM messages m
+            WHERE m.chat_jid = t.chat_jid AND m.timestamp >= t.timestamp
+                AND (m.timestamp > t.timestamp OR m.rowid > t.rid)
+            ORDER BY m.timestamp ASC, m.rowid ASC
+            LIMIT :after
+        )
+    )
+    SELECT {MESSAGE_COLUMNS}, n.pos, n.side, n.rid
+    FROM neighbours n
+    JOIN messages ON messages.rowid = n.rid
+    JOIN chats ON messages.chat_jid = chats.jid
+    ORDER BY n.pos, n.side, messages.timestamp, messages.rowid
+"""
+
+def _fetch_message_contexts(cursor: sqlite3.Cursor, rowids: List[int], before: int, after: int) -> List[MessageContext]:
+    """Fetch the context of several messages (by rowid) with a single query.
+
+    Returns one MessageContext per target that still exists, in the order
+    given. Messages shared by overlapping contexts are built once.
+    """
+    cursor.execute(CONTEXT_WINDOW_SQL, {
+        "targets": json.dumps(rowids),
+        "before": before,
+        "after": after,
+    })
+
+    messages = {}
+    grouped = {}
+    for row in cursor.fetchall():
+        pos, side, rid = row[-3:]
+        message = messages.get(rid)
+        if message is None:
+            message = messages[rid] = Message.from_row(row)
+        grouped.setdefault(pos, ([], [], []))[side + 1].append(message)
+
+    contexts = []
+    for pos in sorted(grouped):
+        earlier, target, later = grouped[pos]
+        contexts.append(MessageContext(
+            message=target[0],
+            # Rows arrive in chronological order; earlier messages are listed
+            # nearest-first, as before.
+            before=earlier[::-1],
+            after=later
+        ))
+    return contexts
+
+# Upper bound on cached chats. Accounts with more chats (mostly very large,
+# group-heavy ones) keep the most recently used ones and fall back to SQL for
+# the rest.
+CHAT_CACHE_SIZE = 100_000
+
+# How often the chat cache checks the database for new or changed chats. Names
+# may be this stale; everything else (messages, last_message_time shown by
+# list_chats) is still read from SQL.
+CHAT_CACHE_REFRESH_SECONDS = 1.0
+
+# SQLite's LOWER() and LIKE fold ASCII letters only; str.lower() folds every
+# script (and can change a string's length), so the chat cache folds with this.
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+def _like_matcher(query: str) -> Callable[[str], bool]:
+    """Python test for ``LOWER(value) LIKE LOWER('%' || query || '%')``.
+
+    ``value`` must already be folded with _ASCII_LOWER. As in LIKE, % matches
+    any run of characters and _ any single character.
+    """
+    query = query.translate(_ASCII_LOWER)
+    if "%" not in query and "_" not in query:
+        return lambda value: query in value
+    regex = re.compile(
+        "".join(".*" if ch == "%" else "." if ch == "_" else re.escape(ch) for ch in query),
+        re.DOTALL
+    )
+    return lambda value: regex.search(value) is not None
+
+class ChatCache:
+    """Process-wide LRU cache of chats: jid -> (name, last_message_time, search keys).
+
+    Loaded on first use and refreshed incrementally. The bridge writes chats
+    with INSERT OR REPLACE, which gives a new or changed chat a rowid above
+    every existing one, so polling for rows past the highest rowid seen finds
+    all changes with one index seek. As long as nothing has been evicted the
+    cache is ``complete`` and a miss means the chat doesn't exist.
+    """
+
+    def __init__(self, max_size: int = CHAT_CACHE_SIZE, refresh_seconds: float = CHAT_CACHE_REFRESH_SECONDS):
+        self.max_size = max_size
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Optional[str], Optional[str], Optional[Tuple[Optional[str], str]]]]" = OrderedDict()
+        self._path = None
+        self._max_rowid = 0
+        self._checked = 0.0
+        self.complete = False
+
+    def _put(self, jid: str, name: Optional[str], last_message_time: Optional[str]) -> None:
+        # Folded name and JID that search() matches against; groups never
+        # show up in contact search (jid NOT LIKE '%@g.us')
+        folded_jid = jid.translate(_ASCII_LOWER)
+        search_keys = None
+        if not folded_jid.endswith("@g.us"):
+            search_keys = (None if name is None else name.translate(_ASCII_LOWER), folded_jid)
+        self._entries[jid] = (name, last_message_time, search_keys)
+        self._entries.move_to_end(jid)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.complete = False
+
+    def refresh(self, conn: sqlite3.Connection) -> None:
+        """Pick up chats written since the last refresh (at most every refresh_seconds)."""
+        with self._lock:
+            now = time.monotonic()
+            if self._path == MESSAGES_DB_PATH and now - self._checked < self.refresh_seconds:
+                return
+            max_rowid = conn.execute("SELECT MAX(rowid) FROM chats").fetchone()[0] or 0
+            if self._path != MESSAGES_DB_PATH or max_rowid < self._max_rowid:
+                # First load, or a different / recreated database
+                self._entries.clear()
+                self._path = MESSAGES_DB_PATH
+                self._max_rowid = 0
+                self.complete = True
+            for rowid, jid, name, last_message_time in conn.execute("""
+                SELECT rowid, jid, name, last_message_time
+                FROM chats
+                WHERE rowid > ?
+                ORDER BY rowid
+            """, (self._max_rowid,)):
+                self._put(jid, name, last_message_time)
+                self._max_rowid = rowid
+            self._checked = now
+
+    def lookup(self, jids: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Names of the given chats that are in the cache (None if unnamed)."""
+        with self._lock:
+            found = {}
+            for jid in jids:
+                entry = self._entries.get(jid)
+                if entry is not None:
+                    self._entries.move_to_end(jid)
+                    found[jid] = entry[0]
+            return found
+
+    def add(self, rows: Iterable[Tuple[str, Optional[str], Optional[str]]]) -> None:
+        """Cache (jid, name, last_message_time) rows read from the database."""
+        with self._lock:
+            for jid, name, last_message_time in rows:
+                self._put(jid, name, last_message_time)
+
+    def search(self, query: str, limit: int = 50) -> Optional[List[Tuple[str, Optional[str]]]]:
+        """_search_contacts_sql from memory, with the same matches; None unless the cache is complete."""
+        matches = _like_matcher(query)
+        with self._lock:
+            if not self.complete:
+                return None
+            found = [
+                (jid, name) for jid, (name, _, keys) in self._entries.items()
+                if keys is not None and ((keys[0] is not None and matches(keys[0])) or matches(keys[1]))
+            ]
+        # Same order as ORDER BY name, jid (NULL names first; str order is
+        # code point order, which is the byte order of BINARY collation)
+        found.sort(key=lambda match: (match[1] is not None, match[1] or "", match[0]))
+        return found[:limit]
+
+chat_cache = ChatCache()
+
+def get_sender_names(sender_jids: Iterable[str]) -> Dict[str, str]:
+    """Resolve many sender JIDs to display names with two queries.
+
+    Resolution rules are the same as get_sender_name: an exact JID match
+    wins (even if the chat has no name), otherwise the first chat whose JID
+    contains the sender's phone number is used, otherwise the JID itself.
+    Each distinct sender is looked up once.
+    """
+    senders = [sender for sender in dict.fromkeys(sender_jids) if isinstance(sender, str)]
+    names = {sender: sender for sender in senders}
+    if not senders:
+        return names
 
-def get_sender_name(sender_jid: str) -> str:
     try:
-        conn = sqlite3.connect(MESSAGES_DB_PATH)
+        conn = _connect()
         cursor = conn.cursor()
-        
-        # First try matching by exact JID
-        cursor.execute("""
-            SELECT name
-            FROM chats
-            WHERE jid = ?
-            LIMIT 1
-        """, (sender_jid,))
-        
-        result = cursor.fetchone()
-        
-        # If no result, try looking for the number within JIDs
-        if not result:
-            # Extract the phone number part if it's a JID
-            if '@' in sender_jid:
-                phone_part = sender_jid.split('@')[0]
-            else:
-                phone_part = sender_jid
-                
+
+        # First try matching by exact JID, from the chat cache where possible
+        chat_cache.refresh(conn)
+        cached = chat_cache.lookup(senders)
+        exact = set(cached)
+        for jid, name in cached.items():
+            if name:
+                names[jid] = name
+
+        uncached = [sender for sender in senders if sender not in exact]
+        if uncached and not chat_cache.complete:
             cursor.execute("""
-                SELECT name
+                SELECT jid, name, last_message_time
                 FROM chats
-                WHERE jid LIKE ?
-                LIMIT 1
-            """, (f"%{phone_part}%",))
-            
-            result = cursor.fetchone()
-        
-        if result and result[0]:
-            return result[0]
-        else:
-            return sender_jid
-        
+                WHERE jid IN (SELECT value FROM json_each(?))
+            """, (json.dumps(uncached),))
+
+            rows = cursor.fetchall()
+            chat_cache.add(rows)
+            for jid, name, _ in rows:
+                exact.add(jid)
+                if name:
+                    names[jid] = name
+
+        # For the rest, look for the phone number within JIDs (the first
+        # such chat in table order), narrowed down by the sidecar index when
+        # it is up to date
+        misses = [sender for sender in senders if sender not in exact]
+        if misses:
+            phone_parts = [sender.split('@')[0] if '@' in sender else sender for sender in misses]
+            pattern = "'%' || p.value || '%'"
+            candidates = f"rowid IN ({_chat_match_sql('jid', pattern)}) AND" if _index_ready(conn) else ""
+            cursor.execute(f"""
+                SELECT
+                    p.key,
+                    (
+                        SELECT name FROM chats
+                        WHERE {candidates} jid LIKE {pattern}
+                        ORDER BY rowid
+                        LIMIT 1
+                    )
+                FROM json_each(?) p
+            """, (json.dumps(phone_parts),))
+
+            for index, name in cursor.fetchall():
+                if name:
+                    names[misses[index]] = name
+
+        return names
+
     except sqlite3.Error as e:
-        print(f"Database error while getting sender name: {e}")
-        return sender_jid
-    finally:
-        if 'conn' in locals():
-            conn.close()
+        print(f"Database error while getting sender names: {e}")
+        return names
+
+def get_sender_name(sender_jid: str) -> str:
+    return get_sender_names([sender_jid])[sender_jid]
 
-def format_message(message: Message, show_chat_info: bool = True) -> None:
-    """Print a single message with consistent formatting."""
+def format_message(message: Message, show_chat_info: bool = True, sender_names: Optional[Dict[str, str]] = None) -> None:
+    """Print a single message with consistent formatting.
+
+    ``sender_names`` is an optional pre-resolved JID -> name map (see
+    get_sender_names); senders missing from it are looked up individually.
+    """
     output = ""
     
     if show_chat_info and message.chat_name:
@@ -105,21 +504,184 @@ def format_message(message: Message, show_chat_info: bool = True) -> None:
         content_prefix = f"[{message.media_type} - Message ID: {message.id} - Chat JID: {message.chat_jid}] "
     
     try:
-        sender_name = get_sender_name(message.sender) if not message.is_from_me else "Me"
-        output += f"From: {sender_name}: {content_prefix}{message.content}\n"
+        if message.is_from_me:
+            sender_name = "Me"
+        elif sender_names is not None and message.sender in sender_names:
+            sender_name = sender_names[message.sender]
+        else:
+            sender_name = get_sender_name(message.sender)
+        content = message.snippet if message.snippet is not None else message.content
+        output += f"From: {sender_name}: {content_prefix}{content}\n"
     except Exception as e:
         print(f"Error formatting message: {e}")
     return output
 
 def format_messages_list(messages: List[Message], show_chat_info: bool = True) -> None:
-    output = ""
     if not messages:
-        output += "No messages to display."
-        return output
+        return "No messages to display."
     
-    for message in messages:
-        output += format_message(message, show_chat_info)
-    return output
+    sender_names = get_sender_names(message.sender for message in messages if not message.is_from_me)
+    return "".join(format_message(message, show_chat_info, sender_names) for message in messages)
+
+# Fields of structured message results (output="records" or "columns").
+# sender_name costs a name lookup and snippet only exists for highlighted
+# search matches, so neither is included unless asked for; "match" (whether
+# a message matched the query or is context around a match) is added
+# automatically when context is included.
+MESSAGE_FIELDS = ("id", "chat_jid", "chat_name", "timestamp", "sender", "sender_name", "is_from_me", "content", "media_type", "snippet", "match")
+DEFAULT_MESSAGE_FIELDS = ("id", "chat_jid", "chat_name", "timestamp", "sender", "is_from_me", "content", "media_type")
+
+OUTPUT_MODES = ("text", "records", "columns")
+
+_FIELD_GETTERS = {
+    "id": lambda message: message.id,
+    "chat_jid": lambda message: message.chat_jid,
+    "chat_name": lambda message: message.chat_name,
+    "timestamp": lambda message: message.timestamp.isoformat(),
+    "sender": lambda message: message.sender,
+    "is_from_me": lambda message: bool(message.is_from_me),
+    "content": lambda message: message.content,
+    "media_type": lambda message: message.media_type or None,
+    "snippet": lambda message: message.snippet,
+}
+
+def _result_fields(output: str, fields: Optional[List[str]], default: Tuple[str, ...] = DEFAULT_MESSAGE_FIELDS) -> Tuple[str, ...]:
+    """Validate an output mode and field selection; returns the fields to include."""
+    if output not in OUTPUT_MODES:
+        raise ValueError(f"Invalid output mode: {output}. Use one of {', '.join(OUTPUT_MODES)}.")
+    if not fields:
+        return default
+    unknown = [field for field in fields if field not in MESSAGE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown message fields: {', '.join(unknown)}. Available: {', '.join(MESSAGE_FIELDS)}.")
+    return tuple(dict.fromkeys(fields))
+
+def message_columns(
+    messages: List[Message],
+    fields: Iterable[str] = DEFAULT_MESSAGE_FIELDS,
+    matches: Optional[set] = None
+) -> Dict[str, List[Any]]:
+    """Messages as columns: one list of values per field, in message order.
+
+    ``matches`` holds the (chat_jid, id) keys of query matches for the
+    "match" field; without it every message counts as a match.
+    """
+    columns = {}
+    for field in fields:
+        if field == "sender_name":
+            names = get_sender_names(message.sender for message in messages if not message.is_from_me)
+            columns[field] = ["Me" if message.is_from_me else names.get(message.sender, message.sender) for message in messages]
+        elif field == "match":
+            columns[field] = [matches is None or (message.chat_jid, message.id) in matches for message in messages]
+        else:
+            columns[field] = list(map(_FIELD_GETTERS[field], messages))
+    return columns
+
+def message_records(
+    messages: List[Message],
+    fields: Iterable[str] = DEFAULT_MESSAGE_FIELDS,
+    matches: Optional[set] = None
+) -> List[Dict[str, Any]]:
+    """Messages as compact dicts holding only ``fields`` (see message_columns)."""
+    columns = message_columns(messages, fields, matches)
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+def _fts_phrase(query: str) -> str:
+    """Quote a user query as a single FTS5 phrase (a substring search with trigrams)."""
+    return '"' + query.replace('"', '""') + '"'
+
+def _search_index_ready(conn: sqlite3.Connection, query: str) -> bool:
+    """Whether a content search for ``query`` can use the full-text index now.
+
+    Falls back (returns False) for queries shorter than one trigram, when
+    SQLite lacks FTS5, or while the index is still being built.
+    """
+    if len(query) < 3:
+        return False
+    return _index_ready(conn)
+
+def _index_ready(conn: sqlite3.Connection) -> bool:
+    """Whether the sidecar index covers every message and is attached to ``conn``.
+
+    Only the calling thread's pooled connection can have the index attached;
+    any other connection uses the queries that don't need it.
+    """
+    if not db.pool.owns(conn):
+        return False
+    sidecar = indexer.get_indexer(MESSAGES_DB_PATH)
+    max_rowid, max_chat_rowid = conn.execute(
+        "SELECT (SELECT MAX(rowid) FROM messages), (SELECT MAX(rowid) FROM chats)"
+    ).fetchone()
+    return sidecar.ensure_fresh(max_rowid, max_chat_rowid) and indexer.attach(conn, MESSAGES_DB_PATH)
+
+def _chat_match_sql(column: str, pattern: str) -> str:
+    """Subquery of the rowids of chats whose ``column`` (name or jid) may be LIKE ``pattern``.
+
+    ``pattern`` is an SQL expression. The sidecar's trigram index returns a
+    superset of the matches (it also folds non-ASCII case), so callers keep
+    their own LIKE condition on chats and get exactly the rows a scan would.
+    """
+    return f"SELECT rowid FROM {indexer.INDEX_SCHEMA}.chat_fts WHERE {column} LIKE {pattern}"
+
+def _last_message_join(conn: sqlite3.Connection, chats: str = "chats", messages: str = "messages") -> str:
+    """LEFT JOIN clause adding each chat's most recent message as ``messages``.
+
+    Uses the materialized chat_last_message table when the sidecar index is
+    up to date, and otherwise a correlated subquery that picks the latest
+    message with one seek on idx_messages_chat_timestamp. Either way each chat
+    joins at most one message, even when several share its timestamp.
+    """
+    if _index_ready(conn):
+        return f"""
+            LEFT JOIN {indexer.INDEX_SCHEMA}.chat_last_message AS latest ON latest.chat_jid = {chats}.jid
+            LEFT JOIN messages AS {messages} ON {messages}.rowid = latest.message_rowid
+        """
+    return f"""
+        LEFT JOIN messages AS {messages} ON {messages}.rowid = (
+            SELECT rowid FROM messages
+            WHERE chat_jid = {chats}.jid
+            ORDER BY timestamp DESC, rowid DESC
+            LIMIT 1
+        )
+    """
+
+def _message_filters(
+    after: Optional[str],
+    before: Optional[str],
+    sender_phone_number: Optional[str],
+    chat_jid: Optional[str]
+) -> Tuple[List[str], list]:
+    """WHERE clauses and parameters for the message filters shared by list_messages and iter_messages."""
+    where_clauses = []
+    params = []
+    
+    if after:
+        try:
+            after = datetime.fromisoformat(after)
+        except ValueError:
+            raise ValueError(f"Invalid date format for 'after': {after}. Please use ISO-8601 format.")
+        
+        where_clauses.append("messages.timestamp > ?")
+        params.append(after)
+
+    if before:
+        try:
+            before = datetime.fromisoformat(before)
+        except ValueError:
+            raise ValueError(f"Invalid date format for 'before': {before}. Please use ISO-8601 format.")
+        
+        where_clauses.append("messages.timestamp < ?")
+        params.append(before)
+
+    if sender_phone_number:
+        where_clauses.append("messages.sender = ?")
+        params.append(sender_phone_number)
+        
+    if chat_jid:
+        where_clauses.append("messages.chat_jid = ?")
+        params.append(chat_jid)
+    
+    return where_clauses, params
 
 def list_messages(
     after: Optional[str] = None,
@@ -131,96 +693,176 @@ def list_messages(
     page: int = 0,
     include_context: bool = True,
     context_before: int = 1,
-    context_after: int = 1
-) -> List[Message]:
-    """Get messages matching the specified criteria with optional context."""
+    context_after: int = 1,
+    sort_by: str = "timestamp",
+    highlight: bool = False,
+    cursor: Optional[str] = None,
+    output: str = "text",
+    fields: Optional[List[str]] = None
+) -> Union[str, Dict[str, Any]]:
+    """Get messages matching the specified criteria with optional context.
+
+    Content queries use the full-text index when it is available, in which
+    case ``sort_by="relevance"`` ranks matches by BM25 and ``highlight``
+    replaces each match's content with a highlighted snippet. Otherwise they
+    fall back to a LIKE scan ordered by timestamp.
+
+    Results ordered by timestamp end with a "Next page cursor" line when more
+    may follow; passing that value as ``cursor`` resumes right after the last
+    message with an index seek instead of skipping ``page * limit`` rows.
+    ``page`` is ignored when a cursor is given.
+
+    ``output="text"`` returns the formatted listing. ``"records"`` returns
+    ``{"messages": [...], "next_cursor": ...}`` with one dict per message and
+    ``"columns"`` returns ``{"columns": {field: [...]}, "next_cursor": ...}``;
+    both hold only ``fields`` (see MESSAGE_FIELDS) and skip text formatting
+    and, unless "sender_name" is requested, sender name lookups.
+    """
+    fields = _result_fields(output, fields, DEFAULT_MESSAGE_FIELDS + (("match",) if include_context else ()))
     try:
-        conn = sqlite3.connect(MESSAGES_DB_PATH)
-        cursor = conn.cursor()
+        conn = _connect()
+        db_cursor = conn.cursor()
+        use_index = bool(query) and _search_index_ready(conn, query)
         
         # Build base query
-        query_parts = ["SELECT messages.timestamp, messages.sender, chats.name, messages.content, messages.is_from_me, chats.jid, messages.id, messages.media_type FROM messages"]
+        columns = f"{MESSAGE_COLUMNS}, messages.rowid"
+        if use_index and highlight:
+            columns += f", {SNIPPET_COLUMN}"
+        query_parts = [f"SELECT {columns} FROM messages"]
         query_parts.append("JOIN chats ON messages.chat_jid = chats.jid")
-        where_clauses = []
-        params = []
+        if use_index:
+            query_parts.append(f"JOIN {indexer.INDEX_SCHEMA}.message_fts ON message_fts.rowid = messages.rowid")
         
         # Add filters
-        if after:
-            try:
-                after = datetime.fromisoformat(after)
-            except ValueError:
-                raise ValueError(f"Invalid date format for 'after': {after}. Please use ISO-8601 format.")
-            
-            where_clauses.append("messages.timestamp > ?")
-            params.append(after)
-
-        if before:
-            try:
-                before = datetime.fromisoformat(before)
-            except ValueError:
-                raise ValueError(f"Invalid date format for 'before': {before}. Please use ISO-8601 format.")
-            
-            where_clauses.append("messages.timestamp < ?")
-            params.append(before)
-
-        if sender_phone_number:
-            where_clauses.append("messages.sender = ?")
-            params.append(sender_phone_number)
-            
-        if chat_jid:
-            where_clauses.append("messages.chat_jid = ?")
-            params.append(chat_jid)
+        where_clauses, params = _message_filters(after, before, sender_phone_number, chat_jid)
             
-        if query:
+        if use_index:
+            where_clauses.append("message_fts MATCH ?")
+            params.append(_fts_phrase(query))
+        elif query:
             where_clauses.append("LOWER(messages.content) LIKE LOWER(?)")
             params.append(f"%{query}%")
             
+        by_relevance = use_index and sort_by == "relevance"
+        if cursor and not by_relevance:
+            last_timestamp, last_rowid = _decode_cursor(cursor, "messages")
+            where_clauses.append(_keyset_clause("messages.timestamp", "messages.rowid", "DESC"))
+            params.extend([last_timestamp, last_timestamp, last_rowid])
+            page = 0
+            
         if where_clauses:
             query_parts.append("WHERE " + " AND ".join(where_clauses))
             
         # Add pagination
         offset = page * limit
-        query_parts.append("ORDER BY messages.timestamp DESC")
+        if by_relevance:
+            query_parts.append("ORDER BY message_fts.rank")
+        else:
+            query_parts.append("ORDER BY messages.timestamp DESC, messages.rowid DESC")
         query_parts.append("LIMIT ? OFFSET ?")
         params.extend([limit, offset])
         
-        cursor.execute(" ".join(query_parts), tuple(params))
-        messages = cursor.fetchall()
+        db_cursor.execute(" ".join(query_parts), tuple(params))
+        messages = db_cursor.fetchall()
         
-        result = []
-        for msg in messages:
-            message = Message(
-                timestamp=datetime.fromisoformat(msg[0]),
-                sender=msg[1],
-                chat_name=msg[2],
-                content=msg[3],
-                is_from_me=msg[4],
-                chat_jid=msg[5],
-                id=msg[6],
-                media_type=msg[7]
-            )
-            result.append(message)
+        result = [Message.from_row(msg) for msg in messages]
+        if use_index and highlight:
+            for message, msg in zip(result, messages):
+                message.snippet = msg[9]
+
+        next_cursor = None
+        if len(messages) == limit and not by_relevance:
+            next_cursor = _encode_cursor('messages', messages[-1][0], messages[-1][8])
+        footer = f"\nNext page cursor: {next_cursor}" if next_cursor else ""
+        matches = None
             
         if include_context and result:
-            # Add context for each message
+            # Fetch the context of the whole page at once; overlapping
+            # context windows only list each message once.
+            contexts = _fetch_message_contexts(db_cursor, [msg[8] for msg in messages], context_before, context_after)
+            snippets = {(message.chat_jid, message.id): message.snippet for message in result}
             messages_with_context = []
-            for msg in result:
-                context = get_message_context(msg.id, context_before, context_after)
-                messages_with_context.extend(context.before)
-                messages_with_context.append(context.message)
-                messages_with_context.extend(context.after)
-            
-            return format_messages_list(messages_with_context, show_chat_info=True)
+            seen = set()
+            for context in contexts:
+                context.message.snippet = snippets.get((context.message.chat_jid, context.message.id))
+                for message in [*context.before, context.message, *context.after]:
+                    key = (message.chat_jid, message.id)
+                    if key not in seen:
+                        seen.add(key)
+                        messages_with_context.append(message)
+            matches = set(snippets)
+            result = messages_with_context
             
-        # Format and display messages without context
-        return format_messages_list(result, show_chat_info=True)    
+        if output == "records":
+            return {"messages": message_records(result, fields, matches), "next_cursor": next_cursor}
+        if output == "columns":
+            return {"columns": message_columns(result, fields, matches), "next_cursor": next_cursor}
+        return format_messages_list(result, show_chat_info=True) + footer
         
     except sqlite3.Error as e:
         print(f"Database error: {e}")
         return []
+
+
+# Rows fetched per round trip by iter_messages.
+ITER_BATCH_ROWS = 1000
+
+def iter_messages(
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    sender_phone_number: Optional[str] = None,
+    chat_jid: Optional[str] = None,
+    query: Optional[str] = None,
+    batch_size: int = ITER_BATCH_ROWS
+) -> Iterator[Message]:
+    """Yield every message matching the filters, oldest first.
+
+    Takes the same filters as list_messages but no page size: rows are read
+    ``batch_size`` at a time, so memory use stays flat however many messages
+    match (a whole chat, a date range or the full archive). Each batch is a
+    fresh statement resuming after the last (timestamp, rowid) seen, and is
+    drained before anything is yielded, so no read lock is held while the
+    caller works; the bridge writes in rollback-journal mode and would
+    otherwise fail to insert incoming messages during a long export. The
+    iterator reads on the calling thread's pooled connection and must be
+    consumed on that thread. Database errors are raised.
+    """
+    conn = _connect()
+    db_cursor = conn.cursor()
+    use_index = bool(query) and _search_index_ready(conn, query)
+    
+    query_parts = [f"SELECT {MESSAGE_COLUMNS}, messages.rowid FROM messages"]
+    query_parts.append("JOIN chats ON messages.chat_jid = chats.jid")
+    if use_index:
+        query_parts.append(f"JOIN {indexer.INDEX_SCHEMA}.message_fts ON message_fts.rowid = messages.rowid")
+    where_clauses, params = _message_filters(after, before, sender_phone_number, chat_jid)
+    if use_index:
+        where_clauses.append("message_fts MATCH ?")
+        params.append(_fts_phrase(query))
+    elif query:
+        where_clauses.append("LOWER(messages.content) LIKE LOWER(?)")
+        params.append(f"%{query}%")
+    
+    def batch_sql(resume: bool) -> str:
+        clauses = where_clauses + [_keyset_clause("messages.timestamp", "messages.rowid", "ASC")] if resume else where_clauses
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        return " ".join(query_parts) + where + " ORDER BY messages.timestamp, messages.rowid LIMIT ?"
+    
+    first_sql, next_sql = batch_sql(False), batch_sql(True)
+    key = None
+    try:
+        while True:
+            if key is None:
+                rows = db_cursor.execute(first_sql, (*params, batch_size)).fetchall()
+            else:
+                rows = db_cursor.execute(next_sql, (*params, key[0], key[0], key[1], batch_size)).fetchall()
+            for row in rows:
+                yield Message.from_row(row)
+            if len(rows) < batch_size:
+                break
+            key = (rows[-1][0], rows[-1][8])
     finally:
-        if 'conn' in locals():
-            conn.close()
+        db_cursor.close()
 
 
 def get_message_context(
@@ -230,90 +872,26 @@ def get_message_context(
 ) -> MessageContext:
     """Get context around a specific message."""
     try:
-        conn = sqlite3.connect(MESSAGES_DB_PATH)
+        conn = _connect()
         cursor = conn.cursor()
         
-        # Get the target message first
         cursor.execute("""
-            SELECT messages.timestamp, messages.sender, chats.name, messages.content, messages.is_from_me, chats.jid, messages.id, messages.chat_jid, messages.media_type
+            SELECT messages.rowid
             FROM messages
             JOIN chats ON messages.chat_jid = chats.jid
             WHERE messages.id = ?
+            LIMIT 1
         """, (message_id,))
         msg_data = cursor.fetchone()
         
         if not msg_data:
             raise ValueError(f"Message with ID {message_id} not found")
             
-        target_message = Message(
-            timestamp=datetime.fromisoformat(msg_data[0]),
-            sender=msg_data[1],
-            chat_name=msg_data[2],
-            content=msg_data[3],
-            is_from_me=msg_data[4],
-            chat_jid=msg_data[5],
-            id=msg_data[6],
-            media_type=msg_data[8]
-        )
-        
-        # Get messages before
-        cursor.execute("""
-            SELECT messages.timestamp, messages.sender, chats.name, messages.content, messages.is_from_me, chats.jid, messages.id, messages.media_type
-            FROM messages
-            JOIN chats ON messages.chat_jid = chats.jid
-            WHERE messages.chat_jid = ? AND messages.timestamp < ?
-            ORDER BY messages.timestamp DESC
-            LIMIT ?
-        """, (msg_data[7], msg_data[0], before))
-        
-        before_messages = []
-        for msg in cursor.fetchall():
-            before_messages.append(Message(
-                timestamp=datetime.fromisoformat(msg[0]),
-                sender=msg[1],
-                chat_name=msg[2],
-                content=msg[3],
-                is_from_me=msg[4],
-                chat_jid=msg[5],
-                id=msg[6],
-                media_type=msg[7]
-            ))
-        
-        # Get messages after
-        cursor.execute("""
-            SELECT messages.timestamp, messages.sender, chats.name, messages.content, messages.is_from_me, chats.jid, messages.id, messages.media_type
-            FROM messages
-            JOIN chats ON messages.chat_jid = chats.jid
-            WHERE messages.chat_jid = ? AND messages.timestamp > ?
-            ORDER BY messages.timestamp ASC
-            LIMIT ?
-        """, (msg_data[7], msg_data[0], after))
-        
-        after_messages = []
-        for msg in cursor.fetchall():
-            after_messages.append(Message(
-                timestamp=datetime.fromisoformat(msg[0]),
-                sender=msg[1],
-                chat_name=msg[2],
-                content=msg[3],
-                is_from_me=msg[4],
-                chat_jid=msg[5],
-                id=msg[6],
-                media_type=msg[7]
-            ))
-        
-        return MessageContext(
-            message=target_message,
-            before=before_messages,
-            after=after_messages
-        )
+        return _fetch_message_contexts(cursor, [msg_data[0]], before, after)[0]
         
     except sqlite3.Error as e:
         print(f"Database error: {e}")
         raise
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
 def list_chats(
@@ -321,30 +899,36 @@ def list_chats(
     limit: int = 20,
     page: int = 0,
     include_last_message: bool = True,
-    sort_by: str = "last_active"
-) -> List[Chat]:
-    """Get chats matching the specified criteria."""
+    sort_by: str = "last_active",
+    cursor: Optional[str] = None
+) -> Page:
+    """Get chats matching the specified criteria.
+
+    Returns a Page; pass its ``next_cursor`` as ``cursor`` to fetch the next
+    page with an index seek instead of an OFFSET scan (``page`` is then
+    ignored).
+    """
     try:
-        conn = sqlite3.connect(MESSAGES_DB_PATH)
-        cursor = conn.cursor()
+        conn = _connect()
+        db_cursor = conn.cursor()
+        sort_by = sort_by if sort_by == "last_active" else "name"
+        sort_key, direction = CHAT_SORT_KEYS[sort_by]
         
         # Build base query
-        query_parts = ["""
+        last_message = "messages.content, messages.sender, messages.is_from_me" if include_last_message else "NULL, NULL, NULL"
+        query_parts = [f"""
             SELECT 
                 chats.jid,
                 chats.name,
                 chats.last_message_time,
-                messages.content as last_message,
-                messages.sender as last_sender,
-                messages.is_from_me as last_is_from_me
+                {last_message},
+                {sort_key},
+                chats.rowid
             FROM chats
         """]
         
         if include_last_message:
-            query_parts.append("""
-                LEFT JOIN messages ON chats.jid = messages.chat_jid 
-                AND chats.last_message_time = messages.timestamp
-            """)
+            query_parts.append(_last_message_join(conn))
             
         where_clauses = []
         params = []
@@ -352,66 +936,85 @@ def list_chats(
         if query:
             where_clauses.append("(LOWER(chats.name) LIKE LOWER(?) OR chats.jid LIKE ?)")
             params.extend([f"%{query}%", f"%{query}%"])
+
+        if cursor:
+            last_value, last_rowid = _decode_cursor(cursor, f"chats:{sort_by}")
+            where_clauses.append(_keyset_clause(sort_key, "chats.rowid", direction))
+            params.extend([last_value, last_value, last_rowid])
+            page = 0
             
         if where_clauses:
             query_parts.append("WHERE " + " AND ".join(where_clauses))
             
         # Add sorting
-        order_by = "chats.last_message_time DESC" if sort_by == "last_active" else "chats.name"
-        query_parts.append(f"ORDER BY {order_by}")
+        query_parts.append(f"ORDER BY {sort_key} {direction}, chats.rowid {direction}")
         
         # Add pagination
         offset = (page ) * limit
         query_parts.append("LIMIT ? OFFSET ?")
         params.extend([limit, offset])
         
-        cursor.execute(" ".join(query_parts), tuple(params))
-        chats = cursor.fetchall()
+        db_cursor.execute(" ".join(query_parts), tuple(params))
+        chats = db_cursor.fetchall()
         
         result = []
         for chat_data in chats:
-            chat = Chat(
-                jid=chat_data[0],
-                name=chat_data[1],
-                last_message_time=datetime.fromisoformat(chat_data[2]) if chat_data[2] else None,
-                last_message=chat_data[3],
-                last_sender=chat_data[4],
-                last_is_from_me=chat_data[5]
-            )
+            chat = Chat.from_row(chat_data)
             result.append(chat)
             
-        return result
+        next_cursor = None
+        if len(chats) == limit:
+            next_cursor = _encode_cursor(f"chats:{sort_by}", chats[-1][6], chats[-1][7])
+        return Page(result, next_cursor)
         
     except sqlite3.Error as e:
         print(f"Database error: {e}")
-        return []
-    finally:
-        if 'conn' in locals():
-            conn.close()
+        return Page()
+
+
+def _search_contacts_sql(conn: sqlite3.Connection, query: str) -> List[Tuple[str, Optional[str]]]:
+    """search_contacts against the database: (jid, name) rows."""
+    cursor = conn.cursor()
+
+    # Split query into characters to support partial matching
+    search_pattern = '%' +query + '%'
+
+    candidates = ""
+    if _search_index_ready(conn, query):
+        # Candidates from the sidecar index instead of a scan of every chat
+        candidates = f"""
+            rowid IN (
+                {_chat_match_sql("name", ":pattern")}
+                UNION
+                {_chat_match_sql("jid", ":pattern")}
+            ) AND
+        """
+    cursor.execute(f"""
+        SELECT DISTINCT 
+            jid,
+            name
+        FROM chats
+        WHERE 
+            {candidates}
+            (LOWER(name) LIKE LOWER(:pattern) OR LOWER(jid) LIKE LOWER(:pattern))
+            AND jid NOT LIKE '%@g.us'
+        ORDER BY name, jid
+        LIMIT 50
+    """, {"pattern": search_pattern})
+
+    return cursor.fetchall()
 
 
 def search_contacts(query: str) -> List[Contact]:
     """Search contacts by name or phone number."""
     try:
-        conn = sqlite3.connect(MESSAGES_DB_PATH)
-        cursor = conn.cursor()
-        
-        # Split query into characters to support partial matching
-        search_pattern = '%' +query + '%'
+        conn = _connect()
         
-        cursor.execute("""
-            SELECT DISTINCT 
-                jid,
-                name
-            FROM chats
-            WHERE 
-                (LOWER(name) LIKE LOWER(?) OR LOWER(jid) LIKE LOWER(?))
-                AND jid NOT LIKE '%@g.us'
-            ORDER BY name, jid
-            LIMIT 50
-        """, (search_pattern, search_pattern))
-        
-        contacts = cursor.fetchall()
+        # Served from the chat cache when it holds every chat
+        chat_cache.refresh(conn)
+        contacts = chat_cache.search(query)
+        if contacts is None:
+            contacts = _search_contacts_sql(conn, query)
         
         result = []
         for contact_data in contacts:
@@ -427,66 +1030,76 @@ def search_contacts(query: str) -> List[Contact]:
     except sqlite3.Error as e:
         print(f"Database error: {e}")
         return []
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
-def get_contact_chats(jid: str, limit: int = 20, page: int = 0) -> List[Chat]:
+def get_contact_chats(jid: str, limit: int = 20, page: int = 0, cursor: Optional[str] = None) -> Page:
     """Get all chats involving the contact.
     
     Args:
         jid: The contact's JID to search for
         limit: Maximum number of chats to return (default 20)
         page: Page number for pagination (default 0)
+        cursor: Cursor returned as ``next_cursor`` by the previous page; takes
+            precedence over ``page``
     """
     try:
-        conn = sqlite3.connect(MESSAGES_DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT DISTINCT
-                c.jid,
-                c.name,
-                c.last_message_time,
-                m.content as last_message,
-                m.sender as last_sender,
-                m.is_from_me as last_is_from_me
-            FROM chats c
-            JOIN messages m ON c.jid = m.chat_jid
-            WHERE m.sender = ? OR c.jid = ?
-            ORDER BY c.last_message_time DESC
+        conn = _connect()
+        db_cursor = conn.cursor()
+        sort_key, _ = CHAT_SORT_KEYS["last_active"]
+        
+        keyset = ""
+        params = [jid, jid]
+        if cursor:
+            last_value, last_rowid = _decode_cursor(cursor, "contact_chats")
+            keyset = "AND " + _keyset_clause(sort_key, "chats.rowid", "DESC")
+            params.extend([last_value, last_value, last_rowid])
+            page = 0
+        params.extend([limit, page * limit])
+        
+        db_cursor.execute(f"""
+            SELECT
+                chats.jid,
+                chats.name,
+                chats.last_message_time,
+                messages.content as last_message,
+                messages.sender as last_sender,
+                messages.is_from_me as last_is_from_me,
+                {sort_key},
+                chats.rowid
+            FROM chats
+            {_last_message_join(conn)}
+            WHERE (chats.jid IN (SELECT chat_jid FROM messages WHERE sender = ?) OR chats.jid = ?)
+                {keyset}
+            ORDER BY {sort_key} DESC, chats.rowid DESC
             LIMIT ? OFFSET ?
-        """, (jid, jid, limit, page * limit))
+        """, params)
         
-        chats = cursor.fetchall()
+        chats = db_cursor.fetchall()
         
         result = []
         for chat_data in chats:
-            chat = Chat(
-                jid=chat_data[0],
-                name=chat_data[1],
-                last_message_time=datetime.fromisoformat(chat_data[2]) if chat_data[2] else None,
-                last_message=chat_data[3],
-                last_sender=chat_data[4],
-                last_is_from_me=chat_data[5]
-            )
+            chat = Chat.from_row(chat_data)
             result.append(chat)
             
-        return result
+        next_cursor = None
+        if len(chats) == limit:
+            next_cursor = _encode_cursor("contact_chats", chats[-1][6], chats[-1][7])
+        return Page(result, next_cursor)
         
     except sqlite3.Error as e:
         print(f"Database error: {e}")
-        return []
-    finally:
-        if 'conn' in locals():
-            conn.close()
+        return Page()
+
 
+def get_last_interaction(jid: str, output: str = "text", fields: Optional[List[str]] = None) -> Union[str, Dict[str, Any], None]:
+    """Get most recent message involving the contact.
 
-def get_last_interaction(jid: str) -> str:
-    """Get most recent message involving the contact."""
+    Returns the formatted message, or with ``output="records"`` (or
+    "columns") a dict holding only ``fields`` (see MESSAGE_FIELDS).
+    """
+    fields = _result_fields(output, fields)
     try:
-        conn = sqlite3.connect(MESSAGES_DB_PATH)
+        conn = _connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -511,49 +1124,35 @@ def get_last_interaction(jid: str) -> str:
         if not msg_data:
             return None
             
-        message = Message(
-            timestamp=datetime.fromisoformat(msg_data[0]),
-            sender=msg_data[1],
-            chat_name=msg_data[2],
-            content=msg_data[3],
-            is_from_me=msg_data[4],
-            chat_jid=msg_data[5],
-            id=msg_data[6],
-            media_type=msg_data[7]
-        )
+        message = Message.from_row(msg_data)
         
+        if output != "text":
+            return message_records([message], fields)[0]
         return format_message(message)
         
     except sqlite3.Error as e:
         print(f"Database error: {e}")
         return None
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
 def get_chat(chat_jid: str, include_last_message: bool = True) -> Optional[Chat]:
     """Get chat metadata by JID."""
     try:
-        conn = sqlite3.connect(MESSAGES_DB_PATH)
+        conn = _connect()
         cursor = conn.cursor()
         
-        query = """
+        last_message = "m.content, m.sender, m.is_from_me" if include_last_message else "NULL, NULL, NULL"
+        query = f"""
             SELECT 
                 c.jid,
                 c.name,
                 c.last_message_time,
-                m.content as last_message,
-                m.sender as last_sender,
-                m.is_from_me as last_is_from_me
+                {last_message}
             FROM chats c
         """
         
         if include_last_message:
-            query += """
-                LEFT JOIN messages m ON c.jid = m.chat_jid 
-                AND c.last_message_time = m.timestamp
-            """
+            query += _last_message_join(conn, "c", "m")
             
         query += " WHERE c.jid = ?"
         
@@ -563,30 +1162,25 @@ def get_chat(chat_jid: str, include_last_message: bool = True) -> Optional[Chat]
         if not chat_data:
             return None
             
-        return Chat(
-            jid=chat_data[0],
-            name=chat_data[1],
-            last_message_time=datetime.fromisoformat(chat_data[2]) if chat_data[2] else None,
-            last_message=chat_data[3],
-            last_sender=chat_data[4],
-            last_is_from_me=chat_data[5]
-        )
+        return Chat.from_row(chat_data)
         
     except sqlite3.Error as e:
         print(f"Database error: {e}")
         return None
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
 def get_direct_chat_by_contact(sender_phone_number: str) -> Optional[Chat]:
     """Get chat metadata by sender phone number."""
     try:
-        conn = sqlite3.connect(MESSAGES_DB_PATH)
+        conn = _connect()
         cursor = conn.cursor()
         
-        cursor.execute("""
+        # The first individual chat whose JID contains the number, narrowed
+        # down by the sidecar index when it is up to date
+        candidates = ""
+        if _search_index_ready(conn, sender_phone_number):
+            candidates = f"c.rowid IN ({_chat_match_sql('jid', ':pattern')}) AND"
+        cursor.execute(f"""
             SELECT 
                 c.jid,
                 c.name,
@@ -595,138 +1189,398 @@ def get_direct_chat_by_contact(sender_phone_number: str) -> Optional[Chat]:
                 m.sender as last_sender,
                 m.is_from_me as last_is_from_me
             FROM chats c
-            LEFT JOIN messages m ON c.jid = m.chat_jid 
-                AND c.last_message_time = m.timestamp
-            WHERE c.jid LIKE ? AND c.jid NOT LIKE '%@g.us'
+            {_last_message_join(conn, "c", "m")}
+            WHERE {candidates} c.jid LIKE :pattern AND c.jid NOT LIKE '%@g.us'
+            ORDER BY c.rowid
             LIMIT 1
-        """, (f"%{sender_phone_number}%",))
+        """, {"pattern": f"%{sender_phone_number}%"})
         
         chat_data = cursor.fetchone()
         
         if not chat_data:
             return None
             
-        return Chat(
-            jid=chat_data[0],
-            name=chat_data[1],
-            last_message_time=datetime.fromisoformat(chat_data[2]) if chat_data[2] else None,
-            last_message=chat_data[3],
-            last_sender=chat_data[4],
-            last_is_from_me=chat_data[5]
-        )
+        return Chat.from_row(chat_data)
         
     except sqlite3.Error as e:
         print(f"Database error: {e}")
         return None
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
-def send_message(recipient: str, message: str) -> Tuple[bool, str]:
-    try:
-        # Validate input
-        if not recipient:
-            return False, "Recipient must be provided"
-        
-        url = f"{WHATSAPP_API_BASE_URL}/send"
-        payload = {
-            "recipient": recipient,
-            "message": message,
-        }
-        
-        response = requests.post(url, json=payload)
-        
-        # Check if the request was successful
-        if response.status_code == 200:
+def _send_payload(recipient: str, message: Optional[str] = None, media_path: Optional[str] = None) -> Tuple[Optional[dict], str]:
+    """Validate a send request and build its /send payload.
+
+    Returns (payload, "") or (None, error message).
+    """
+    # Validate input
+    if not recipient:
+        return None, "Recipient must be provided"
+    
+    if message is not None:
+        return {"recipient": recipient, "message": message}, ""
+    
+    if not media_path:
+        return None, "Media path must be provided"
+    
+    if not os.path.isfile(media_path):
+        return None, f"Media file not found: {media_path}"
+    
+    return {"recipient": recipient, "media_path": media_path}, ""
+
+def _audio_payload(recipient: str, media_path: str) -> Tuple[Optional[dict], str]:
+    """Like _send_payload, converting the file to Opus .ogg first if needed."""
+    payload, error = _send_payload(recipient, media_path=media_path)
+    if payload is None:
+        return payload, error
+
+    if not media_path.endswith(".ogg"):
+        try:
+            payload["media_path"] = audio.convert_to_opus_ogg_cached(media_path)
+        except Exception as e:
+            return None, f"Error converting file to opus ogg. You likely need to install ffmpeg: {str(e)}"
+    return payload, ""
+
+def _audio_data_payload(
+    recipient: str,
+    data: bytes,
+    pcm_rate: Optional[int] = None,
+    pcm_channels: int = 1
+) -> Tuple[Optional[dict], str]:
+    """Payload sending in-memory audio inline as a voice message, converted through ffmpeg pipes."""
+    if not recipient:
+        return None, "Recipient must be provided"
+    if not data:
+        return None, "Audio data must be provided"
+
+    if pcm_rate is not None or bytes(data[:4]) != b"OggS":
+        try:
+            data = audio.transcode_to_opus_ogg(data, pcm_rate=pcm_rate, pcm_channels=pcm_channels)
+        except Exception as e:
+            return None, f"Error converting audio to opus ogg. You likely need to install ffmpeg: {str(e)}"
+    # The bridge takes the content from media_data; the name only sets the media type
+    return {
+        "recipient": recipient,
+        "media_path": "voice.ogg",
+        "media_data": base64.b64encode(data).decode("ascii")
+    }, ""
+
+def _send_result(response) -> Tuple[bool, str]:
+    """Interpret the bridge's answer to /send (a requests or httpx response)."""
+    # Check if the request was successful
+    if response.status_code == 200:
+        try:
             result = response.json()
-            return result.get("success", False), result.get("message", "Unknown response")
-        else:
-            return False, f"Error: HTTP {response.status_code} - {response.text}"
-            
-    except requests.RequestException as e:
-        return False, f"Request error: {str(e)}"
-    except json.JSONDecodeError:
-        return False, f"Error parsing response: {response.text}"
-    except Exception as e:
-        return False, f"Unexpected error: {str(e)}"
+        except json.JSONDecodeError:
+            return False, f"Error parsing response: {response.text}"
+        return result.get("success", False), result.get("message", "Unknown response")
+    else:
+        return False, f"Error: HTTP {response.status_code} - {response.text}"
 
-def send_file(recipient: str, media_path: str) -> Tuple[bool, str]:
+def _post_send(payload: dict) -> Tuple[bool, str]:
     try:
-        # Validate input
-        if not recipient:
-            return False, "Recipient must be provided"
-        
-        if not media_path:
-            return False, "Media path must be provided"
-        
-        if not os.path.isfile(media_path):
-            return False, f"Media file not found: {media_path}"
-        
-        url = f"{WHATSAPP_API_BASE_URL}/send"
-        payload = {
-            "recipient": recipient,
-            "media_path": media_path
-        }
-        
-        response = requests.post(url, json=payload)
-        
-        # Check if the request was successful
-        if response.status_code == 200:
-            result = response.json()
-            return result.get("success", False), result.get("message", "Unknown response")
-        else:
-            return False, f"Error: HTTP {response.status_code} - {response.text}"
-            
+        response = bridge.post(f"{WHATSAPP_API_BASE_URL}/send", payload)
+        return _send_result(response)
     except requests.RequestException as e:
         return False, f"Request error: {str(e)}"
-    except json.JSONDecodeError:
-        return False, f"Error parsing response: {response.text}"
     except Exception as e:
         return False, f"Unexpected error: {str(e)}"
 
+def send_message(recipient: str, message: str) -> Tuple[bool, str]:
+    payload, error = _send_payload(recipient, message=message)
+    if payload is None:
+        return False, error
+    return _post_send(payload)
+
+def send_file(recipient: str, media_path: str) -> Tuple[bool, str]:
+    payload, error = _send_payload(recipient, media_path=media_path)
+    if payload is None:
+        return False, error
+    return _post_send(payload)
+
 def send_audio_message(recipient: str, media_path: str) -> Tuple[bool, str]:
-    try:
-        # Validate input
-        if not recipient:
-            return False, "Recipient must be provided"
-        
-        if not media_path:
-            return False, "Media path must be provided"
-        
-        if not os.path.isfile(media_path):
-            return False, f"Media file not found: {media_path}"
+    payload, error = _audio_payload(recipient, media_path)
+    if payload is None:
+        return False, error
+    return _post_send(payload)
+
+def send_audio_data(
+    recipient: str,
+    data: bytes,
+    pcm_rate: Optional[int] = None,
+    pcm_channels: int = 1
+) -> Tuple[bool, str]:
+    """Send in-memory audio as a voice message without touching the disk.
+
+    ``data`` is Opus/OGG, any other audio file's content, or raw 16-bit PCM
+    when ``pcm_rate`` (and ``pcm_channels``) are given, e.g. a reply rendered
+    by a voice agent.
+    """
+    payload, error = _audio_data_payload(recipient, data, pcm_rate, pcm_channels)
+    if payload is None:
+        return False, error
+    return _post_send(payload)
+
+# Bulk sends: messages in flight at once, sustained sends per second (None
+# for no limit) and burst allowed on top, retries per recipient after a
+# transient failure, and the first retry's delay in seconds (doubled after
+# each further attempt, with jitter)
+BULK_CONCURRENCY = 4
+BULK_RATE = 5.0
+BULK_BURST = 5
+BULK_RETRIES = 3
+BULK_BACKOFF = 0.5
+
+class TokenBucket:
+    """Thread-safe token bucket limiting how often something may happen.
+
+    reserve() takes a token and returns how long the caller must wait before
+    using it, so the same bucket serves threads (time.sleep) and coroutines
+    (asyncio.sleep).
+    """
+
+    def __init__(self, rate: Optional[float], burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
 
-        if not media_path.endswith(".ogg"):
+    def reserve(self) -> float:
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Going negative queues the caller behind earlier reservations
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+def _bulk_jobs(
+    recipients: List[Union[str, Dict[str, Any]]],
+    message: Optional[str]
+) -> List[Tuple[str, Optional[dict], str]]:
+    """(recipient, payload or None, error) for each entry of a bulk send.
+
+    An entry is a recipient, or a dict with a "recipient" and either its own
+    "message" or the fields to fill into ``message`` as a str.format template.
+    """
+    jobs = []
+    for entry in recipients:
+        if isinstance(entry, dict):
+            recipient = str(entry.get("recipient") or "")
+            text = entry.get("message", message)
+            if text is not None and "message" not in entry:
+                try:
+                    text = text.format_map(entry)
+                except Exception as e:
+                    # Any bad field ("{name.upper}", "{0}") fails only this entry
+                    jobs.append((recipient, None, f"Cannot fill in message template: {e!r}"))
+                    continue
+        else:
+            recipient, text = str(entry or ""), message
+        if text is None:
+            jobs.append((recipient, None, "Message must be provided"))
+            continue
+        payload, error = _send_payload(recipient, message=text)
+        jobs.append((recipient, payload, error))
+    return jobs
+
+def _bulk_retryable(status_code: int, message: Optional[str]) -> bool:
+    """Whether a failed send is known not to have gone out, so it is safe to try again.
+
+    The bridge answers 500 for every failed send, including ones WhatsApp
+    may have delivered, so only throttling, unavailability and its explicit
+    "Not connected to WhatsApp" count.
+    """
+    return status_code in (429, 503) or "not connected" in (message or "").lower()
+
+def _bulk_unsent(error: requests.RequestException) -> bool:
+    """Whether a request error means the send never reached the bridge.
+
+    A read timeout or a dropped response may follow a delivered message.
+    """
+    reason = getattr(error.args[0] if error.args else None, "reason", None)
+    return isinstance(error, requests.ConnectionError) and isinstance(reason, ConnectTimeoutError)
+
+def _bulk_backoff(attempt: int) -> float:
+    return BULK_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.0)
+
+def _bulk_result(recipient: str, success: bool, message: str, attempts: int) -> Dict[str, Any]:
+    return {"recipient": recipient, "success": success, "message": message, "attempts": attempts}
+
+def send_messages_bulk(
+    recipients: List[Union[str, Dict[str, Any]]],
+    message: Optional[str] = None,
+    concurrency: int = BULK_CONCURRENCY,
+    rate: Optional[float] = BULK_RATE,
+    burst: int = BULK_BURST,
+    retries: int = BULK_RETRIES
+) -> List[Dict[str, Any]]:
+    """Send a text message to many recipients.
+
+    Up to ``concurrency`` sends run at once over the pooled bridge
+    connections, started at no more than ``rate`` per second. A send that
+    surely did not go out (the bridge could not be reached, answered 429 or
+    503, or is not connected to WhatsApp) is retried up to ``retries`` times
+    with exponential backoff; other failures, read timeouts included, are
+    not, as retrying them could deliver the message twice.
+
+    Returns one result per entry, in order, with the recipient, success,
+    the bridge's status message and the number of attempts made.
+    """
+    url = f"{WHATSAPP_API_BASE_URL}/send"
+    bucket = TokenBucket(rate, burst)
+
+    def send(job: Tuple[str, Optional[dict], str]) -> Dict[str, Any]:
+        recipient, payload, error = job
+        if payload is None:
+            return _bulk_result(recipient, False, error, 0)
+        attempt = 0
+        while True:
+            attempt += 1
+            time.sleep(bucket.reserve())
             try:
-                media_path = audio.convert_to_opus_ogg_temp(media_path)
+                response = bridge.post(url, payload)
+                success, status = _send_result(response)
+                retryable = not success and _bulk_retryable(response.status_code, status)
+            except requests.RequestException as e:
+                success, status, retryable = False, f"Request error: {str(e)}", _bulk_unsent(e)
             except Exception as e:
-                return False, f"Error converting file to opus ogg. You likely need to install ffmpeg: {str(e)}"
-        
-        url = f"{WHATSAPP_API_BASE_URL}/send"
-        payload = {
-            "recipient": recipient,
-            "media_path": media_path
-        }
-        
-        response = requests.post(url, json=payload)
-        
-        # Check if the request was successful
-        if response.status_code == 200:
+                success, status, retryable = False, f"Unexpected error: {str(e)}", False
+            if success or not retryable or attempt > retries:
+                return _bulk_result(recipient, success, status, attempt)
+            time.sleep(_bulk_backoff(attempt))
+
+    jobs = _bulk_jobs(recipients, message)
+    if not jobs:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(jobs)))) as pool:
+        return list(pool.map(send, jobs))
+
+# Downloaded media remembered by download_media
+MEDIA_CACHE_SIZE = 10_000
+
+class MediaEntry:
+    """A file downloaded through the bridge, as recorded in the media cache."""
+    __slots__ = ("path", "sha256", "size")
+
+    def __init__(self, path: str, sha256: Optional[str], size: int):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+
+class MediaCache:
+    """Process-wide LRU index of downloaded media: (chat_jid, message_id) -> MediaEntry.
+
+    An entry is only trusted while its file still exists with the recorded
+    size; otherwise it is dropped and the media downloaded again. Concurrent
+    downloads of the same media are coalesced: the first caller asks the
+    bridge, the others wait for its result (claim/finish), from threads or,
+    via asyncio.wrap_future, from an event loop.
+    """
+
+    def __init__(self, max_size: int = MEDIA_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], MediaEntry]" = OrderedDict()
+        self._pending: Dict[Tuple[str, str], Future] = {}
+
+    def lookup(self, chat_jid: str, message_id: str) -> Optional[MediaEntry]:
+        key = (chat_jid, message_id)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        try:
+            valid = os.path.getsize(entry.path) == entry.size
+        except OSError:
+            valid = False
+        with self._lock:
+            if valid:
+                self._entries.move_to_end(key)
+            elif self._entries.get(key) is entry:
+                del self._entries[key]
+        return entry if valid else None
+
+    def add(self, chat_jid: str, message_id: str, path: str, sha256: Optional[str] = None) -> MediaEntry:
+        """Record a downloaded file, hashing it if the store has no hash for it."""
+        size = os.path.getsize(path)
+        if sha256 is None:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            sha256 = digest.hexdigest()
+        entry = MediaEntry(path, sha256, size)
+        with self._lock:
+            self._entries[(chat_jid, message_id)] = entry
+            self._entries.move_to_end((chat_jid, message_id))
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def claim(self, chat_jid: str, message_id: str) -> Tuple[Future, bool]:
+        """The future of the download in progress for this media, and whether the caller must run it."""
+        with self._lock:
+            future = self._pending.get((chat_jid, message_id))
+            if future is not None:
+                return future, False
+            future = self._pending[(chat_jid, message_id)] = Future()
+            return future, True
+
+    def finish(self, chat_jid: str, message_id: str, path: Optional[str]) -> None:
+        """Publish the result of a claimed download to everyone waiting for it."""
+        with self._lock:
+            future = self._pending.pop((chat_jid, message_id), None)
+        if future is not None:
+            future.set_result(path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+media_cache = MediaCache()
+
+def _record_download(chat_jid: str, message_id: str, path: Optional[str]) -> Optional[str]:
+    """Add a fresh download to the media cache, with the SHA-256 WhatsApp reported for it if known."""
+    if not path:
+        return path
+    try:
+        row = _connect().execute(
+            "SELECT file_sha256 FROM messages WHERE id = ? AND chat_jid = ?", (message_id, chat_jid)
+        ).fetchone()
+        sha256 = row[0].hex() if row and row[0] else None
+        media_cache.add(chat_jid, message_id, path, sha256)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Could not index downloaded media: {str(e)}")
+    return path
+
+def _download_result(response) -> Optional[str]:
+    """Interpret the bridge's answer to /download (a requests or httpx response)."""
+    if response.status_code == 200:
+        try:
             result = response.json()
-            return result.get("success", False), result.get("message", "Unknown response")
+        except json.JSONDecodeError:
+            print(f"Error parsing response: {response.text}")
+            return None
+        if result.get("success", False):
+            path = result.get("path")
+            print(f"Media downloaded successfully: {path}")
+            return path
         else:
-            return False, f"Error: HTTP {response.status_code} - {response.text}"
-            
-    except requests.RequestException as e:
-        return False, f"Request error: {str(e)}"
-    except json.JSONDecodeError:
-        return False, f"Error parsing response: {response.text}"
-    except Exception as e:
-        return False, f"Unexpected error: {str(e)}"
+            print(f"Download failed: {result.get('message', 'Unknown error')}")
+            return None
+    else:
+        print(f"Error: HTTP {response.status_code} - {response.text}")
+        return None
 
 def download_media(message_id: str, chat_jid: str) -> Optional[str]:
     """Download media from a message and return the local file path.
     
+    Media downloaded before (and still on disk) is returned from the media
+    cache without asking the bridge; concurrent calls for the same media share
+    one bridge request.
+    
     Args:
         message_id: The ID of the message containing the media
         chat_jid: The JID of the chat containing the message
@@ -734,6 +1588,26 @@ def download_media(message_id: str, chat_jid: str) -> Optional[str]:
     Returns:
         The local file path if download was successful, None otherwise
     """
+    entry = media_cache.lookup(chat_jid, message_id)
+    if entry is not None:
+        return entry.path
+
+    future, owner = media_cache.claim(chat_jid, message_id)
+    if not owner:
+        return future.result()
+    path = None
+    try:
+        # A download may have finished between the lookup and the claim
+        entry = media_cache.lookup(chat_jid, message_id)
+        if entry is not None:
+            path = entry.path
+        else:
+            path = _record_download(chat_jid, message_id, _download_from_bridge(message_id, chat_jid))
+    finally:
+        media_cache.finish(chat_jid, message_id, path)
+    return path
+
+def _download_from_bridge(message_id: str, chat_jid: str) -> Optional[str]:
     try:
         url = f"{WHATSAPP_API_BASE_URL}/download"
         payload = {
@@ -741,27 +1615,12 @@ def download_media(message_id: str, chat_jid: str) -> Optional[str]:
             "chat_jid": chat_jid
         }
         
-        response = requests.post(url, json=payload)
-        
-        if response.status_code == 200:
-            result = response.json()
-            if result.get("success", False):
-                path = result.get("path")
-                print(f"Media downloaded successfully: {path}")
-                return path
-            else:
-                print(f"Download failed: {result.get('message', 'Unknown error')}")
-                return None
-        else:
-            print(f"Error: HTTP {response.status_code} - {response.text}")
-            return None
+        response = bridge.post(url, payload)
+        return _download_result(response)
             
     except requests.RequestException as e:
         print(f"Request error: {str(e)}")
         return None
-    except json.JSONDecodeError:
-        print(f"Error parsing response: {response.text}")
-        return None
     except Exception as e:
         print(f"Unexpected error: {str(e)}")
         return None
@@ -0,0 +1,108 @@
+"""Async versions of the whatsapp.py API for use from an event loop.
+
+whatsapp.py does blocking SQLite and HTTP I/O. Awaiting these wrappers runs
+the call on a dedicated thread pool instead, so concurrent tool calls overlap
+rather than queueing behind each other on the event loop:
+
+- queries run on the reader pool, each thread with its own pooled read-only
+  connection (db.py). sqlite3 releases the GIL while a statement runs, so
+  readers make progress in parallel;
+- requests to the bridge (sending, downloading media) run on a separate
+  bridge pool with one thread per pooled keep-alive connection
+  (bridge.session()), so they never hold up reads. Under concurrency this
+  beats bridge.async_post on the event loop, whose httpx pool checks every
+  connection on each request (benchmarks/bench_bridge.py).
+
+The pool sizes bound how many calls of each kind run at once; further calls
+wait for a free thread.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import bridge
+import whatsapp
+
+READER_THREADS = min(8, (os.cpu_count() or 1) + 2)
+BRIDGE_THREADS = bridge.POOL_SIZE
+
+_pools = {}
+
+
+def configure(reader_threads: Optional[int] = None, bridge_threads: Optional[int] = None) -> None:
+    """Resize the thread pools (e.g. for benchmarks). Running calls finish on the old pools."""
+    global READER_THREADS, BRIDGE_THREADS
+    if reader_threads is not None:
+        READER_THREADS = reader_threads
+        _replace_pool("reader")
+    if bridge_threads is not None:
+        BRIDGE_THREADS = bridge_threads
+        _replace_pool("bridge")
+
+
+def _replace_pool(kind: str) -> None:
+    pool = _pools.pop(kind, None)
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+
+def _pool(kind: str) -> ThreadPoolExecutor:
+    pool = _pools.get(kind)
+    if pool is None:
+        size = READER_THREADS if kind == "reader" else BRIDGE_THREADS
+        pool = _pools[kind] = ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"whatsapp-{kind}")
+    return pool
+
+
+def _run_on(kind: str, fn: Callable) -> Callable:
+    """Wrap a blocking whatsapp.py function as a coroutine function running on a pool."""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_pool(kind), functools.partial(fn, *args, **kwargs))
+    return wrapper
+
+
+search_contacts = _run_on("reader", whatsapp.search_contacts)
+list_messages = _run_on("reader", whatsapp.list_messages)
+list_chats = _run_on("reader", whatsapp.list_chats)
+get_chat = _run_on("reader", whatsapp.get_chat)
+get_direct_chat_by_contact = _run_on("reader", whatsapp.get_direct_chat_by_contact)
+get_contact_chats = _run_on("reader", whatsapp.get_contact_chats)
+get_last_interaction = _run_on("reader", whatsapp.get_last_interaction)
+get_message_context = _run_on("reader", whatsapp.get_message_context)
+get_sender_name = _run_on("reader", whatsapp.get_sender_name)
+
+
+send_message = _run_on("bridge", whatsapp.send_message)
+send_file = _run_on("bridge", whatsapp.send_file)
+send_audio_message = _run_on("bridge", whatsapp.send_audio_message)
+send_audio_data = _run_on("bridge", whatsapp.send_audio_data)
+# Runs its own bounded set of sender threads; takes one bridge thread to wait on them
+send_messages_bulk = _run_on("bridge", whatsapp.send_messages_bulk)
+
+
+async def download_media(message_id: str, chat_jid: str) -> Optional[str]:
+    """whatsapp.download_media sharing its media cache; waiting for another caller's download takes no thread."""
+    entry = whatsapp.media_cache.lookup(chat_jid, message_id)
+    if entry is not None:
+        return entry.path
+
+    future, owner = whatsapp.media_cache.claim(chat_jid, message_id)
+    if not owner:
+        return await asyncio.wrap_future(future)
+    path = None
+    try:
+        # A download may have finished between the lookup and the claim
+        entry = whatsapp.media_cache.lookup(chat_jid, message_id)
+        if entry is not None:
+            path = entry.path
+        else:
+            path = await _run_on("bridge", whatsapp._download_from_bridge)(message_id, chat_jid)
+            path = await _run_on("reader", whatsapp._record_download)(chat_jid, message_id, path)
+    finally:
+        whatsapp.media_cache.finish(chat_jid, message_id, path)
+    return path